@@ -1,15 +1,81 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, g, session, flash
+from flask import Flask, render_template, request, redirect, url_for, jsonify, g, session, flash, Response, has_request_context, send_file
 import sqlite3
 import os
+import io
+import json
+import mimetypes
 import datetime
-from werkzeug.security import check_password_hash, generate_password_hash
-from functools import wraps
+import click
+import migrations
+from database import connection_manager, transaction, DEFAULT_PRAGMAS
+import workout_store
+import workout_io
+import workout_batch
+import stats
+import catalog
+from catalog import catalog_cache
+import search
+import sync
+import instrumentation
+import assets
+import archive
+import backup
+import jobs
+import passwords
+import auth
+from auth import login_required, admin_required, current_user
 
 app = Flask(__name__)
 app.config.from_mapping(
     SECRET_KEY='dev',
     DATABASE=os.path.join(app.instance_path, 'balift.sqlite'),
+    # Znovupoužití připojení v rámci vlákna workeru a pragmy nastavené při připojení
+    DB_REUSE_CONNECTIONS=True,
+    SQLITE_PRAGMAS=dict(DEFAULT_PRAGMAS),
+    # Měření požadavků a SQL dotazů (Server-Timing, log pomalých dotazů, /admin/metrics)
+    INSTRUMENTATION_ENABLED=False,
+    SLOW_QUERY_MS=100,
+    # Hashování hesel v omezeném poolu a limity pokusů o přihlášení za minutu
+    PASSWORD_HASH_METHOD=passwords.DEFAULT_HASH_METHOD,
+    PASSWORD_HASH_WORKERS=2,
+    PASSWORD_HASH_QUEUE=16,
+    LOGIN_ATTEMPTS_PER_USER=5,
+    LOGIN_ATTEMPTS_PER_IP=30,
+    # Cache přihlášených uživatelů a platnost API tokenů (v sekundách)
+    AUTH_CACHE_TTL=60,
+    AUTH_CACHE_SIZE=1024,
+    API_TOKEN_MAX_AGE=30 * 24 * 3600,
+    # Asynchronní režim (asgi.py) - velikost poolu vláken a limit velikosti požadavku
+    ASYNC_WORKERS=16,
+    ASYNC_MAX_BODY=64 * 1024 * 1024,
+    # Online zálohy databáze (backup.py) - adresář, interval vlákna na pozadí (0 = vypnuto) a rotace
+    BACKUP_DIR=os.path.join(app.instance_path, 'backups'),
+    BACKUP_INTERVAL=0,
+    BACKUP_KEEP=7,
+    BACKUP_MAX_AGE_DAYS=None,
+    BACKUP_PAGES=backup.DEFAULT_PAGES,
+    BACKUP_SLEEP=backup.DEFAULT_SLEEP,
+    # Fronta úloh na pozadí (jobs.py, flask worker) - soubory výsledků, počet procesů, čekání na úlohy a úklid
+    JOB_FILES_DIR=os.path.join(app.instance_path, 'jobs'),
+    JOB_WORKERS=2,
+    JOB_POLL_INTERVAL=1.0,
+    JOB_STALE_TIMEOUT=600,
+    JOB_RETENTION_DAYS=7,
+    # Archiv starých tréninků (archive.py, flask archive-workouts) - soubor připojený přes ATTACH, None = vypnuto
+    ARCHIVE_DATABASE=None,
+    ARCHIVE_AFTER_DAYS=365,
+    ARCHIVE_BATCH_SIZE=500,
 )
+instrumentation.init_app(app)
+passwords.init_app(app)
+auth.init_app(app)
+assets.init_app(app)
+backup.init_app(app)
+jobs.init_app(app)
+archive.init_app(app)
+
+# Manifest PWA (static/manifest.webmanifest)
+mimetypes.add_type('application/manifest+json', '.webmanifest')
 
 # Zajistit, že existuje adresář instance
 try:
@@ -19,24 +85,38 @@ except OSError:
 
 def get_db():
     if 'db' not in g:
-        g.db = sqlite3.connect(
+        g.db = connection_manager.acquire(
             app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES
+            app.config['SQLITE_PRAGMAS'],
+            reuse=app.config['DB_REUSE_CONNECTIONS'],
+            attach=archive.attachments(app.config)
         )
-        g.db.row_factory = sqlite3.Row
+        if app.config['INSTRUMENTATION_ENABLED'] and has_request_context():
+            g.db = instrumentation.instrument_connection(g.db)
     return g.db
 
 def close_db(e=None):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        connection_manager.release(db, reuse=app.config['DB_REUSE_CONNECTIONS'])
 
 app.teardown_appcontext(close_db)
 
 def init_db():
-    db = get_db()
-    with app.open_resource('schema.sql') as f:
-        db.executescript(f.read().decode('utf8'))
+    # Vlastní připojení bez archivu - DROP TABLE bez schématu by jinak na čisté
+    # databázi smazal stejnojmenné tabulky archivu
+    db = connection_manager.connect(app.config['DATABASE'], app.config['SQLITE_PRAGMAS'])
+    try:
+        with app.open_resource('schema.sql') as f:
+            db.executescript(f.read().decode('utf8'))
+        # schema.sql odpovídá poslední verzi migrací
+        migrations.set_version(db, migrations.LATEST_VERSION)
+        db.commit()
+    finally:
+        db.close()
+    # Archivované tréninky by po nové inicializaci kolidovaly s novými ID
+    if app.config['ARCHIVE_DATABASE']:
+        archive.clear(app.config['ARCHIVE_DATABASE'])
 
 @app.cli.command('init-db')
 def init_db_command():
@@ -44,47 +124,228 @@ def init_db_command():
     init_db()
     print('Databáze byla inicializována.')
 
-# Autentizační dekorátory
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-def admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session or not session.get('is_admin', False):
-            return redirect(url_for('index'))
-        return f(*args, **kwargs)
-    return decorated_function
+@app.cli.command('worker')
+@click.option('--processes', default=None, type=int, help='Počet pracovních procesů (výchozí JOB_WORKERS).')
+@click.option('--burst', is_flag=True, help='Skončit, jakmile je fronta prázdná.')
+def worker_command(processes, burst):
+    """Zpracovává úlohy z fronty (jobs.py), ukončí se pomocí Ctrl+C."""
+    processes = processes or app.config['JOB_WORKERS']
+    print(f'Worker spuštěn ({processes} procesů), úlohy: {", ".join(sorted(jobs.TASKS))}')
+    processed = jobs.run_workers(jobs.options_from_config(app.config), processes, burst)
+    if processed is not None:
+        print(f'Zpracováno úloh: {processed}')
+
+@app.cli.command('migrate-db')
+def migrate_db_command():
+    """Aktualizace existující databáze na poslední verzi schématu."""
+    db = get_db()
+    if not db.execute("SELECT 1 FROM sqlite_master WHERE name = 'workouts'").fetchone():
+        print('Databáze neobsahuje žádné tabulky, použijte příkaz init-db.')
+        return
+    applied = migrations.migrate(db)
+    for version, description in applied:
+        print(f'Migrace {version}: {description}')
+    print(f'Databáze je ve verzi {migrations.get_version(db)}.')
+
+@app.cli.command('backfill-sets')
+@click.option('--batch-size', default=1000, show_default=True, help='Počet cviků v jedné transakci.')
+@click.option('--restart', is_flag=True, help='Začít znovu od prvního cviku.')
+def backfill_sets_command(batch_size, restart):
+    """Doplnění tabulky workout_sets z textových polí reps a weight (lze přerušit a spustit znovu)."""
+    db = get_db()
+    if restart:
+        workout_store.reset_backfill(db, workout_store.BACKFILL_SETS)
+    total = 0
+    for processed in workout_store.backfill_sets(db, batch_size):
+        total += processed
+        print(f'Zpracováno cviků: {total}')
+    print('Doplnění sérií je dokončeno.')
+
+@app.cli.command('archive-workouts')
+@click.option('--days', default=None, type=int, help='Archivovat tréninky starší než počet dní (výchozí ARCHIVE_AFTER_DAYS).')
+@click.option('--before', default=None, help='Archivovat tréninky s datem před YYYY-MM-DD.')
+def archive_workouts_command(days, before):
+    """Přesun starých tréninků do archivní databáze (ARCHIVE_DATABASE), lze přerušit a spustit znovu."""
+    if not app.config['ARCHIVE_DATABASE']:
+        raise click.UsageError('Archiv není nastavený, doplňte ARCHIVE_DATABASE do konfigurace.')
+    if before is None:
+        days = days if days is not None else app.config['ARCHIVE_AFTER_DAYS']
+        before = (datetime.date.today() - datetime.timedelta(days=days)).isoformat()
+    else:
+        try:
+            before = datetime.datetime.strptime(before, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            raise click.BadParameter('Neplatný formát data', param_hint='--before')
+
+    total = 0
+    for moved in archive.archive_workouts(get_db(), before, app.config['ARCHIVE_BATCH_SIZE']):
+        total += moved
+        print(f'Archivováno tréninků: {total}')
+    print(f'Tréninky s datem před {before} jsou v archivu.')
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Přepočet všech souhrnných statistik od začátku."""
+    with transaction(get_db()) as db:
+        stats.rebuild(db)
+    print('Statistiky byly přepočítány.')
+
+@app.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Znovu sestaví fulltextové indexy tréninků a cviků."""
+    with transaction(get_db()) as db:
+        search.rebuild(db)
+    print('Vyhledávací indexy byly sestaveny.')
+
+@app.cli.command('build-assets')
+@click.option('--no-minify', is_flag=True, help='Sestavit balíčky bez zmenšení.')
+def build_assets_command(no_minify):
+    """Sestaví CSS a JS do static/dist (otisk obsahu v názvu, .gz/.br, manifest)."""
+    for name, built, size, gz_size, br_size in assets.build(app.static_folder, minify=not no_minify):
+        br = f', br {br_size} B' if br_size is not None else ''
+        print(f'{name} -> {built} ({size} B, gz {gz_size} B{br})')
+    if assets.brotli is None:
+        print('Modul brotli není nainstalován, varianty .br se nevytvořily (pip install brotli).')
+
+@app.cli.command('backup-db')
+@click.option('--dest', default=None, help='Adresář záloh (výchozí BACKUP_DIR).')
+@click.option('--keep', default=None, type=int, help='Počet ponechaných záloh (výchozí BACKUP_KEEP).')
+def backup_db_command(dest, keep):
+    """Vytvoří ověřenou zálohu databáze za běhu aplikace a smaže nejstarší zálohy."""
+    options = backup.options_from_config(app.config)
+    if dest:
+        options['backup_dir'] = dest
+    if keep is not None:
+        options['keep'] = keep
+    try:
+        path = backup.create_backup(**options)
+    except backup.BackupError as e:
+        raise click.ClickException(str(e))
+    print(f'Záloha uložena: {path} ({os.path.getsize(path)} B)')
+
+@app.cli.command('list-backups')
+@click.option('--dest', default=None, help='Adresář záloh (výchozí BACKUP_DIR).')
+@click.option('--verify', is_flag=True, help='Ověřit integritu každé zálohy.')
+def list_backups_command(dest, verify):
+    """Vypíše zálohy od nejnovější."""
+    for path in backup.list_backups(dest or app.config['BACKUP_DIR']):
+        status = ''
+        if verify:
+            problems = backup.verify(path)
+            status = ' OK' if not problems else ' CHYBA: ' + '; '.join(problems[:3])
+        print(f'{path} ({os.path.getsize(path)} B){status}')
+
+@app.cli.command('restore-db')
+@click.argument('backup_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--no-safety-backup', is_flag=True, help='Nezálohovat před obnovou současný stav.')
+@click.confirmation_option(prompt='Současná data budou nahrazena zálohou. Pokračovat?')
+def restore_db_command(backup_file, no_safety_backup):
+    """Obnoví databázi z ověřené zálohy (současný stav se nejprve zálohuje)."""
+    try:
+        safety = backup.restore_backup(
+            backup_file, app.config['DATABASE'],
+            None if no_safety_backup else app.config['BACKUP_DIR']
+        )
+    except backup.BackupError as e:
+        raise click.ClickException(str(e))
+    if safety:
+        print(f'Původní stav uložen do {safety}')
+    print(f'Databáze obnovena ze zálohy {backup_file}')
+
+@app.cli.command('prune-tombstones')
+@click.option('--days', default=90, show_default=True, help='Ponechat záznamy o smazání mladší než tento počet dní.')
+def prune_tombstones_command(days):
+    """Smaže staré záznamy o smazaných trénincích (klienti se starším kurzorem dostanou úplný stav)."""
+    with transaction(get_db()) as db:
+        removed = sync.prune_tombstones(db, days)
+    print(f'Smazáno záznamů: {removed}')
+
+def get_user_id_by_username(username):
+    """Vrátí ID uživatele podle jména, nebo vyhodí chybu pro CLI."""
+    user = get_db().execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
+    if user is None:
+        raise click.ClickException(f'Uživatel {username} neexistuje.')
+    return user['id']
+
+@app.cli.command('create-token')
+@click.option('--user', 'username', required=True, help='Uživatel, za kterého bude token jednat.')
+def create_token_command(username):
+    """Vytvoří podepsaný API token (platí do změny hesla nebo API_TOKEN_MAX_AGE)."""
+    print(auth.create_api_token(auth.get_principal(get_user_id_by_username(username))))
+
+@app.cli.command('import-workouts')
+@click.argument('file', type=click.File('r', encoding='utf-8'))
+@click.option('--user', 'username', required=True, help='Uživatel, kterému se tréninky přiřadí.')
+@click.option('--format', 'fmt', type=click.Choice(workout_io.FORMATS), default=None,
+              help='Formát vstupu (výchozí podle přípony souboru).')
+def import_workouts_command(file, username, fmt):
+    """Hromadný import tréninků z NDJSON nebo CSV souboru."""
+    if fmt is None:
+        fmt = 'csv' if file.name.lower().endswith('.csv') else 'ndjson'
+    result = workout_io.import_workouts(get_db(), get_user_id_by_username(username), file, fmt)
+    for error in result['errors']:
+        print(f"Řádek {error['line']}: {error['error']}")
+    print(f"Importováno tréninků: {result['imported']}, cviků: {result['exercises']}, chyb: {result['error_count']}.")
+
+@app.cli.command('export-workouts')
+@click.option('--user', 'username', required=True, help='Uživatel, jehož tréninky se exportují.')
+@click.option('--format', 'fmt', type=click.Choice(workout_io.FORMATS), default='ndjson')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-',
+              help='Výstupní soubor (výchozí je standardní výstup).')
+def export_workouts_command(username, fmt, output):
+    """Export tréninků uživatele do NDJSON nebo CSV."""
+    for chunk in workout_io.export_workouts(get_db(), get_user_id_by_username(username), fmt):
+        output.write(chunk)
 
 # Přihlášení
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     error = None
+    status = 200
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
         
         db = get_db()
-        user = db.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-        
-        if user is None:
-            error = 'Nesprávné uživatelské jméno.'
-        elif not check_password_hash(user['password_hash'], password):
-            error = 'Nesprávné heslo.'
+        try:
+            # Limit pokusů se kontroluje dřív, než se začne počítat hash
+            passwords.check_login_attempt(username, request.remote_addr)
+            user = db.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+
+            if user is None:
+                error = 'Nesprávné uživatelské jméno.'
+            elif not passwords.hasher.verify(user['password_hash'], password):
+                error = 'Nesprávné heslo.'
+        except passwords.LoginThrottled as e:
+            error, status = str(e), 429
+        except passwords.HashingBusy as e:
+            error, status = str(e), 503
             
         if error is None:
-            session.clear()
-            session['user_id'] = user['id']
-            session['username'] = user['username']
-            session['is_admin'] = bool(user['is_admin'])
+            passwords.login_succeeded(username)
+            rehash_password(db, user, password)
+            next_url = session.get('next_url')
+            auth.login_user(auth.get_principal(user['id']))
+            # Návrat na stránku, ze které byl uživatel přesměrován (jen v rámci aplikace)
+            if next_url and next_url.startswith('/') and not next_url.startswith('//'):
+                return redirect(next_url)
             return redirect(url_for('index'))
     
-    return render_template('login.html', error=error)
+    return render_template('login.html', error=error), status
+
+def rehash_password(db, user, password):
+    """Po změně PASSWORD_HASH_METHOD přepočítá hash při příštím přihlášení."""
+    try:
+        if passwords.hasher.needs_rehash(user['password_hash']):
+            db.execute(
+                'UPDATE users SET password_hash = ? WHERE id = ?',
+                (passwords.hasher.hash(password), user['id'])
+            )
+            db.commit()
+            auth.invalidate_user(user['id'])
+    except passwords.HashingBusy:
+        # Přepočet není nutný hned, zkusí se při dalším přihlášení
+        pass
 
 # Odhlášení
 @app.route('/logout')
@@ -92,9 +353,34 @@ def logout():
     session.clear()
     return redirect(url_for('login'))
 
+# Podepsaný API token pro skripty (místo cookie session, hlavička Authorization: Bearer)
+@app.route('/api/tokens', methods=['POST'])
+def create_token():
+    data = request.get_json(silent=True) or {}
+    username = data.get('username', '')
+    password = data.get('password', '')
+
+    db = get_db()
+    try:
+        passwords.check_login_attempt(username, request.remote_addr)
+        user = db.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+        if user is None or not passwords.hasher.verify(user['password_hash'], password):
+            return jsonify({'success': False, 'error': 'Nesprávné přihlašovací údaje'}), 401
+    except passwords.LoginThrottled as e:
+        return jsonify({'success': False, 'error': str(e)}), 429
+    except passwords.HashingBusy as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+
+    passwords.login_succeeded(username)
+    rehash_password(db, user, password)
+    return jsonify({
+        'success': True,
+        'token': auth.create_api_token(auth.get_principal(user['id'])),
+        'expires_in': app.config['API_TOKEN_MAX_AGE'],
+    }), 201
+
 # Registrace nového uživatele (pouze pro adminy)
 @app.route('/admin/add-user', methods=['GET', 'POST'])
-@login_required
 @admin_required
 def add_user():
     error = None
@@ -116,7 +402,7 @@ def add_user():
                     # Vytvoření nového uživatele
                     db.execute(
                         'INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)',
-                        (username, generate_password_hash(password), is_admin)
+                        (username, passwords.hasher.hash(password), is_admin)
                     )
                     db.commit()
                     flash(f'Uživatel {username} byl úspěšně vytvořen.', 'success')
@@ -129,6 +415,15 @@ def add_user():
     users = db.execute('SELECT id, username, is_admin FROM users ORDER BY username').fetchall()
     return render_template('admin/add_user.html', error=error, users=users)
 
+# Metriky výkonu (jen při zapnutém INSTRUMENTATION_ENABLED)
+@app.route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    result = instrumentation.metrics.snapshot()
+    result['enabled'] = app.config['INSTRUMENTATION_ENABLED']
+    result['slow_query_ms'] = app.config['SLOW_QUERY_MS']
+    return jsonify(result)
+
 # Routes pro hlavní stránku
 @app.route('/')
 @login_required
@@ -136,93 +431,259 @@ def index():
     return render_template('index.html')
 
 # API Routes s omezením na přihlášené uživatele
+def catalog_response(key, loader):
+    """Odpověď z cache číselníků s ETagem a Last-Modified, při shodě vrací 304."""
+    entry = catalog_cache.get(get_db(), key, loader)
+    response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.last_modified = entry.last_modified
+    # Prohlížeč si odpověď může uložit, ale vždy ji nechá ověřit
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @app.route('/api/training_types', methods=['GET'])
 @login_required
 def get_training_types():
-    db = get_db()
-    types = db.execute('SELECT * FROM training_types').fetchall()
-    return jsonify([dict(type) for type in types])
+    return catalog_response('training_types', lambda db, version: catalog.load_training_types(db))
 
 @app.route('/api/exercise_categories', methods=['GET'])
 @login_required
 def get_exercise_categories():
-    db = get_db()
-    categories = db.execute('SELECT * FROM exercise_categories').fetchall()
-    return jsonify([dict(category) for category in categories])
+    return catalog_response('exercise_categories', lambda db, version: catalog.load_exercise_categories(db))
 
 @app.route('/api/exercises', methods=['GET'])
 @login_required
 def get_exercises():
-    db = get_db()
-    category_id = request.args.get('category_id', None)
+    category_id = request.args.get('category_id', None, type=int)
 
     if category_id:
-        exercises = db.execute(
-            'SELECT * FROM exercises WHERE category_id = ?',
-            (category_id,)
-        ).fetchall()
-    else:
-        exercises = db.execute('SELECT * FROM exercises').fetchall()
+        return catalog_response(
+            f'exercises:{category_id}',
+            lambda db, version: catalog.load_exercises(db, category_id)
+        )
+    return catalog_response('exercises', lambda db, version: catalog.load_exercises(db))
+
+# Všechny číselníky v jednom požadavku pro formuláře
+@app.route('/api/catalog', methods=['GET'])
+@login_required
+def get_catalog():
+    return catalog_response('catalog', catalog.load_catalog)
+
+@app.route('/api/exercises', methods=['POST'])
+@login_required
+def add_exercise():
+    data = request.json
+
+    try:
+        name = (data.get('name') or '').strip()
+        if not name or not data.get('category_id'):
+            return jsonify({'success': False, 'error': 'Vyplňte název a partii'}), 400
+
+        db = get_db()
+        # Trigger na tabulce exercises zvýší verzi katalogu, cache se tím zneplatní
+        with transaction(db):
+            cursor = db.execute(
+                'INSERT INTO exercises (name, category_id, description) VALUES (?, ?, ?)',
+                (name, data['category_id'], data.get('description', ''))
+            )
+        return jsonify({'success': True, 'id': cursor.lastrowid}), 201
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/exercises/<int:exercise_id>', methods=['DELETE'])
+@login_required
+def delete_exercise(exercise_id):
+    if not current_user().is_admin:
+        return jsonify({'success': False, 'error': 'Cviky může mazat jen administrátor'}), 403
+
+    db = get_db()
+    try:
+        with transaction(db):
+            # Archiv nemá cizí klíče, použití v archivovaných trénincích kontrolujeme sami
+            if archive.exercise_in_use(db, exercise_id):
+                raise sqlite3.IntegrityError('Cvik je použit v archivovaném tréninku')
+            cursor = db.execute('DELETE FROM exercises WHERE id = ?', (exercise_id,))
+        if cursor.rowcount == 0:
+            return jsonify({'success': False, 'error': 'Cvik nebyl nalezen'}), 404
+        return jsonify({'success': True}), 200
+    except sqlite3.IntegrityError:
+        return jsonify({'success': False, 'error': 'Cvik je použit v tréninku a nelze jej smazat'}), 400
+
+# Stránkování seznamu tréninků
+WORKOUTS_PAGE_DEFAULT = 50
+WORKOUTS_PAGE_MAX = 200
 
-    return jsonify([dict(exercise) for exercise in exercises])
+def encode_workout_cursor(date, workout_id):
+    """Kurzor pro stránkování (date, id) - formát 'YYYY-MM-DD:id'."""
+    return f'{date}:{workout_id}'
+
+def decode_workout_cursor(cursor):
+    """Rozloží kurzor na dvojici (date, id), při neplatném formátu vyhodí ValueError."""
+    date_part, _, id_part = cursor.rpartition(':')
+    datetime.datetime.strptime(date_part, '%Y-%m-%d')
+    return date_part, int(id_part)
+
+def parse_date_arg(name):
+    """Načte volitelné datum ve formátu YYYY-MM-DD z query parametrů."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
 
 # Výpis seznamu všech tréninků
 @app.route('/api/workouts', methods=['GET'])
+@login_required
 def get_workouts():
     db = get_db()
-    
-    # Pro admina zobrazíme všechny tréninky, pro běžného uživatele jen jeho
-    if session.get('is_admin'):
-        workouts = db.execute(
-            '''SELECT w.id, w.date, tt.name as type_name, u.username as username
-            FROM workouts w
-            JOIN training_types tt ON w.training_type_id = tt.id
-            JOIN users u ON w.user_id = u.id
-            ORDER BY w.date DESC'''
-        ).fetchall()
+    is_admin = current_user().is_admin
+
+    # Bez parametrů stránkování vracíme původní celé pole (legacy režim)
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    # include=exercises přidá ke každému tréninku jeho cviky (jedním dotazem pro celou stránku)
+    with_exercises = 'exercises' in request.args.get('include', '').split(',')
+
+    try:
+        date_from = parse_date_arg('date_from')
+        date_to = parse_date_arg('date_to')
+        training_type_id = request.args.get('training_type_id', type=int)
+        limit = request.args.get('limit', WORKOUTS_PAGE_DEFAULT, type=int)
+        cursor = request.args.get('cursor')
+        after = decode_workout_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'error': 'Neplatné parametry filtru nebo kurzoru'}), 400
+
+    limit = max(1, min(limit, WORKOUTS_PAGE_MAX))
+
+    conditions = []
+    params = []
+
+    # Pro admina zobrazíme všechny tréninky (volitelně jednoho uživatele), pro běžného uživatele jen jeho
+    if is_admin:
+        columns = 'w.id AS id, w.date AS date, tt.name as type_name, u.username as username'
+        joins = 'JOIN users u ON w.user_id = u.id'
+        user_id = request.args.get('user_id', type=int)
+        if user_id is not None:
+            conditions.append('w.user_id = ?')
+            params.append(user_id)
     else:
-        workouts = db.execute(
-            '''SELECT w.id, w.date, tt.name as type_name
-            FROM workouts w
-            JOIN training_types tt ON w.training_type_id = tt.id
-            WHERE w.user_id = ?
-            ORDER BY w.date DESC''',
-            (session['user_id'],)
-        ).fetchall()
-    
-    return jsonify([dict(workout) for workout in workouts])
+        columns = 'w.id AS id, w.date AS date, tt.name as type_name'
+        joins = ''
+        conditions.append('w.user_id = ?')
+        params.append(current_user().id)
+
+    if date_from:
+        conditions.append('w.date >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('w.date <= ?')
+        params.append(date_to)
+    if training_type_id is not None:
+        conditions.append('w.training_type_id = ?')
+        params.append(training_type_id)
+    if paginated and after:
+        # Keyset podmínka - pokračujeme za posledním vráceným řádkem
+        conditions.append('(w.date, w.id) < (?, ?)')
+        params.extend(after)
+
+    # {tier} je předpona tabulek vrstvy - hlavní databáze, případně archiv (archive.py)
+    template = f'''SELECT {columns}
+        FROM {{tier}}workouts w
+        JOIN training_types tt ON w.training_type_id = tt.id
+        {joins}
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}'''
+    order_by = 'date DESC, id DESC'
+
+    if not paginated:
+        tiers = archive.TIERS if archive.reaches_archive(db, date_from) else archive.TIERS[:1]
+        workouts = db.execute(*archive.union_query(template, params, order_by, tiers)).fetchall()
+        if with_exercises:
+            return json_response(workout_batch.workouts_json(
+                db, [workout['id'] for workout in workouts], with_username=is_admin
+            ))
+        return jsonify([dict(workout) for workout in workouts])
+
+    # Načteme o jeden řádek navíc, abychom věděli, zda existuje další stránka
+    workouts = db.execute(*archive.union_query(template, params, order_by, archive.TIERS[:1], limit + 1)).fetchall()
+    # Archiv čteme, jen pokud by jeho tréninky patřily na tuto stránku
+    if archive.reaches_archive(db, date_from, workouts, limit):
+        workouts = db.execute(*archive.union_query(template, params, order_by, limit=limit + 1)).fetchall()
+    has_more = len(workouts) > limit
+    workouts = workouts[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = workouts[-1]
+        next_cursor = encode_workout_cursor(last['date'], last['id'])
+
+    if with_exercises:
+        body = workout_batch.workouts_json(db, [workout['id'] for workout in workouts], with_username=is_admin)
+        return json_response(f'{{"workouts": {body}, "next_cursor": {json.dumps(next_cursor)}}}')
+
+    return jsonify({
+        'workouts': [dict(workout) for workout in workouts],
+        'next_cursor': next_cursor,
+    })
+
+def json_response(body):
+    """Odpověď z hotového textu JSON (bez převodu přes slovníky)."""
+    return Response(body, mimetype='application/json')
+
+# Více tréninků včetně cviků v jednom požadavku (?ids=1,2,3), nedostupná ID se přeskočí
+@app.route('/api/workouts/batch', methods=['GET'])
+@login_required
+def get_workouts_batch():
+    try:
+        workout_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return jsonify({'error': 'Neplatný seznam tréninků'}), 400
+    if not workout_ids or len(workout_ids) > WORKOUTS_PAGE_MAX:
+        return jsonify({'error': f'Zadejte 1 až {WORKOUTS_PAGE_MAX} ID tréninků (parametr ids)'}), 400
+
+    user = current_user()
+    return json_response(workout_batch.workouts_json(
+        get_db(), workout_ids,
+        owner_id=None if user.is_admin else user.id,
+        with_username=user.is_admin
+    ))
+
 @app.route('/api/workouts/<int:workout_id>', methods=['GET'])
 @login_required
 def get_workout(workout_id):
     db = get_db()
     
-    # Admin má přístup ke všem tréninkům, běžný uživatel jen ke svým
-    if session.get('is_admin', False):
-        workout = db.execute(
-            '''SELECT w.id, w.date, w.training_type_id, tt.name as type_name, w.notes, w.user_id,
-            u.username as username
-            FROM workouts w
-            JOIN training_types tt ON w.training_type_id = tt.id
-            LEFT JOIN users u ON w.user_id = u.id
-            WHERE w.id = ?''',
-            (workout_id,)
-        ).fetchone()
-    else:
-        workout = db.execute(
-            '''SELECT w.id, w.date, w.training_type_id, tt.name as type_name, w.notes, w.user_id
-            FROM workouts w
-            JOIN training_types tt ON w.training_type_id = tt.id
-            WHERE w.id = ? AND w.user_id = ?''',
-            (workout_id, session['user_id'])
-        ).fetchone()
+    # Trénink hledáme v hlavní databázi, pak v archivu
+    for tier in archive.tiers(db):
+        # Admin má přístup ke všem tréninkům, běžný uživatel jen ke svým
+        if current_user().is_admin:
+            workout = db.execute(
+                f'''SELECT w.id, w.date, w.training_type_id, tt.name as type_name, w.notes, w.user_id,
+                w.version, u.username as username
+                FROM {tier}workouts w
+                JOIN training_types tt ON w.training_type_id = tt.id
+                LEFT JOIN users u ON w.user_id = u.id
+                WHERE w.id = ?''',
+                (workout_id,)
+            ).fetchone()
+        else:
+            workout = db.execute(
+                f'''SELECT w.id, w.date, w.training_type_id, tt.name as type_name, w.notes, w.user_id,
+                w.version
+                FROM {tier}workouts w
+                JOIN training_types tt ON w.training_type_id = tt.id
+                WHERE w.id = ? AND w.user_id = ?''',
+                (workout_id, current_user().id)
+            ).fetchone()
+        if workout is not None:
+            break
 
     if workout is None:
         return jsonify({'error': 'Trénink nebyl nalezen nebo k němu nemáte přístup'}), 404
 
     exercises = db.execute(
-        '''SELECT we.id, e.id as exercise_id, e.name as exercise_name,
+        f'''SELECT we.id, e.id as exercise_id, e.name as exercise_name,
         ec.name as category_name, we.sets, we.reps, we.weight
-        FROM workout_exercises we
+        FROM {tier}workout_exercises we
         JOIN exercises e ON we.exercise_id = e.id
         JOIN exercise_categories ec ON e.category_id = ec.id
         WHERE we.workout_id = ?''',
@@ -250,45 +711,42 @@ def add_workout():
             return jsonify({'success': False, 'error': 'Neplatný formát data'}), 400
         
         # Přidání id přihlášeného uživatele
-        user_id = session['user_id']
+        user_id = current_user().id
 
-        db.execute(
-            'INSERT INTO workouts (date, training_type_id, notes, user_id) VALUES (?, ?, ?, ?)',
-            (formatted_date, data['training_type_id'], data.get('notes', ''), user_id)
-        )
-        db.commit()
-        workout_id = db.execute('SELECT last_insert_rowid()').fetchone()[0]
+        # Opakované odeslání stejného tréninku z offline fronty vrátí už uložený záznam
+        client_id = data.get('client_id') or None
+        if client_id:
+            existing = workout_store.find_by_client_id(db, user_id, client_id)
+            if existing is not None:
+                return jsonify({'success': True, 'id': existing}), 200
 
-        for exercise in data.get('exercises', []):
-            db.execute(
-                '''INSERT INTO workout_exercises
-                (workout_id, exercise_id, sets, reps, weight)
-                VALUES (?, ?, ?, ?, ?)''',
-                (
-                    workout_id,
-                    exercise['exercise_id'],
-                    exercise['sets'],
-                    exercise['reps'],
-                    exercise['weight']
-                )
-            )
-        db.commit()
+        workout_id = workout_store.create_workout(
+            db, user_id, formatted_date, data['training_type_id'],
+            data.get('notes', ''), data.get('exercises', []), client_id
+        )
 
         return jsonify({'success': True, 'id': workout_id}), 201
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+def archived_response():
+    """Archivované tréninky jsou jen pro čtení (archive.py)."""
+    return jsonify({'success': False, 'error': 'Archivovaný trénink nelze měnit, můžete ho zkopírovat'}), 409
+
 @app.route('/api/workouts/<int:workout_id>', methods=['PUT'])
 @login_required
 def update_workout(workout_id):
     data = request.json
     db = get_db()
 
+    if archive.is_archived(db, workout_id):
+        return archived_response()
+
     try:
         # Kontrola vlastnictví
-        if not session.get('is_admin', False):
+        if not current_user().is_admin:
             owner = db.execute('SELECT user_id FROM workouts WHERE id = ?', (workout_id,)).fetchone()
-            if not owner or owner['user_id'] != session['user_id']:
+            if not owner or owner['user_id'] != current_user().id:
                 return jsonify({'success': False, 'error': 'Nemáte oprávnění upravovat tento trénink'}), 403
         
         # Formátování data
@@ -299,31 +757,55 @@ def update_workout(workout_id):
         except ValueError:
             return jsonify({'success': False, 'error': 'Neplatný formát data'}), 400
 
-        db.execute(
-            'UPDATE workouts SET date = ?, training_type_id = ?, notes = ? WHERE id = ?',
-            (formatted_date, data['training_type_id'], data.get('notes', ''), workout_id)
+        # Hlavička i cviky se přepíší v jedné transakci, verze se kontroluje jen když ji klient pošle
+        version = workout_store.replace_workout(
+            db, workout_id, formatted_date, data['training_type_id'],
+            data.get('notes', ''), data.get('exercises', []), data.get('version')
         )
 
-        # Smazání stávajících cviků
-        db.execute('DELETE FROM workout_exercises WHERE workout_id = ?', (workout_id,))
+        return jsonify({'success': True, 'version': version}), 200
+    except workout_store.VersionConflict as e:
+        return jsonify({'success': False, 'error': str(e), 'version': e.current}), 409
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
 
-        # Přidání nových cviků
-        for exercise in data.get('exercises', []):
-            db.execute(
-                '''INSERT INTO workout_exercises
-                (workout_id, exercise_id, sets, reps, weight)
-                VALUES (?, ?, ?, ?, ?)''',
-                (
-                    workout_id,
-                    exercise['exercise_id'],
-                    exercise['sets'],
-                    exercise['reps'],
-                    exercise['weight']
-                )
-            )
-        db.commit()
+# Částečná úprava tréninku - verze, změněná pole hlavičky a změny cviků podle jejich ID:
+# {"version": 3, "notes": "...", "exercises": {"added": [...], "updated": [{"id": 12, "reps": "10-8"}], "removed": [13]}}
+@app.route('/api/workouts/<int:workout_id>', methods=['PATCH'])
+@login_required
+def patch_workout(workout_id):
+    data = request.json
+    db = get_db()
 
-        return jsonify({'success': True}), 200
+    if archive.is_archived(db, workout_id):
+        return archived_response()
+
+    owner = db.execute('SELECT user_id FROM workouts WHERE id = ?', (workout_id,)).fetchone()
+    if owner is None:
+        return jsonify({'success': False, 'error': 'Trénink nebyl nalezen'}), 404
+    if not current_user().is_admin and owner['user_id'] != current_user().id:
+        return jsonify({'success': False, 'error': 'Nemáte oprávnění upravovat tento trénink'}), 403
+
+    try:
+        if not isinstance(data.get('version'), int):
+            return jsonify({'success': False, 'error': 'Chybí verze tréninku'}), 400
+
+        fields = {name: data[name] for name in workout_store.WORKOUT_FIELDS if name in data}
+        if 'date' in fields:
+            try:
+                fields['date'] = datetime.datetime.strptime(fields['date'], '%Y-%m-%d').date().strftime('%Y-%m-%d')
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Neplatný formát data'}), 400
+
+        exercises = data.get('exercises') or {}
+        version, added_ids = workout_store.patch_workout(
+            db, workout_id, data['version'], fields,
+            exercises.get('added', []), exercises.get('updated', []), exercises.get('removed', [])
+        )
+
+        return jsonify({'success': True, 'version': version, 'added_ids': added_ids}), 200
+    except workout_store.VersionConflict as e:
+        return jsonify({'success': False, 'error': str(e), 'version': e.current}), 409
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
@@ -332,19 +814,287 @@ def update_workout(workout_id):
 def delete_workout(workout_id):
     db = get_db()
 
+    if archive.is_archived(db, workout_id):
+        return archived_response()
+
     try:
         # Kontrola vlastnictví
-        if not session.get('is_admin', False):
+        if not current_user().is_admin:
             owner = db.execute('SELECT user_id FROM workouts WHERE id = ?', (workout_id,)).fetchone()
-            if not owner or owner['user_id'] != session['user_id']:
+            if not owner or owner['user_id'] != current_user().id:
                 return jsonify({'success': False, 'error': 'Nemáte oprávnění smazat tento trénink'}), 403
         
-        db.execute('DELETE FROM workouts WHERE id = ?', (workout_id,))
-        db.commit()
+        workout_store.delete_workout(db, workout_id)
         return jsonify({'success': True}), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+def get_io_format():
+    """Formát importu/exportu z parametru format nebo z Content-Type."""
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'csv' if 'csv' in (request.content_type or '') else 'ndjson'
+    return fmt
+
+def get_target_user_id():
+    """Admin může pracovat s tréninky jiného uživatele přes parametr user_id."""
+    if current_user().is_admin:
+        return request.args.get('user_id', current_user().id, type=int)
+    return current_user().id
+
+# Hromadný import tréninků (NDJSON nebo CSV v těle požadavku)
+@app.route('/api/workouts/import', methods=['POST'])
+@login_required
+def import_workouts():
+    fmt = get_io_format()
+    if fmt not in workout_io.FORMATS:
+        return jsonify({'success': False, 'error': 'Nepodporovaný formát'}), 400
+
+    # Tělo požadavku čteme po řádcích, bez načtení celého souboru do paměti
+    lines = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', newline='')
+
+    try:
+        result = workout_io.import_workouts(get_db(), get_target_user_id(), lines, fmt)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    result['success'] = True
+    return jsonify(result), 200
+
+# Streamovaný export tréninků
+@app.route('/api/workouts/export', methods=['GET'])
+@login_required
+def export_workouts():
+    fmt = get_io_format()
+    if fmt not in workout_io.FORMATS:
+        return jsonify({'success': False, 'error': 'Nepodporovaný formát'}), 400
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    user_id = get_target_user_id()
+    path, pragmas = app.config['DATABASE'], app.config['SQLITE_PRAGMAS']
+    attach = archive.attachments(app.config)
+
+    def generate():
+        # Odpověď se streamuje až po konci požadavku, kdy už je připojení
+        # z get_db() vrácené (nebo zavřené) - export má vlastní připojení
+        db = connection_manager.connect(path, pragmas, attach=attach)
+        try:
+            yield from workout_io.export_workouts(db, user_id, fmt)
+        finally:
+            db.close()
+
+    return Response(
+        generate(),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=balift-workouts.{fmt}'}
+    )
+
+# Úlohy na pozadí - zařazení, stav a výsledek (zpracovává je flask worker)
+def job_accepted(job_id, created):
+    """Odpověď 202 s adresou stavu úlohy (i pro už zařazenou stejnou úlohu)."""
+    response = jsonify({
+        'id': job_id,
+        'created': created,
+        'status_url': url_for('get_job_status', job_id=job_id),
+    })
+    response.status_code = 202
+    response.headers['Location'] = url_for('get_job_status', job_id=job_id)
+    return response
+
+def get_visible_job(job_id):
+    """Úloha aktuálního uživatele (admin vidí všechny), jinak None."""
+    job = jobs.get_job(get_db(), job_id)
+    if job is None or (not current_user().is_admin and job['user_id'] != current_user().id):
+        return None
+    return job
+
+@app.route('/api/jobs', methods=['POST'])
+@login_required
+def create_job():
+    data = request.get_json(silent=True) or {}
+    try:
+        task = jobs.get_task(data.get('kind'))
+    except jobs.UnknownTask as e:
+        return jsonify({'error': str(e)}), 400
+    if task.admin_only and not current_user().is_admin:
+        return jsonify({'error': 'Úlohu může spustit jen administrátor'}), 403
+    # Jen úlohy, které mají vlastní endpoint s kontrolou parametrů
+    if not task.admin_only:
+        return jsonify({'error': 'Tuto úlohu spusťte přes její endpoint'}), 400
+
+    job_id, created = jobs.enqueue(get_db(), task.name, {}, current_user().id)
+    return job_accepted(job_id, created)
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def get_job_status(job_id):
+    job = get_visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Úloha nebyla nalezena'}), 404
+    result = jobs.job_to_dict(job)
+    if job['status'] == jobs.DONE:
+        result['result_url'] = url_for('get_job_result', job_id=job_id)
+    return jsonify(result)
+
+@app.route('/api/jobs/<int:job_id>/result', methods=['GET'])
+@login_required
+def get_job_result(job_id):
+    job = get_visible_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Úloha nebyla nalezena'}), 404
+    if job['status'] != jobs.DONE:
+        return jsonify({'error': 'Úloha ještě není dokončená', 'status': job['status']}), 409
+
+    result = json.loads(job['result'] or 'null')
+    if isinstance(result, dict) and result.get('file'):
+        path = os.path.join(app.config['JOB_FILES_DIR'], result['file'])
+        if not os.path.exists(path):
+            return jsonify({'error': 'Soubor s výsledkem už byl smazán'}), 410
+        mimetype = 'text/csv' if result.get('format') == 'csv' else 'application/x-ndjson'
+        return send_file(path, mimetype=mimetype, as_attachment=True,
+                         download_name=f"balift-export.{result.get('format', 'ndjson')}")
+    return jsonify(result)
+
+# Export na pozadí - vhodný pro velká data, výsledek se stáhne z /api/jobs/<id>/result
+@app.route('/api/workouts/export', methods=['POST'])
+@login_required
+def export_workouts_job():
+    fmt = get_io_format()
+    if fmt not in workout_io.FORMATS:
+        return jsonify({'error': f'Nepodporovaný formát: {fmt}'}), 400
+    user_id = get_target_user_id()
+    job_id, created = jobs.enqueue(
+        get_db(), 'export_workouts', {'format': fmt, 'user_id': user_id}, current_user().id
+    )
+    return job_accepted(job_id, created)
+
+# Statistiky a průběh cvičení
+@app.route('/api/stats/exercises/<int:exercise_id>', methods=['GET'])
+@login_required
+def get_exercise_stats(exercise_id):
+    try:
+        date_from = parse_date_arg('date_from')
+        date_to = parse_date_arg('date_to')
+    except ValueError:
+        return jsonify({'error': 'Neplatný formát data'}), 400
+
+    series = stats.exercise_series(get_db(), get_target_user_id(), exercise_id, date_from, date_to)
+    return jsonify({'exercise_id': exercise_id, 'points': series})
+
+# Poslední záznamy cviku pro předvyplnění formuláře ("minule")
+LAST_ENTRIES_MAX = 20
+LAST_BATCH_MAX_IDS = 50
+
+def get_last_limit():
+    return max(1, min(request.args.get('limit', 1, type=int), LAST_ENTRIES_MAX))
+
+@app.route('/api/exercises/<int:exercise_id>/last', methods=['GET'])
+@login_required
+def get_exercise_last(exercise_id):
+    entries = stats.last_entries(get_db(), get_target_user_id(), exercise_id, get_last_limit())
+    return jsonify({'exercise_id': exercise_id, 'entries': entries})
+
+@app.route('/api/exercises/last', methods=['GET'])
+@login_required
+def get_exercises_last():
+    try:
+        exercise_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return jsonify({'error': 'Neplatný seznam cviků'}), 400
+    if not exercise_ids or len(exercise_ids) > LAST_BATCH_MAX_IDS:
+        return jsonify({'error': f'Zadejte 1 až {LAST_BATCH_MAX_IDS} ID cviků (parametr ids)'}), 400
+
+    db = get_db()
+    user_id = get_target_user_id()
+    limit = get_last_limit()
+    return jsonify({
+        'exercises': {
+            str(exercise_id): stats.last_entries(db, user_id, exercise_id, limit)
+            for exercise_id in dict.fromkeys(exercise_ids)
+        }
+    })
+
+@app.route('/api/stats/weekly_volume', methods=['GET'])
+@login_required
+def get_weekly_volume():
+    try:
+        date_from = parse_date_arg('date_from')
+        date_to = parse_date_arg('date_to')
+    except ValueError:
+        return jsonify({'error': 'Neplatný formát data'}), 400
+
+    return jsonify(stats.weekly_volume(get_db(), get_target_user_id(), date_from, date_to))
+
+@app.route('/api/stats/frequency', methods=['GET'])
+@login_required
+def get_workout_frequency():
+    try:
+        date_from = parse_date_arg('date_from')
+        date_to = parse_date_arg('date_to')
+    except ValueError:
+        return jsonify({'error': 'Neplatný formát data'}), 400
+
+    return jsonify(stats.workout_frequency(get_db(), get_target_user_id(), date_from, date_to))
+
+# Inkrementální synchronizace - jen tréninky změněné nebo smazané od kurzoru
+SYNC_PAGE_DEFAULT = 500
+SYNC_PAGE_MAX = 5000
+
+@app.route('/api/sync', methods=['GET'])
+@login_required
+def get_sync():
+    try:
+        since = request.args.get('since')
+        since = sync.decode_cursor(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'Neplatný kurzor'}), 400
+
+    limit = max(1, min(request.args.get('limit', SYNC_PAGE_DEFAULT, type=int), SYNC_PAGE_MAX))
+    return jsonify(sync.changes(get_db(), get_target_user_id(), since, limit))
+
+# Fulltextové vyhledávání v trénincích (poznámky a názvy cviků)
+SEARCH_PAGE_DEFAULT = 20
+SEARCH_PAGE_MAX = 100
+
+@app.route('/api/search', methods=['GET'])
+@login_required
+def search_workouts():
+    query = search.build_query(request.args.get('q', ''))
+    if query is None:
+        return jsonify({'error': 'Zadejte hledaný výraz'}), 400
+
+    limit = max(1, min(request.args.get('limit', SEARCH_PAGE_DEFAULT, type=int), SEARCH_PAGE_MAX))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
+    db = get_db()
+    workouts = search.search_workouts(db, get_target_user_id(), query, limit, offset)
+    has_more = len(workouts) > limit
+    result = {
+        'workouts': workouts[:limit],
+        'next_offset': offset + limit if has_more else None,
+    }
+    # Cviky z katalogu vracíme jen s první stránkou
+    if offset == 0:
+        result['exercises'] = search.search_exercises(db, query, limit=10)
+    return jsonify(result)
+
+@app.route('/api/search/exercises', methods=['GET'])
+@login_required
+def search_exercises():
+    query = search.build_query(request.args.get('q', ''))
+    if query is None:
+        return jsonify({'error': 'Zadejte hledaný výraz'}), 400
+
+    category_id = request.args.get('category_id', None, type=int)
+    return jsonify(search.search_exercises(get_db(), query, category_id))
+
+# Service worker musí být servírován z kořene, aby jeho scope pokryl celou aplikaci
+@app.route('/sw.js')
+def service_worker():
+    response = app.send_static_file('js/sw.js')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 # Routes pro zobrazení šablon
 @app.route('/workouts')
 @login_required
@@ -396,76 +1146,68 @@ def change_password():
             error = 'Nové heslo musí mít alespoň 6 znaků.'
         else:
             db = get_db()
-            user = db.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],)).fetchone()
+            user = db.execute('SELECT * FROM users WHERE id = ?', (current_user().id,)).fetchone()
             
-            if not check_password_hash(user['password_hash'], current_password):
-                error = 'Současné heslo není správné.'
-            else:
-                # Aktualizace hesla
-                db.execute(
-                    'UPDATE users SET password_hash = ? WHERE id = ?',
-                    (generate_password_hash(new_password), session['user_id'])
-                )
-                db.commit()
-                success = 'Heslo bylo úspěšně změněno.'
+            try:
+                # Ověření současného hesla podléhá stejnému limitu jako přihlášení
+                passwords.check_login_attempt(user['username'], request.remote_addr)
+                if not passwords.hasher.verify(user['password_hash'], current_password):
+                    error = 'Současné heslo není správné.'
+                else:
+                    # Aktualizace hesla
+                    db.execute(
+                        'UPDATE users SET password_hash = ? WHERE id = ?',
+                        (passwords.hasher.hash(new_password), current_user().id)
+                    )
+                    db.commit()
+                    auth.invalidate_user(current_user().id)
+                    success = 'Heslo bylo úspěšně změněno.'
+            except (passwords.LoginThrottled, passwords.HashingBusy) as e:
+                error = str(e)
     
     return render_template('change_password.html', error=error, success=success)
 
+# Nejvyšší počet dat pro hromadnou kopii jednoho tréninku
+COPY_DATES_MAX = 100
+
 # Kopírování tréninku
 @app.route('/api/workouts/<int:workout_id>/copy', methods=['POST'])
+@login_required
 def copy_workout(workout_id):
     db = get_db()
     
     try:
-        # Načtení zdrojového tréninku
-        source_workout = db.execute(
-            'SELECT date, training_type_id, notes, user_id FROM workouts WHERE id = ?',
-            (workout_id,)
-        ).fetchone()
-        
-        if source_workout is None:
+        # Kopírovat lze jen vlastní trénink (admin jakýkoli), i archivovaný
+        found = archive.find_workout_tier(db, workout_id)
+        if found is None or (not current_user().is_admin and found[1] != current_user().id):
             return jsonify({'success': False, 'error': 'Zdrojový trénink nenalezen'}), 404
-        
-        # Použijeme stejné user_id jako má původní trénink
-        # Nebo session['user_id'] pokud chceme vždy vytvářet kopii pro přihlášeného uživatele
-        user_id = source_workout['user_id']  # nebo session.get('user_id')
-        
-        # Vložení nového tréninku s dnešním datem
-        today = datetime.datetime.now().strftime('%Y-%m-%d')
-        db.execute(
-            'INSERT INTO workouts (date, training_type_id, notes, user_id) VALUES (?, ?, ?, ?)',
-            (today, source_workout['training_type_id'], source_workout['notes'], user_id)
-        )
-        db.commit()
-        
-        # Získání ID nového tréninku
-        new_workout_id = db.execute('SELECT last_insert_rowid()').fetchone()[0]
-        
-        # Kopírování cviků
-        exercises = db.execute(
-            'SELECT exercise_id, sets, reps, weight FROM workout_exercises WHERE workout_id = ?',
-            (workout_id,)
-        ).fetchall()
-        
-        for exercise in exercises:
-            db.execute(
-                '''INSERT INTO workout_exercises
-                (workout_id, exercise_id, sets, reps, weight)
-                VALUES (?, ?, ?, ?, ?)''',
-                (
-                    new_workout_id,
-                    exercise['exercise_id'],
-                    exercise['sets'],
-                    exercise['reps'],
-                    exercise['weight']
-                )
+
+        # Hromadná kopie na více dat ({"dates": [...]}) proběhne na pozadí
+        dates = (request.get_json(silent=True) or {}).get('dates')
+        if dates:
+            if not isinstance(dates, list) or len(dates) > COPY_DATES_MAX:
+                return jsonify({'success': False, 'error': f'Zadejte nejvýše {COPY_DATES_MAX} dat'}), 400
+            try:
+                dates = [datetime.datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d') for date in dates]
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'error': 'Neplatný formát data'}), 400
+            job_id, created = jobs.enqueue(
+                db, 'copy_workout', {'workout_id': workout_id, 'dates': dates}, current_user().id
             )
-        
-        db.commit()
+            return job_accepted(job_id, created)
+
+        # Nový trénink s dnešním datem a stejným vlastníkem jako původní
+        today = datetime.datetime.now().strftime('%Y-%m-%d')
+        new_workout_id = workout_store.copy_workout(db, workout_id, today)
+
+        if new_workout_id is None:
+            return jsonify({'success': False, 'error': 'Zdrojový trénink nenalezen'}), 404
+
         return jsonify({'success': True, 'id': new_workout_id}), 201
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
 if __name__ == '__main__':
+    # Vývojový server (WSGI). Asynchronní režim pro mnoho souběžných klientů: python asgi.py
     app.run(debug=True)
\ No newline at end of file
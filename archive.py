@@ -0,0 +1,279 @@
+"""
+Archiv starých tréninků aplikace Balift
+
+Tréninky starší než ARCHIVE_AFTER_DAYS dní se příkazem "flask
+archive-workouts" přesunou i s cviky a sériemi do samostatného souboru
+databáze (ARCHIVE_DATABASE). Ten se ke každému připojení připojí příkazem
+ATTACH jako schéma "archive" se stejně pojmenovanými tabulkami a indexy.
+V hlavní databázi tak zůstávají jen tréninky, se kterými se denně pracuje,
+a jejich indexy se vejdou do cache.
+
+Výpis, detail, kopírování a export tréninků a souhrnné statistiky čtou
+obě vrstvy - archiv jen tehdy, když do něj zasahuje požadovaný rozsah
+nebo ID. Archivované tréninky jsou jen pro čtení a nejsou ve fulltextovém
+vyhledávání ani v /api/sync.
+"""
+
+import datetime
+import json
+import sqlite3
+
+from database import transaction
+
+SCHEMA_NAME = 'archive'
+# Předpona tabulek pro dotazy přes vrstvy: '' je hlavní databáze
+TIERS = ('', f'{SCHEMA_NAME}.')
+
+# DDL archivu - stejné sloupce jako hlavní tabulky bez sloupců pro synchronizaci
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS workouts (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        training_type_id INTEGER,
+        notes TEXT,
+        user_id INTEGER,
+        version INTEGER NOT NULL DEFAULT 1,
+        updated_at TEXT,
+        archived_at TEXT NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS workout_exercises (
+        id INTEGER PRIMARY KEY,
+        workout_id INTEGER NOT NULL,
+        exercise_id INTEGER NOT NULL,
+        sets INTEGER NOT NULL,
+        reps TEXT NOT NULL,
+        weight TEXT NOT NULL
+    )''',
+    '''CREATE TABLE IF NOT EXISTS workout_sets (
+        id INTEGER PRIMARY KEY,
+        workout_exercise_id INTEGER NOT NULL,
+        set_number INTEGER NOT NULL,
+        reps INTEGER,
+        duration_s INTEGER,
+        weight_kg REAL
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_workouts_user_date ON workouts (user_id, date, id, training_type_id)',
+    'CREATE INDEX IF NOT EXISTS idx_workouts_date ON workouts (date, id, training_type_id, user_id)',
+    '''CREATE INDEX IF NOT EXISTS idx_workout_exercises_workout
+        ON workout_exercises (workout_id, exercise_id, sets, reps, weight)''',
+    'CREATE UNIQUE INDEX IF NOT EXISTS idx_workout_sets_exercise ON workout_sets (workout_exercise_id, set_number)',
+]
+
+# Soubory archivu, pro které už byly v tomto procesu vytvořeny tabulky
+_prepared = set()
+
+
+def create_tables(path):
+    """Vytvoří tabulky archivu v souboru path (pokud ještě neexistují)."""
+    db = sqlite3.connect(path, timeout=30)
+    try:
+        db.execute('PRAGMA journal_mode = wal')
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.commit()
+    finally:
+        db.close()
+
+
+def attachments(config):
+    """
+    Databáze připojované k novým připojením ({schéma: cesta}) podle
+    konfigurace. Při prvním použití souboru v procesu vytvoří jeho tabulky.
+    """
+    path = config.get('ARCHIVE_DATABASE')
+    if not path:
+        return {}
+    if path not in _prepared:
+        create_tables(path)
+        _prepared.add(path)
+    return {SCHEMA_NAME: path}
+
+
+def is_attached(db):
+    return db.execute(
+        'SELECT 1 FROM pragma_database_list WHERE name = ?', (SCHEMA_NAME,)
+    ).fetchone() is not None
+
+
+def tiers(db):
+    """Předpony tabulek vrstev, které je na tomto připojení možné číst."""
+    return TIERS if is_attached(db) else TIERS[:1]
+
+
+def boundary(db):
+    """Datum nejnovějšího archivovaného tréninku, nebo None (archiv není připojený nebo je prázdný)."""
+    if not is_attached(db):
+        return None
+    return db.execute(f'SELECT max(date) FROM {SCHEMA_NAME}.workouts').fetchone()[0]
+
+
+def reaches_archive(db, date_from=None, rows=None, limit=None):
+    """
+    Zda může výsledek dotazu na tréninky seřazené od nejnovějšího zasahovat
+    do archivu. rows je stránka načtená jen z hlavní databáze (limit + 1
+    řádků) - pokud je plná a její poslední řádek je novější než celý
+    archiv, archivní řádky by se na stránku nedostaly.
+    """
+    last_archived = boundary(db)
+    if last_archived is None:
+        return False
+    if date_from is not None and date_from > last_archived:
+        return False
+    if rows is not None and len(rows) > limit and rows[limit]['date'] > last_archived:
+        return False
+    return True
+
+
+def union_query(template, params, order_by, tiers=TIERS, limit=None):
+    """
+    Sestaví dotaz přes vrstvy. template je dotaz s {tier} před jmény tabulek
+    tréninků, order_by řazení podle výstupních sloupců (sloupce, které
+    se jmenují stejně v několika tabulkách dotazu, musí mít alias AS). Každá vrstva se
+    seřadí a omezí zvlášť přes své indexy, výsledky se pak jen spojí.
+    Vrací dvojici (SQL, parametry).
+    """
+    if len(tiers) == 1:
+        query = template.format(tier=tiers[0]) + f' ORDER BY {order_by}'
+        if limit is None:
+            return query, list(params)
+        return query + ' LIMIT ?', [*params, limit]
+
+    arms = []
+    all_params = []
+    for tier in tiers:
+        arm = template.format(tier=tier)
+        if limit is not None:
+            arm = f'SELECT * FROM ({arm} ORDER BY {order_by} LIMIT ?)'
+            all_params.extend((*params, limit))
+        else:
+            arm = f'SELECT * FROM ({arm})'
+            all_params.extend(params)
+        arms.append(arm)
+
+    query = ' UNION ALL '.join(arms) + f' ORDER BY {order_by}'
+    if limit is not None:
+        query += ' LIMIT ?'
+        all_params.append(limit)
+    return query, all_params
+
+
+def find_workout_tier(db, workout_id):
+    """Vrstva (předpona tabulek) a vlastník tréninku, nebo None pokud neexistuje."""
+    for tier in tiers(db):
+        row = db.execute(f'SELECT user_id FROM {tier}workouts WHERE id = ?', (workout_id,)).fetchone()
+        if row is not None:
+            return tier, row['user_id']
+    return None
+
+
+def is_archived(db, workout_id):
+    return is_attached(db) and db.execute(
+        f'SELECT 1 FROM {SCHEMA_NAME}.workouts WHERE id = ?', (workout_id,)
+    ).fetchone() is not None
+
+
+def exercise_in_use(db, exercise_id):
+    """Zda je cvik použit v některém archivovaném tréninku."""
+    return is_attached(db) and db.execute(
+        f'SELECT 1 FROM {SCHEMA_NAME}.workout_exercises WHERE exercise_id = ? LIMIT 1', (exercise_id,)
+    ).fetchone() is not None
+
+
+def _delete(db, schema, workout_ids):
+    """Smaže tréninky i s cviky a sériemi ze schématu main nebo archive."""
+    ids = json.dumps(workout_ids)
+    db.execute(
+        f'''DELETE FROM {schema}.workout_sets WHERE workout_exercise_id IN (
+            SELECT id FROM {schema}.workout_exercises WHERE workout_id IN (SELECT value FROM json_each(?))
+        )''',
+        (ids,)
+    )
+    db.execute(f'DELETE FROM {schema}.workout_exercises WHERE workout_id IN (SELECT value FROM json_each(?))', (ids,))
+    db.execute(f'DELETE FROM {schema}.workouts WHERE id IN (SELECT value FROM json_each(?))', (ids,))
+
+
+def archive_workouts(db, before, batch_size=500):
+    """
+    Přesune tréninky s datem před before (YYYY-MM-DD) do archivu po dávkách.
+    Každá dávka se nejprve zkopíruje a teprve v další transakci smaže
+    z hlavní databáze (transakce přes více souborů ve WAL režimu nejsou
+    atomické). Trénink, který se mezitím změnil nebo smazal, se z archivu
+    zase odebere a zkopíruje se znovu v další dávce. Záznamy o smazání pro
+    synchronizaci se u archivovaných tréninků nevytvářejí, klienti si
+    lokální kopie ponechají. Souhrnné statistiky se nemění, protože je
+    přepočet čte z obou vrstev. Generuje počet přesunutých tréninků po
+    každé dávce.
+    """
+    if not is_attached(db):
+        raise RuntimeError('Archiv není připojený (nastavte ARCHIVE_DATABASE)')
+    archived_at = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    while True:
+        with transaction(db):
+            ids = [row[0] for row in db.execute(
+                'SELECT id FROM main.workouts WHERE date < ? ORDER BY date, id LIMIT ?',
+                (before, batch_size)
+            )]
+            if not ids:
+                break
+            params = {'ids': json.dumps(ids), 'archived_at': archived_at}
+            # Po přerušeném běhu může být trénink už v archivu, kopie se přepíše
+            db.execute(
+                f'''INSERT OR REPLACE INTO {SCHEMA_NAME}.workouts
+                (id, date, training_type_id, notes, user_id, version, updated_at, archived_at)
+                SELECT id, date, training_type_id, notes, user_id, version, updated_at, :archived_at
+                FROM main.workouts WHERE id IN (SELECT value FROM json_each(:ids))''',
+                params
+            )
+            db.execute(
+                f'''INSERT OR REPLACE INTO {SCHEMA_NAME}.workout_exercises
+                (id, workout_id, exercise_id, sets, reps, weight)
+                SELECT id, workout_id, exercise_id, sets, reps, weight
+                FROM main.workout_exercises WHERE workout_id IN (SELECT value FROM json_each(:ids))''',
+                params
+            )
+            db.execute(
+                f'''INSERT OR REPLACE INTO {SCHEMA_NAME}.workout_sets
+                (id, workout_exercise_id, set_number, reps, duration_s, weight_kg)
+                SELECT ws.id, ws.workout_exercise_id, ws.set_number, ws.reps, ws.duration_s, ws.weight_kg
+                FROM main.workout_sets ws
+                JOIN main.workout_exercises we ON we.id = ws.workout_exercise_id
+                WHERE we.workout_id IN (SELECT value FROM json_each(:ids))''',
+                params
+            )
+
+        with transaction(db):
+            # Každá úprava tréninku zvyšuje jeho verzi
+            moved = [row[0] for row in db.execute(
+                f'''SELECT w.id FROM main.workouts w
+                JOIN {SCHEMA_NAME}.workouts a ON a.id = w.id AND a.version = w.version
+                WHERE w.id IN (SELECT value FROM json_each(?))''',
+                (json.dumps(ids),)
+            )]
+            changed = sorted(set(ids) - set(moved))
+            if changed:
+                _delete(db, SCHEMA_NAME, changed)
+
+            # Triggery mazání zapíší záznamy pro synchronizaci, ty v této transakci zase odstraníme
+            seq = db.execute('SELECT seq FROM sync_clock WHERE id = 1').fetchone()[0]
+            _delete(db, 'main', moved)
+            db.execute('DELETE FROM sync_tombstones WHERE change_seq > ?', (seq,))
+        yield len(moved)
+
+
+def clear(path):
+    """Vytvoří chybějící tabulky archivu v souboru path a smaže jejich obsah (nová inicializace databáze)."""
+    create_tables(path)
+    db = sqlite3.connect(path, timeout=30)
+    try:
+        for table in ('workout_sets', 'workout_exercises', 'workouts'):
+            db.execute(f'DELETE FROM {table}')
+        db.commit()
+    finally:
+        db.close()
+
+
+def init_app(app):
+    app.config.setdefault('ARCHIVE_DATABASE', None)
+    app.config.setdefault('ARCHIVE_AFTER_DAYS', 365)
+    app.config.setdefault('ARCHIVE_BATCH_SIZE', 500)
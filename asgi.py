@@ -0,0 +1,221 @@
+"""
+Asynchronní (ASGI) vstupní bod aplikace Balift
+
+Pomalí klienti (mobilní sítě) v režimu WSGI drží worker po celou dobu
+odesílání požadavku i čtení odpovědi. Tento adaptér čte tělo požadavku
+a posílá odpověď asynchronně v event loopu; samotná Flask aplikace
+(stejné routy i dotazy) běží v omezeném poolu vláken jen po dobu
+zpracování. Jeden proces tak udrží mnoho otevřených spojení, přičemž
+počet souběžných SQLite připojení odpovídá velikosti poolu.
+
+Spuštění (vyžaduje ASGI server, např. uvicorn):
+    uvicorn asgi:application
+    python asgi.py [--host 127.0.0.1] [--port 8000]
+"""
+
+import asyncio
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from app import app
+
+# Odpovědi se posílají po částech přes frontu omezené délky
+RESPONSE_QUEUE_SIZE = 16
+# Tělo požadavku do této velikosti zůstává v paměti, větší jde do dočasného souboru
+SPOOL_SIZE = 1024 * 1024
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class WsgiToAsgi:
+    """
+    ASGI aplikace nad WSGI aplikací. Každý požadavek (volání aplikace
+    i čtení odpovědi) běží celý v jednom vlákně poolu, protože připojení
+    k databázi jsou vázaná na vlákno (database.ConnectionManager).
+    """
+
+    def __init__(self, wsgi_app, max_workers=16, max_body_size=64 * 1024 * 1024):
+        self.wsgi_app = wsgi_app
+        self.max_body_size = max_body_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        # Ostatní typy spojení (websocket) aplikace nepodporuje
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_size:
+                raise RequestTooLarge()
+            body.write(chunk)
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body, size
+
+    async def _http(self, scope, receive, send):
+        try:
+            body, size = await self._read_body(receive)
+        except ClientDisconnected:
+            return
+        except RequestTooLarge:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+            await send({'type': 'http.response.body', 'body': 'Požadavek je příliš velký'.encode('utf-8')})
+            return
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=RESPONSE_QUEUE_SIZE)
+        closed = threading.Event()
+        environ = build_environ(scope, body, size)
+        worker = loop.run_in_executor(self.executor, self._run, environ, loop, queue, closed)
+
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                if not closed.is_set():
+                    try:
+                        await send(message)
+                    except Exception:
+                        # Klient se odpojil - vlákno přestane číst odpověď
+                        closed.set()
+            await worker
+        finally:
+            body.close()
+
+    def _run(self, environ, loop, queue, closed):
+        """Zpracování požadavku ve vlákně poolu, zprávy pro klienta jdou do fronty."""
+
+        def put(message):
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers
+            ]
+
+        try:
+            iterable = self.wsgi_app(environ, start_response)
+            try:
+                put({'type': 'http.response.start', 'status': response['status'],
+                     'headers': response['headers']})
+                for chunk in iterable:
+                    if closed.is_set():
+                        break
+                    if chunk:
+                        put({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                put({'type': 'http.response.body', 'body': b''})
+            finally:
+                # Flask při zavření odpovědi spouští teardown (uvolnění připojení)
+                if hasattr(iterable, 'close'):
+                    iterable.close()
+        except Exception:
+            app.logger.exception('Chyba při zpracování ASGI požadavku')
+            if 'status' not in response:
+                put({'type': 'http.response.start', 'status': 500,
+                     'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+                put({'type': 'http.response.body', 'body': b'Internal Server Error'})
+        finally:
+            put(None)
+
+
+def build_environ(scope, body, size):
+    """WSGI environ z ASGI scope (PEP 3333)."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    # PATH_INFO je dekódovaná cesta (bajty UTF-8 jako latin-1), raw_path se
+    # zachová jen v REQUEST_URI
+    path = scope['path']
+    root_path = scope.get('root_path', '')
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    query_string = scope.get('query_string', b'').decode('latin-1')
+    raw_path = scope.get('raw_path')
+    request_uri = raw_path.split(b'?', 1)[0].decode('latin-1') if raw_path else quote(scope['path'])
+    if query_string:
+        request_uri += '?' + query_string
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': query_string,
+        'REQUEST_URI': request_uri,
+        'RAW_URI': request_uri,
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(size),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+application = WsgiToAsgi(app, app.config['ASYNC_WORKERS'], app.config['ASYNC_MAX_BODY'])
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Balift v asynchronním (ASGI) režimu')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit('Asynchronní režim vyžaduje ASGI server: pip install uvicorn')
+    uvicorn.run(application, host=args.host, port=args.port)
@@ -0,0 +1,324 @@
+"""
+Sestavení statických souborů (CSS, JS) aplikace Balift
+
+"flask build-assets" spojí soubory do balíčků (BUNDLES), zmenší je,
+uloží pod jménem s otiskem obsahu (static/dist/js/app.3f2a1b9c0d.js)
+spolu s předkomprimovanými variantami .gz a .br a zapíše manifest
+(static/dist/manifest.json). Šablony odkazují na soubory přes
+asset_url('static', filename=...) se stejnými parametry jako url_for.
+Podle manifestu se vrátí adresa sestaveného souboru, který se posílá
+s hlavičkou Cache-Control: immutable. Bez sestavení (vývoj) se balíčky
+skládají za běhu ze zdrojových souborů.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import current_app, request, send_file, url_for, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Balíčky - výstupní jméno a zdrojové soubory ve static/ v pořadí načtení
+BUNDLES = {
+    'css/style.css': ['css/style.css'],
+    'js/app.js': ['js/catalog.js', 'js/sync.js', 'js/main.js'],
+    'js/workout.js': ['js/workout.js'],
+}
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 10
+# Sestavené soubory se podle jména nikdy nemění
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class AssetManifest:
+    """Mapování jmen balíčků na sestavené soubory, načtené z manifestu."""
+
+    def __init__(self):
+        self.files = {}
+
+    def load(self, static_folder):
+        path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.files = json.load(f)
+        except FileNotFoundError:
+            self.files = {}
+
+    def lookup(self, filename):
+        return self.files.get(filename)
+
+
+manifest = AssetManifest()
+
+
+def _minify_css(source):
+    """Odstraní komentáře a nadbytečné mezery (ne uvnitř řetězců)."""
+    out = []
+    i = 0
+    length = len(source)
+    while i < length:
+        char = source[i]
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+            continue
+        if char in '"\'':
+            end = i + 1
+            while end < length and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            out.append(source[i:end + 1])
+            i = end + 1
+            continue
+        if char.isspace():
+            while i < length and source[i].isspace():
+                i += 1
+            # Mezera před dvojtečkou zůstává (selektor "a :hover" není "a:hover")
+            if out and out[-1][-1:] not in '{};:,>' and i < length and source[i] not in '{};,>)':
+                out.append(' ')
+            continue
+        out.append(char)
+        i += 1
+    return ''.join(out).strip() + '\n'
+
+
+# Po těchto znacích začíná lomítkem regulární výraz, ne dělení
+_REGEX_PREFIX = '(,=:[!&|?{};+-*%<>~^'
+
+
+def _string_end(source, i):
+    """Index uzavírací uvozovky řetězce začínajícího na i (včetně ${...} v šablonovém řetězci)."""
+    quote = source[i]
+    j = i + 1
+    while j < len(source):
+        char = source[j]
+        if char == '\\':
+            j += 2
+            continue
+        if char == quote:
+            return j
+        if quote == '`' and source.startswith('${', j):
+            j = _expression_end(source, j + 2)
+        j += 1
+    return len(source) - 1
+
+
+def _expression_end(source, j):
+    """Index složené závorky, která uzavírá výraz ${...}."""
+    depth = 0
+    while j < len(source):
+        char = source[j]
+        if char in '"\'`':
+            j = _string_end(source, j) + 1
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            if depth == 0:
+                return j
+            depth -= 1
+        j += 1
+    return len(source) - 1
+
+
+def _regex_end(source, i):
+    """Index posledního příznaku regulárního výrazu začínajícího lomítkem na i."""
+    j = i + 1
+    in_class = False
+    while j < len(source):
+        char = source[j]
+        if char == '\\':
+            j += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            break
+        j += 1
+    while j + 1 < len(source) and source[j + 1].isalpha():
+        j += 1
+    return j
+
+
+def _word_char(char):
+    return char.isalnum() or char in '_$' or ord(char) > 127
+
+
+def _minify_js(source):
+    """
+    Konzervativní zmenšení JS: odstraní komentáře, odsazení a prázdné
+    řádky. Konce řádků zůstávají (automatické středníky), řetězce,
+    šablonové řetězce a regulární výrazy se nemění.
+    """
+    out = []
+    i = 0
+    length = len(source)
+    last = ''  # poslední významný znak výstupu
+
+    while i < length:
+        char = source[i]
+
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = length if end == -1 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+            continue
+
+        if char in '"\'`' or (char == '/' and (last == '' or last in _REGEX_PREFIX)):
+            end = _string_end(source, i) if char != '/' else _regex_end(source, i)
+            out.append(source[i:end + 1])
+            last = source[end]
+            i = end + 1
+            continue
+
+        if char.isspace():
+            start = i
+            while i < length and source[i].isspace():
+                i += 1
+            if not out or i >= length:
+                continue
+            following = source[i]
+            if '\n' in source[start:i]:
+                if out[-1] != '\n':
+                    out.append('\n')
+            elif (_word_char(last) and _word_char(following)) or (last in '+-' and following == last):
+                # Mezera mezi slovy (return x) a mezi "+ +" / "- -" je nutná
+                out.append(' ')
+            continue
+
+        out.append(char)
+        last = char
+        i += 1
+
+    return ''.join(out).strip() + '\n'
+
+
+def _minify(name, source):
+    if name.endswith('.css'):
+        return _minify_css(source)
+    if name.endswith('.js'):
+        return _minify_js(source)
+    return source
+
+
+def bundle_source(static_folder, name):
+    """Spojí zdrojové soubory balíčku (bez zmenšení)."""
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            parts.append(f.read().rstrip() + '\n')
+    # Středník mezi soubory, aby se výrazy na rozhraní nespojily
+    return ';\n'.join(parts) if name.endswith('.js') else '\n'.join(parts)
+
+
+def _hashed_name(name, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest}{ext}'
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def build(static_folder, minify=True):
+    """
+    Sestaví všechny balíčky do static/dist a zapíše manifest. Předchozí
+    sestavení se smaže. Vrací seznam n-tic (balíček, soubor, velikost,
+    velikost .gz, velikost .br nebo None).
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+
+    files = {}
+    results = []
+    for name in BUNDLES:
+        source = bundle_source(static_folder, name)
+        content = (_minify(name, source) if minify else source).encode('utf-8')
+        hashed = _hashed_name(name, content)
+        path = os.path.join(dist, hashed)
+
+        _write(path, content)
+        # mtime=0 - stejný obsah dá vždy stejný .gz soubor
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        _write(path + '.gz', compressed)
+        br_size = None
+        if brotli is not None:
+            br = brotli.compress(content, quality=11)
+            _write(path + '.br', br)
+            br_size = len(br)
+
+        files[name] = f'{DIST_DIR}/{hashed}'
+        results.append((name, files[name], len(content), len(compressed), br_size))
+
+    _write(os.path.join(dist, MANIFEST_NAME), json.dumps(files, indent=2).encode('utf-8'))
+    manifest.files = files
+    return results
+
+
+def asset_url(endpoint, **values):
+    """
+    Stejné parametry jako url_for. Pro statické soubory vrátí adresu
+    sestavené verze z manifestu, pokud existuje.
+    """
+    if endpoint == 'static' and 'filename' in values:
+        built = manifest.lookup(values['filename'])
+        if built:
+            values['filename'] = built
+    return url_for(endpoint, **values)
+
+
+def _send_built(static_folder, filename):
+    """Sestavený soubor - předkomprimovaná varianta podle Accept-Encoding, trvalá cache."""
+    path = os.path.join(static_folder, filename)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in request.accept_encodings and os.path.isfile(path + suffix):
+            encoding, path = candidate, path + suffix
+            break
+
+    response = send_file(path, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def serve_static(filename):
+    """Náhrada výchozí routy /static/<filename>."""
+    app = current_app
+    if filename.startswith(f'{DIST_DIR}/') and filename in manifest.files.values():
+        return _send_built(app.static_folder, filename)
+
+    # Nesestavený balíček (vývoj) - složí se ze zdrojových souborů při každém požadavku
+    if filename in BUNDLES and not os.path.isfile(os.path.join(app.static_folder, filename)):
+        mimetype = mimetypes.guess_type(filename)[0]
+        response = Response(bundle_source(app.static_folder, filename), mimetype=mimetype)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    return app.send_static_file(filename)
+
+
+def init_app(app):
+    manifest.load(app.static_folder)
+    app.view_functions['static'] = serve_static
+    app.jinja_env.globals['asset_url'] = asset_url
@@ -1,21 +1,157 @@
 """
 Modul pro správu autentizace uživatelů v aplikaci Balift
+
+Jediná autentizační vrstva aplikace. Přihlášený uživatel (Principal) se
+zjišťuje ze session nebo z podepsaného API tokenu v hlavičce
+Authorization: Bearer a drží se v malé TTL/LRU cache, takže chráněné
+routy nedotazují tabulku users při každém požadavku. Cache se zneplatňuje
+při změnách uživatelů v tomto procesu, změny z jiných procesů se projeví
+nejpozději po AUTH_CACHE_TTL sekundách.
 """
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from functools import wraps
-from flask import session, redirect, url_for, flash, g, request, current_app
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask import session, redirect, url_for, flash, g, request, current_app, jsonify
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+Principal = namedtuple('Principal', ['id', 'username', 'is_admin', 'token_key'])
+
+TOKEN_SALT = 'balift-api-token'
+
+class PrincipalCache:
+    """
+    Cache uživatelů podle ID s omezenou dobou platnosti a velikostí.
+    Ukládá i informaci, že uživatel neexistuje (None).
+    """
+
+    def __init__(self, ttl=60, max_size=1024):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.configure(ttl, max_size)
+
+    def configure(self, ttl, max_size):
+        with self._lock:
+            self.ttl = ttl
+            self.max_size = max_size
+            self._entries.clear()
+
+    def get(self, user_id, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+
+        principal = loader(user_id)
+        with self._lock:
+            self._entries[user_id] = (principal, now + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_id=None):
+        """Zahodí jednoho uživatele, nebo celou cache."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+principal_cache = PrincipalCache()
+
+def init_app(app):
+    """Nastaví cache uživatelů a platnost API tokenů podle konfigurace aplikace."""
+    app.config.setdefault('AUTH_CACHE_TTL', 60)
+    app.config.setdefault('AUTH_CACHE_SIZE', 1024)
+    app.config.setdefault('API_TOKEN_MAX_AGE', 30 * 24 * 3600)
+    principal_cache.configure(app.config['AUTH_CACHE_TTL'], app.config['AUTH_CACHE_SIZE'])
+
+def _token_key(password_hash):
+    # Otisk hashe hesla - změnou hesla přestanou platit všechny vydané tokeny
+    return hashlib.sha256(password_hash.encode('utf-8')).hexdigest()[:16]
+
+def _load_principal(user_id):
+    user = get_db().execute(
+        'SELECT id, username, is_admin, password_hash FROM users WHERE id = ?', (user_id,)
+    ).fetchone()
+    if user is None:
+        return None
+    return Principal(user['id'], user['username'], bool(user['is_admin']), _token_key(user['password_hash']))
+
+def get_principal(user_id):
+    """Vrátí Principal uživatele z cache (případně z databáze), nebo None."""
+    return principal_cache.get(user_id, _load_principal)
+
+def invalidate_user(user_id=None):
+    """Volá se po každé změně řádku v tabulce users."""
+    principal_cache.invalidate(user_id)
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.secret_key, salt=TOKEN_SALT)
+
+def create_api_token(principal):
+    """Podepsaný token pro skripty a nástroje bez cookie session."""
+    return _serializer().dumps({'uid': principal.id, 'key': principal.token_key})
+
+def principal_from_token(token):
+    """Ověří podpis, stáří a otisk hesla tokenu, vrací Principal nebo None."""
+    try:
+        data = _serializer().loads(token, max_age=current_app.config['API_TOKEN_MAX_AGE'])
+    except (BadSignature, SignatureExpired):
+        return None
+    principal = get_principal(data.get('uid'))
+    if principal is None or principal.token_key != data.get('key'):
+        return None
+    return principal
+
+def _resolve_principal():
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return principal_from_token(header[7:].strip())
+
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    principal = get_principal(user_id)
+    if principal is None:
+        # Uživatel mezitím zanikl
+        session.clear()
+    return principal
+
+def current_user():
+    """Přihlášený uživatel aktuálního požadavku (zjišťuje se jednou za požadavek)."""
+    if 'user' not in g:
+        g.user = _resolve_principal()
+    return g.user
+
+def login_user(principal):
+    """Založí novou session pro uživatele (údaje v session slouží šablonám)."""
+    session.clear()
+    session['user_id'] = principal.id
+    session['username'] = principal.username
+    session['is_admin'] = principal.is_admin
+
+def _wants_json():
+    return request.path.startswith('/api/') or 'Authorization' in request.headers
 
 def login_required(f):
     """
     Dekorátor, který zajistí, že funkce bude přístupná jen přihlášeným uživatelům.
+    API požadavky dostanou 401, stránky přesměrování na přihlášení.
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if current_user() is None:
+            if _wants_json():
+                return jsonify({'success': False, 'error': 'Nejste přihlášeni'}), 401
             flash('Pro přístup na tuto stránku se musíte přihlásit.', 'warning')
             # Uložíme původní URL, abychom se po přihlášení mohli vrátit
-            session['next_url'] = request.url
+            session['next_url'] = request.full_path if request.query_string else request.path
             return redirect(url_for('login'))
         return f(*args, **kwargs)
     return decorated_function
@@ -23,22 +159,16 @@ def login_required(f):
 def admin_required(f):
     """
     Dekorátor, který zajistí, že funkce bude přístupná jen administrátorům.
+    Oprávnění se bere z tabulky users (přes cache), ne z obsahu session.
     """
     @wraps(f)
+    @login_required
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Pro přístup na tuto stránku se musíte přihlásit.', 'warning')
-            session['next_url'] = request.url
-            return redirect(url_for('login'))
-        
-        # Získání informací o uživateli
-        db = get_db()
-        user = db.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],)).fetchone()
-        
-        if not user or not user['is_admin']:
+        if not current_user().is_admin:
+            if _wants_json():
+                return jsonify({'success': False, 'error': 'Vyžadována administrátorská práva'}), 403
             flash('Pro přístup na tuto stránku potřebujete administrátorská práva.', 'danger')
             return redirect(url_for('index'))
-            
         return f(*args, **kwargs)
     return decorated_function
 
@@ -50,103 +180,3 @@ def get_db():
         from app import get_db as app_get_db
         return app_get_db()
     return g.db
-
-def authenticate_user(username, password):
-    """
-    Ověří přihlašovací údaje uživatele.
-    Vrací dvojici (user_id, is_admin) pokud je autentizace úspěšná, jinak (None, None).
-    """
-    db = get_db()
-    user = db.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-    
-    if user and check_password_hash(user['password_hash'], password):
-        return user['id'], user['is_admin']
-        
-    return None, None
-
-def register_user(username, password, is_admin=False):
-    """
-    Zaregistruje nového uživatele.
-    Vrací user_id v případě úspěchu, jinak None.
-    """
-    # Kontrola délky hesla
-    if len(password) < 6:
-        return None, "Heslo musí mít alespoň 6 znaků."
-        
-    db = get_db()
-    
-    try:
-        # Kontrola, zda uživatel již existuje
-        existing_user = db.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
-        if existing_user:
-            return None, "Uživatelské jméno již existuje."
-            
-        # Vytvoření hash hesla
-        password_hash = generate_password_hash(password)
-        
-        # Vložení uživatele do databáze
-        db.execute(
-            'INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)',
-            (username, password_hash, is_admin)
-        )
-        db.commit()
-        
-        # Získání ID nového uživatele
-        user_id = db.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()['id']
-        return user_id, None
-        
-    except Exception as e:
-        db.rollback()
-        current_app.logger.error(f"Chyba při registraci: {e}")
-        return None, "Chyba při registraci uživatele."
-
-def change_password(user_id, old_password, new_password):
-    """
-    Změní heslo uživatele.
-    Vrací True v případě úspěchu, jinak False.
-    """
-    # Kontrola délky nového hesla
-    if len(new_password) < 6:
-        return False, "Nové heslo musí mít alespoň 6 znaků."
-        
-    db = get_db()
-    
-    # Získání uživatele
-    user = db.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-    if not user:
-        return False, "Uživatel neexistuje."
-        
-    # Ověření starého hesla
-    if not check_password_hash(user['password_hash'], old_password):
-        return False, "Staré heslo není správné."
-        
-    try:
-        # Vytvoření hash nového hesla
-        new_password_hash = generate_password_hash(new_password)
-        
-        # Aktualizace hesla
-        db.execute(
-            'UPDATE users SET password_hash = ? WHERE id = ?',
-            (new_password_hash, user_id)
-        )
-        db.commit()
-        return True, "Heslo bylo úspěšně změněno."
-        
-    except Exception as e:
-        db.rollback()
-        current_app.logger.error(f"Chyba při změně hesla: {e}")
-        return False, "Chyba při změně hesla."
-
-def get_user_by_id(user_id):
-    """
-    Získá informace o uživateli podle ID.
-    """
-    db = get_db()
-    return db.execute('SELECT id, username, is_admin, created_at FROM users WHERE id = ?', (user_id,)).fetchone()
-
-def get_all_users():
-    """
-    Získá seznam všech uživatelů (pouze pro administrátora).
-    """
-    db = get_db()
-    return db.execute('SELECT id, username, is_admin, created_at FROM users ORDER BY username').fetchall()
\ No newline at end of file
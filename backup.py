@@ -0,0 +1,226 @@
+"""
+Zálohování databáze aplikace Balift za běhu
+
+Záloha používá online backup API SQLite: stránky databáze se kopírují po
+malých dávkách (BACKUP_PAGES) s krátkou pauzou mezi dávkami, takže
+běžící požadavky (čtení i zápisy ve WAL režimu) nejsou blokované po celou
+dobu kopírování. Každá záloha se před uložením ověří (integrity_check,
+foreign_key_check) a nejstarší zálohy nad limit se mažou.
+
+Záloha se spouští příkazem "flask backup-db" nebo vláknem na pozadí
+(BACKUP_INTERVAL > 0), obnova příkazem "flask restore-db".
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger('balift.backup')
+
+FILE_PREFIX = 'balift-'
+FILE_SUFFIX = '.sqlite'
+# Mikrosekundy - dvě zálohy ve stejné sekundě nesmí dostat stejné jméno
+TIMESTAMP_FORMAT = '%Y%m%d-%H%M%S-%f'
+
+DEFAULT_PAGES = 256
+DEFAULT_SLEEP = 0.05
+
+
+class BackupError(Exception):
+    pass
+
+
+def _connect(path):
+    db = sqlite3.connect(path, timeout=30)
+    db.execute('PRAGMA busy_timeout = 30000')
+    return db
+
+
+def verify(path):
+    """
+    Ověří soubor zálohy. Vrací seznam problémů (prázdný seznam znamená,
+    že je záloha v pořádku).
+    """
+    db = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        problems = [row[0] for row in db.execute('PRAGMA integrity_check') if row[0] != 'ok']
+        problems += [
+            f'Porušený cizí klíč v tabulce {row[0]} (rowid {row[1]})'
+            for row in db.execute('PRAGMA foreign_key_check')
+        ]
+        return problems
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        db.close()
+
+
+def list_backups(backup_dir):
+    """Cesty k zálohám v adresáři od nejnovější."""
+    if not os.path.isdir(backup_dir):
+        return []
+    names = [
+        name for name in os.listdir(backup_dir)
+        if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)
+    ]
+    # Časové razítko v názvu se řadí stejně jako čas
+    return [os.path.join(backup_dir, name) for name in sorted(names, reverse=True)]
+
+
+def rotate(backup_dir, keep, max_age_days=None):
+    """
+    Smaže zálohy nad počet keep (nejstarší) a zálohy starší než
+    max_age_days dní. Nejnovější záloha zůstane vždy. Vrací smazané cesty.
+    """
+    backups = list_backups(backup_dir)
+    removed = backups[max(keep, 1):]
+    if max_age_days is not None:
+        cutoff = time.time() - max_age_days * 24 * 3600
+        removed += [path for path in backups[1:max(keep, 1)] if os.path.getmtime(path) < cutoff]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def create_backup(database, backup_dir, pages=DEFAULT_PAGES, sleep=DEFAULT_SLEEP, keep=7,
+                  max_age_days=None):
+    """
+    Vytvoří ověřenou zálohu databáze do backup_dir a provede rotaci.
+    Vrací cestu k záloze. Při chybě ověření zálohu smaže a vyhodí BackupError.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime(TIMESTAMP_FORMAT)
+    path = os.path.join(backup_dir, f'{FILE_PREFIX}{stamp}{FILE_SUFFIX}')
+    partial = path + '.part'
+
+    # Exkluzivní vytvoření - souběžná záloha z jiného procesu se nespustí dvakrát
+    try:
+        open(partial, 'x').close()
+    except FileExistsError:
+        raise BackupError(f'Záloha {os.path.basename(path)} už probíhá')
+
+    try:
+        source = _connect(database)
+        target = sqlite3.connect(partial)
+        try:
+            # Po každých pages stránkách se zámek uvolní a vlákno na chvíli uspí
+            source.backup(target, pages=pages, sleep=sleep)
+            # Záloha má být jeden soubor bez -wal
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.close()
+
+        problems = verify(partial)
+        if problems:
+            raise BackupError('Záloha neprošla kontrolou: ' + '; '.join(problems[:5]))
+        # Na rozdíl od os.replace existující zálohu nikdy nepřepíše
+        try:
+            os.link(partial, path)
+        except FileExistsError:
+            raise BackupError(f'Záloha {os.path.basename(path)} už existuje')
+        os.remove(partial)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    rotate(backup_dir, keep, max_age_days)
+    return path
+
+
+def restore_backup(backup_path, database, backup_dir=None):
+    """
+    Obnoví databázi ze zálohy. Záloha se nejprve ověří a pokud je zadán
+    backup_dir, uloží se do něj ještě záloha současného stavu. Kopírování
+    proběhne najednou v jedné transakci, běžící aplikace tak uvidí buď
+    starý, nebo nový stav. Vrací cestu k záloze současného stavu (nebo None).
+    """
+    problems = verify(backup_path)
+    if problems:
+        raise BackupError('Záloha neprošla kontrolou: ' + '; '.join(problems[:5]))
+
+    # Zdroj otevřeme ještě před zálohou současného stavu
+    source = sqlite3.connect(f'file:{backup_path}?mode=ro', uri=True)
+    try:
+        safety = None
+        if backup_dir and os.path.exists(database):
+            # Nová záloha dostane vždy nové jméno, obnovovaný soubor nepřepíše
+            safety = create_backup(database, backup_dir, keep=len(list_backups(backup_dir)) + 1)
+
+        target = _connect(database)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+    return safety
+
+
+class BackupScheduler:
+    """Vlákno na pozadí, které zálohuje databázi každých interval sekund."""
+
+    def __init__(self):
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self, options, interval):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(
+            target=self._run, args=(options, interval), name='balift-backup', daemon=True
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self, options, interval):
+        while not self.stop_event.wait(interval):
+            # Více procesů serveru - záloha, kterou už vytvořil jiný proces, stačí
+            backups = list_backups(options['backup_dir'])
+            if backups and time.time() - os.path.getmtime(backups[0]) < interval * 0.9:
+                continue
+            try:
+                path = create_backup(**options)
+                logger.info('Záloha databáze uložena do %s', path)
+            except BackupError as e:
+                logger.warning('%s', e)
+            except Exception:
+                logger.exception('Záloha databáze selhala')
+
+
+scheduler = BackupScheduler()
+
+
+def options_from_config(config):
+    """Parametry create_backup z konfigurace aplikace."""
+    return {
+        'database': config['DATABASE'],
+        'backup_dir': config['BACKUP_DIR'],
+        'pages': config['BACKUP_PAGES'],
+        'sleep': config['BACKUP_SLEEP'],
+        'keep': config['BACKUP_KEEP'],
+        'max_age_days': config['BACKUP_MAX_AGE_DAYS'],
+    }
+
+
+def init_app(app):
+    """Nastaví výchozí konfiguraci a případně spustí pravidelné zálohování."""
+    app.config.setdefault('BACKUP_DIR', os.path.join(app.instance_path, 'backups'))
+    app.config.setdefault('BACKUP_INTERVAL', 0)
+    app.config.setdefault('BACKUP_KEEP', 7)
+    app.config.setdefault('BACKUP_MAX_AGE_DAYS', None)
+    app.config.setdefault('BACKUP_PAGES', DEFAULT_PAGES)
+    app.config.setdefault('BACKUP_SLEEP', DEFAULT_SLEEP)
+
+    if app.config['BACKUP_INTERVAL'] > 0:
+        scheduler.start(options_from_config(app.config), app.config['BACKUP_INTERVAL'])
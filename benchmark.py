@@ -0,0 +1,305 @@
+"""
+Benchmark API aplikace Balift
+
+Vytvoří databázi se syntetickými daty (N uživatelů × M tréninků × K cviků)
+podle stávajícího schématu a měří skutečné endpointy přes Flask test client.
+Výsledek (percentily latencí a propustnost) se vypisuje jako JSON, aby šly
+běhy porovnávat mezi commity.
+
+Příklad:
+    python benchmark.py --users 5 --workouts 500 --exercises 6 --requests 200 --concurrency 8 --output bench.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+from app import app, get_db, init_db
+import workout_store
+
+PASSWORD = 'benchmark'
+REPS_PATTERNS = ['10-8-6', '12-10-8', '12-10-8-6', '8-8-8', '15', '3x10', '5x5', '60s-45s-30s', '30s', '1:30', '20-15-12']
+WEIGHT_PATTERNS = ['60-70-80', '40-50-60-70', '100', '22,5-25-27,5', '0', 'BW', '12-14-16', '80-85-90', '+10', '5']
+
+# Měřené scénáře, implementace je v Client.request
+SCENARIOS = ['workouts_legacy', 'workouts_page', 'workout_detail', 'workout_create',
+             'workout_update', 'workout_copy', 'training_types', 'exercise_categories',
+             'exercises', 'exercises_by_category', 'catalog']
+
+
+def random_exercises(rng, exercise_ids, count):
+    return [
+        {
+            'exercise_id': rng.choice(exercise_ids),
+            'sets': rng.randint(1, 5),
+            'reps': rng.choice(REPS_PATTERNS),
+            'weight': rng.choice(WEIGHT_PATTERNS),
+        }
+        for _ in range(count)
+    ]
+
+
+def seed(users, workouts, exercises, seed_value=42):
+    """Inicializuje databázi a naplní ji syntetickými daty. Vrací seznam ID uživatelů."""
+    rng = random.Random(seed_value)
+    password_hash = generate_password_hash(PASSWORD)
+
+    with app.app_context():
+        init_db()
+        db = get_db()
+        db.execute("DELETE FROM users WHERE username LIKE 'bench%'")
+        db.executemany(
+            'INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, 0)',
+            [(f'bench{i}', password_hash) for i in range(users)]
+        )
+        db.commit()
+        user_ids = [row['id'] for row in db.execute("SELECT id FROM users WHERE username LIKE 'bench%' ORDER BY id")]
+        exercise_ids = [row['id'] for row in db.execute('SELECT id FROM exercises')]
+        type_ids = [row['id'] for row in db.execute('SELECT id FROM training_types')]
+
+        start_date = datetime.date.today() - datetime.timedelta(days=workouts * 2)
+        for user_id in user_ids:
+            batch = []
+            for index in range(workouts):
+                date = start_date + datetime.timedelta(days=index * 2 + rng.randint(0, 1))
+                batch.append({
+                    'date': date.strftime('%Y-%m-%d'),
+                    'training_type_id': rng.choice(type_ids),
+                    'notes': rng.choice(['', '', 'Dobrý trénink', 'Bolí rameno', 'Nový osobní rekord']),
+                    'exercises': random_exercises(rng, exercise_ids, exercises),
+                })
+                if len(batch) >= 500:
+                    workout_store.create_workouts(db, user_id, batch)
+                    batch = []
+            if batch:
+                workout_store.create_workouts(db, user_id, batch)
+        db.execute('ANALYZE')
+        db.commit()
+    return user_ids
+
+
+class Client:
+    """Přihlášený test client jednoho uživatele s vlastním generátorem náhodných čísel."""
+
+    def __init__(self, username, seed_value):
+        self.client = app.test_client()
+        self.rng = random.Random(seed_value)
+        response = self.client.post('/login', data={'username': username, 'password': PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f'Přihlášení uživatele {username} selhalo')
+        self.workout_ids = [w['id'] for w in self.client.get('/api/workouts').get_json()]
+        catalog = self.client.get('/api/catalog').get_json()
+        self.exercise_ids = [e['id'] for e in catalog['exercises']]
+        self.category_ids = [c['id'] for c in catalog['exercise_categories']]
+        self.type_ids = [t['id'] for t in catalog['training_types']]
+
+    def _workout_body(self):
+        return {
+            'date': datetime.date.today().strftime('%Y-%m-%d'),
+            'training_type_id': self.rng.choice(self.type_ids),
+            'notes': 'benchmark',
+            'exercises': random_exercises(self.rng, self.exercise_ids, 6),
+        }
+
+    def request(self, scenario):
+        """Provede jeden požadavek scénáře, vrací stavový kód."""
+        c = self.client
+        if scenario == 'workouts_legacy':
+            return c.get('/api/workouts').status_code
+        if scenario == 'workouts_page':
+            return c.get('/api/workouts?limit=50').status_code
+        if scenario == 'workout_detail':
+            return c.get(f'/api/workouts/{self.rng.choice(self.workout_ids)}').status_code
+        if scenario == 'workout_create':
+            response = c.post('/api/workouts', json=self._workout_body())
+            if response.status_code == 201:
+                self.workout_ids.append(response.get_json()['id'])
+            return response.status_code
+        if scenario == 'workout_update':
+            workout_id = self.rng.choice(self.workout_ids)
+            return c.put(f'/api/workouts/{workout_id}', json=self._workout_body()).status_code
+        if scenario == 'workout_copy':
+            response = c.post(f'/api/workouts/{self.rng.choice(self.workout_ids)}/copy')
+            if response.status_code == 201:
+                self.workout_ids.append(response.get_json()['id'])
+            return response.status_code
+        if scenario == 'training_types':
+            return c.get('/api/training_types').status_code
+        if scenario == 'exercise_categories':
+            return c.get('/api/exercise_categories').status_code
+        if scenario == 'exercises':
+            return c.get('/api/exercises').status_code
+        if scenario == 'exercises_by_category':
+            return c.get(f'/api/exercises?category_id={self.rng.choice(self.category_ids)}').status_code
+        if scenario == 'catalog':
+            return c.get('/api/catalog').status_code
+        raise ValueError(f'Neznámý scénář: {scenario}')
+
+
+def percentile(values, p):
+    """Percentil s lineární interpolací (values musí být seřazené)."""
+    if not values:
+        return None
+    k = (len(values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
+
+
+def summarize(latencies_ms, errors, wall_seconds):
+    values = sorted(latencies_ms)
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'throughput_rps': round(len(values) / wall_seconds, 2) if wall_seconds else None,
+        'mean_ms': round(statistics.fmean(values), 3) if values else None,
+        'p50_ms': round(percentile(values, 50), 3) if values else None,
+        'p90_ms': round(percentile(values, 90), 3) if values else None,
+        'p95_ms': round(percentile(values, 95), 3) if values else None,
+        'p99_ms': round(percentile(values, 99), 3) if values else None,
+        'max_ms': round(values[-1], 3) if values else None,
+    }
+
+
+def timed(client, scenario):
+    start = time.perf_counter()
+    status = client.request(scenario)
+    return (time.perf_counter() - start) * 1000, status >= 400
+
+
+def run_sequential(client, scenarios, requests):
+    """Každý scénář zvlášť, požadavky jeden po druhém."""
+    results = {}
+    for scenario in scenarios:
+        latencies = []
+        errors = 0
+        wall_start = time.perf_counter()
+        for _ in range(requests):
+            latency, failed = timed(client, scenario)
+            latencies.append(latency)
+            errors += failed
+        results[scenario] = summarize(latencies, errors, time.perf_counter() - wall_start)
+    return results
+
+
+def run_concurrent(usernames, scenarios, requests, concurrency, seed_value):
+    """Smíšená zátěž z více vláken, každé vlákno má vlastního přihlášeného klienta."""
+    local = threading.local()
+    lock = threading.Lock()
+    per_scenario = {scenario: ([], [0]) for scenario in scenarios}
+    rng = random.Random(seed_value)
+    plan = [rng.choice(scenarios) for _ in range(requests * len(scenarios))]
+    counter = iter(range(concurrency))
+
+    def thread_client():
+        if not hasattr(local, 'client'):
+            with lock:
+                index = next(counter)
+            local.client = Client(usernames[index % len(usernames)], seed_value + index)
+        return local.client
+
+    def task(scenario):
+        client = thread_client()
+        latency, failed = timed(client, scenario)
+        with lock:
+            latencies, errors = per_scenario[scenario]
+            latencies.append(latency)
+            errors[0] += failed
+        return latency, failed
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(task, plan))
+    wall_seconds = time.perf_counter() - wall_start
+
+    result = summarize([o[0] for o in outcomes], sum(o[1] for o in outcomes), wall_seconds)
+    result['concurrency'] = concurrency
+    result['scenarios'] = {
+        scenario: summarize(latencies, errors[0], wall_seconds)
+        for scenario, (latencies, errors) in per_scenario.items() if latencies
+    }
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark API aplikace Balift')
+    parser.add_argument('--database', default=os.path.join(app.instance_path, 'benchmark.sqlite'),
+                        help='Cesta k databázi benchmarku (bude přepsána).')
+    parser.add_argument('--users', type=int, default=3, help='Počet uživatelů.')
+    parser.add_argument('--workouts', type=int, default=300, help='Počet tréninků na uživatele.')
+    parser.add_argument('--exercises', type=int, default=6, help='Počet cviků v tréninku.')
+    parser.add_argument('--requests', type=int, default=100, help='Počet požadavků na scénář.')
+    parser.add_argument('--concurrency', type=int, default=0,
+                        help='Počet vláken pro souběžnou zátěž (0 = jen sekvenční měření).')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='Omezit měření na vybrané scénáře (lze opakovat).')
+    parser.add_argument('--no-seed', action='store_true', help='Použít existující databázi bez nového naplnění.')
+    parser.add_argument('--seed', type=int, default=42, help='Seed generátoru náhodných dat.')
+    parser.add_argument('--output', help='Soubor pro JSON výsledek (výchozí je standardní výstup).')
+    args = parser.parse_args()
+
+    app.config['DATABASE'] = args.database
+    scenarios = args.scenario or SCENARIOS
+
+    seed_seconds = None
+    if not args.no_seed:
+        seed_start = time.perf_counter()
+        seed(args.users, args.workouts, args.exercises, args.seed)
+        seed_seconds = round(time.perf_counter() - seed_start, 3)
+
+    with app.app_context():
+        usernames = [row['username'] for row in get_db().execute(
+            "SELECT username FROM users WHERE username LIKE 'bench%' ORDER BY id"
+        )]
+    if not usernames:
+        parser.error('Databáze neobsahuje uživatele benchmarku, spusťte ho bez --no-seed.')
+
+    result = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'parameters': {
+            'users': args.users,
+            'workouts_per_user': args.workouts,
+            'exercises_per_workout': args.exercises,
+            'requests_per_scenario': args.requests,
+            'seed': args.seed,
+        },
+        'seed_seconds': seed_seconds,
+        'sequential': run_sequential(Client(usernames[0], args.seed), scenarios, args.requests),
+    }
+    if args.concurrency > 0:
+        result['concurrent'] = run_concurrent(usernames, scenarios, args.requests, args.concurrency, args.seed)
+
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Cache číselníků (typy tréninků, partie, cviky) v aplikaci Balift
+
+Číselníky se mění zřídka, proto se jejich JSON serializuje jednou a drží
+v paměti procesu. Platnost se ověřuje podle čísla verze v tabulce
+catalog_version, které zvyšují triggery při každé změně číselníků -
+cache se tak zneplatní i po zápisu z jiného workeru nebo z CLI.
+"""
+
+import hashlib
+import json
+import threading
+from collections import namedtuple
+
+CatalogEntry = namedtuple('CatalogEntry', ['body', 'etag', 'last_modified'])
+
+CATALOG_TABLES = ('training_types', 'exercise_categories', 'exercises')
+
+
+def current_version(db):
+    """Vrátí dvojici (verze, čas poslední změny jako unix timestamp)."""
+    row = db.execute('SELECT version, updated_at FROM catalog_version WHERE id = 1').fetchone()
+    if row is None:
+        return 0, 0
+    return row[0], row[1]
+
+
+def load_training_types(db):
+    return [dict(row) for row in db.execute('SELECT * FROM training_types ORDER BY id')]
+
+
+def load_exercise_categories(db):
+    return [dict(row) for row in db.execute('SELECT * FROM exercise_categories ORDER BY id')]
+
+
+def load_exercises(db, category_id=None):
+    if category_id is None:
+        rows = db.execute('SELECT * FROM exercises ORDER BY id')
+    else:
+        rows = db.execute('SELECT * FROM exercises WHERE category_id = ? ORDER BY id', (category_id,))
+    return [dict(row) for row in rows]
+
+
+def load_catalog(db, version):
+    """Všechny číselníky najednou pro úvodní načtení formulářů."""
+    return {
+        'version': version,
+        'training_types': load_training_types(db),
+        'exercise_categories': load_exercise_categories(db),
+        'exercises': load_exercises(db),
+    }
+
+
+class CatalogCache:
+    """
+    Předserializované odpovědi číselníků s ETagem, platné pro jednu verzi katalogu.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = {}
+
+    def get(self, db, key, loader):
+        """
+        Vrátí CatalogEntry pro klíč; loader(db, version) se zavolá jen
+        při prvním dotazu po změně verze.
+        """
+        version, updated_at = current_version(db)
+
+        # Čas změny je součástí klíče, protože init-db začíná verze znovu od 1
+        stamp = (version, updated_at)
+
+        with self._lock:
+            if stamp != self._version:
+                self._version = stamp
+                self._entries = {}
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        body = json.dumps(loader(db, version), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        # ETag závisí jen na obsahu, změna jiného číselníku ho nezneplatní
+        etag = hashlib.sha1(body).hexdigest()[:20]
+        entry = CatalogEntry(body, etag, updated_at)
+
+        with self._lock:
+            if self._version == stamp:
+                self._entries[key] = entry
+        return entry
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,126 @@
+"""
+Správa připojení k SQLite databázi aplikace Balift
+
+Připojení se znovu používají v rámci jednoho vlákna workeru a při vytvoření
+se na ně aplikují pragmy z konfigurace (SQLITE_PRAGMAS).
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Výchozí pragmy - WAL, aby zápisy neblokovaly čtení, a zapnuté cizí klíče,
+# aby fungovalo ON DELETE CASCADE
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'foreign_keys': 'on',
+    'busy_timeout': 5000,
+    'cache_size': -16000,
+    'mmap_size': 64 * 1024 * 1024,
+}
+
+
+class ConnectionManager:
+    """
+    Drží jedno připojení pro každé vlákno a každou cestu k databázi.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _connections(self):
+        if not hasattr(self._local, 'connections'):
+            self._local.connections = {}
+        return self._local.connections
+
+    def connect(self, path, pragmas, attach=None):
+        """
+        Vytvoří nové připojení, připojí k němu další databáze ({schéma: cesta})
+        a nastaví pragmy (journal_mode platí pro všechny připojené databáze).
+        """
+        db = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+        db.row_factory = sqlite3.Row
+        for schema, attach_path in (attach or {}).items():
+            db.execute(f'ATTACH DATABASE ? AS {schema}', (attach_path,))
+        for name, value in pragmas.items():
+            # PRAGMA nepodporuje parametry, hodnoty pocházejí z konfigurace
+            db.execute(f'PRAGMA {name} = {value}')
+        return db
+
+    def acquire(self, path, pragmas, reuse=True, attach=None):
+        """Vrátí připojení pro aktuální vlákno (případně nové, pokud je reuse vypnuté)."""
+        if not reuse:
+            return self.connect(path, pragmas, attach)
+
+        connections = self._connections()
+        db = connections.get(path)
+        if db is None:
+            db = self.connect(path, pragmas, attach)
+            connections[path] = db
+        return db
+
+    def release(self, db, reuse=True):
+        """Vrátí připojení po skončení požadavku - nedokončená transakce se vrátí zpět."""
+        if not reuse:
+            db.close()
+            return
+
+        if db.in_transaction:
+            db.rollback()
+
+    def close_all(self):
+        """Zavře všechna připojení aktuálního vlákna."""
+        connections = self._connections()
+        for db in connections.values():
+            db.close()
+        connections.clear()
+
+
+connection_manager = ConnectionManager()
+
+
+@contextmanager
+def transaction(db):
+    """
+    Spustí blok jako jednu transakci - při výjimce se vše vrátí zpět.
+    BEGIN IMMEDIATE získá zápisový zámek hned na začátku, takže transakce
+    nemůže selhat až při přechodu ze čtení na zápis. Uvnitř už otevřené
+    transakce běží blok jako SAVEPOINT a potvrzení zůstává na volajícím.
+    """
+    if db.in_transaction:
+        db.execute('SAVEPOINT nested_transaction')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK TO nested_transaction')
+            db.execute('RELEASE nested_transaction')
+            raise
+        db.execute('RELEASE nested_transaction')
+        return
+
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        yield db
+    except BaseException:
+        db.rollback()
+        raise
+    db.commit()
+
+
+@contextmanager
+def read_snapshot(db):
+    """
+    Spustí blok čtení v jedné transakci - ve WAL režimu všechny dotazy
+    bloku vidí stejný stav databáze a nezablokují zápisy ostatních.
+    V už otevřené transakci čte blok v ní (a nic nepotvrzuje ani nevrací).
+    """
+    if db.in_transaction:
+        yield db
+        return
+
+    db.execute('BEGIN')
+    try:
+        yield db
+    finally:
+        db.rollback()
@@ -0,0 +1,231 @@
+"""
+Volitelné měření výkonu požadavků a SQL dotazů v aplikaci Balift
+
+Při zapnutém INSTRUMENTATION_ENABLED se připojení z get_db() obalí proxy,
+která u každého dotazu měří čas (provedení i načítání řádků) a počet řádků.
+Výsledky se posílají v hlavičce Server-Timing, pomalé dotazy se logují
+a souhrnné histogramy po routách jsou k dispozici na /admin/metrics.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from flask import g, request
+
+logger = logging.getLogger('balift.instrumentation')
+
+# Horní hranice košů histogramu v milisekundách
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SLOW_QUERY_HISTORY = 50
+
+
+class QueryRecord:
+    """Jeden provedený dotaz - čas se připočítává i při načítání řádků."""
+
+    __slots__ = ('sql', 'duration_ms', 'rows')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.duration_ms = 0.0
+        self.rows = 0
+
+
+class InstrumentedCursor:
+    """Proxy kurzoru, která počítá načtené řádky a čas strávený jejich načítáním."""
+
+    def __init__(self, cursor, record):
+        self._cursor = cursor
+        self._record = record
+
+    def _timed(self, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self._record.duration_ms += (time.perf_counter() - start) * 1000
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._record.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._timed(self._cursor.fetchmany, *args)
+        self._record.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._record.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self._timed(next, self._cursor)
+        self._record.rows += 1
+        return row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Proxy připojení, která zaznamenává každý dotaz do seznamu queries."""
+
+    def __init__(self, connection, queries):
+        self._connection = connection
+        self._queries = queries
+
+    def _run(self, method, sql, *args):
+        record = QueryRecord(sql)
+        self._queries.append(record)
+        start = time.perf_counter()
+        try:
+            cursor = method(sql, *args)
+        finally:
+            record.duration_ms += (time.perf_counter() - start) * 1000
+        # U zápisů je počet řádků známý hned, u SELECTu se počítá při načítání
+        if cursor.rowcount > 0:
+            record.rows = cursor.rowcount
+        return InstrumentedCursor(cursor, record)
+
+    def execute(self, sql, parameters=()):
+        return self._run(self._connection.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(self._connection.executemany, sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self._run(self._connection.executescript, script)
+
+    def __enter__(self):
+        self._connection.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        return self._connection.__exit__(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class Metrics:
+    """Souhrnné metriky procesu - histogramy po routách a poslední pomalé dotazy."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+            self._slow_queries = deque(maxlen=SLOW_QUERY_HISTORY)
+
+    def record_request(self, route, duration_ms, db_ms, query_count):
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = {
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'db_ms': 0.0,
+                    'queries': 0,
+                    'buckets': [0] * (len(HISTOGRAM_BUCKETS_MS) + 1),
+                }
+                self._routes[route] = stats
+            stats['count'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['db_ms'] += db_ms
+            stats['queries'] += query_count
+            for index, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+                if duration_ms <= bound:
+                    stats['buckets'][index] += 1
+                    break
+            else:
+                stats['buckets'][-1] += 1
+
+    def record_slow_query(self, route, record):
+        with self._lock:
+            self._slow_queries.append({
+                'route': route,
+                'sql': ' '.join(record.sql.split()),
+                'duration_ms': round(record.duration_ms, 3),
+                'rows': record.rows,
+                'at': time.time(),
+            })
+
+    def snapshot(self):
+        """Kopie metrik pro JSON výstup."""
+        bounds = list(HISTOGRAM_BUCKETS_MS) + [None]
+        with self._lock:
+            routes = {}
+            for route, stats in self._routes.items():
+                routes[route] = {
+                    'count': stats['count'],
+                    'avg_ms': round(stats['total_ms'] / stats['count'], 3),
+                    'max_ms': round(stats['max_ms'], 3),
+                    'avg_db_ms': round(stats['db_ms'] / stats['count'], 3),
+                    'avg_queries': round(stats['queries'] / stats['count'], 2),
+                    # Koše histogramu: le = horní hranice v ms, None = nad poslední hranicí
+                    'histogram_ms': [
+                        {'le': bound, 'count': count} for bound, count in zip(bounds, stats['buckets'])
+                    ],
+                }
+            return {'routes': routes, 'slow_queries': list(self._slow_queries)}
+
+
+metrics = Metrics()
+
+
+def instrument_connection(connection):
+    """Obalí připojení pro aktuální požadavek, dotazy se ukládají do g.queries."""
+    if 'queries' not in g:
+        g.queries = []
+    return InstrumentedConnection(connection, g.queries)
+
+
+def _route_name():
+    rule = request.url_rule.rule if request.url_rule else '<404>'
+    return f'{request.method} {rule}'
+
+
+def init_app(app):
+    """Zaregistruje měření požadavků; aktivní je jen při INSTRUMENTATION_ENABLED."""
+    app.config.setdefault('INSTRUMENTATION_ENABLED', False)
+    app.config.setdefault('SLOW_QUERY_MS', 100)
+
+    @app.before_request
+    def start_timer():
+        if app.config['INSTRUMENTATION_ENABLED']:
+            g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_timing(response):
+        if 'request_started' not in g:
+            return response
+
+        duration_ms = (time.perf_counter() - g.request_started) * 1000
+        queries = g.get('queries', [])
+        db_ms = sum(record.duration_ms for record in queries)
+        route = _route_name()
+
+        threshold = app.config['SLOW_QUERY_MS']
+        for record in queries:
+            if record.duration_ms >= threshold:
+                logger.warning('Pomalý dotaz (%.1f ms, %d řádků) v %s: %s',
+                               record.duration_ms, record.rows, route, ' '.join(record.sql.split()))
+                metrics.record_slow_query(route, record)
+
+        metrics.record_request(route, duration_ms, db_ms, len(queries))
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.2f};desc="{len(queries)} queries", app;dur={duration_ms - db_ms:.2f}, total;dur={duration_ms:.2f}'
+        )
+        return response
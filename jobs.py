@@ -0,0 +1,473 @@
+"""
+Fronta úloh na pozadí pro aplikaci Balift
+
+Náročná práce (export, přepočet statistik, hromadné kopírování,
+backfill sérií) neběží v požadavku. View úlohu jen zapíše do tabulky
+jobs a hned vrátí 202 Accepted s adresou stavu úlohy. Úlohy zpracovává
+samostatný proces "flask worker" s několika pracovními procesy; úlohu
+si proces zamkne v zápisové transakci, takže ji nikdy nezpracují dva.
+
+Neúspěšná úloha se opakuje s rostoucím odstupem až do max_attempts.
+Úlohy se stejným dedup_key se nezařadí dvakrát, dokud původní
+nedoběhne - opakovaný požadavek vrátí stávající úlohu.
+"""
+
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+import archive
+import stats
+import search
+import workout_io
+import workout_store
+from database import connection_manager, transaction
+
+logger = logging.getLogger('balift.jobs')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_MAX_ATTEMPTS = 3
+# Odstup opakování: RETRY_BASE_DELAY * 2^(pokus - 1), nejvýše RETRY_MAX_DELAY sekund
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 600
+# Jak často pracovní proces maže staré dokončené úlohy (sekundy)
+PRUNE_INTERVAL = 3600
+
+# DDL tabulky úloh, stejné příkazy jsou i ve schema.sql
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL DEFAULT '{}',
+        user_id INTEGER,
+        status TEXT NOT NULL DEFAULT 'queued',
+        dedup_key TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 3,
+        run_after REAL NOT NULL,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        heartbeat_at REAL,
+        finished_at REAL,
+        worker TEXT,
+        result TEXT,
+        error TEXT,
+        FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, run_after, id)',
+    '''CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (dedup_key)
+    WHERE dedup_key IS NOT NULL AND status IN ('queued', 'running')''',
+    'CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, id)',
+]
+
+
+def heartbeat_interval(stale_timeout):
+    """Jak často běžící úloha potvrzuje, že její worker žije."""
+    return max(1.0, min(60.0, stale_timeout / 4))
+
+
+class UnknownTask(Exception):
+    pass
+
+
+class Task:
+    """Registrovaná úloha - funkce(context, payload) vracející výsledek serializovatelný do JSON."""
+
+    def __init__(self, name, function, admin_only=False, dedup=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.name = name
+        self.function = function
+        self.admin_only = admin_only
+        # dedup(user_id, payload) -> klíč, nebo None (úlohy se neslučují)
+        self.dedup = dedup
+        self.max_attempts = max_attempts
+
+
+TASKS = {}
+
+
+def task(name, **options):
+    """Dekorátor pro registraci úlohy."""
+    def register(function):
+        TASKS[name] = Task(name, function, **options)
+        return function
+    return register
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise UnknownTask(f'Neznámá úloha: {name}')
+
+
+class JobContext:
+    """Prostředí běžící úlohy - připojení k databázi, ID úlohy a uživatele, adresář souborů."""
+
+    def __init__(self, db, job_id, user_id, files_dir):
+        self.db = db
+        self.job_id = job_id
+        self.user_id = user_id
+        self.files_dir = files_dir
+
+    def file_path(self, suffix):
+        """Cesta k výstupnímu souboru úlohy (např. export)."""
+        os.makedirs(self.files_dir, exist_ok=True)
+        return os.path.join(self.files_dir, f'job-{self.job_id}{suffix}')
+
+
+def create_tables(db):
+    for statement in SCHEMA:
+        db.execute(statement)
+
+
+def enqueue(db, kind, payload=None, user_id=None, dedup_key=None, max_attempts=None, delay=0):
+    """
+    Zařadí úlohu do fronty. Vrací dvojici (ID úlohy, True pokud byla
+    vytvořena nová). Pokud už čeká nebo běží úloha se stejným dedup_key,
+    vrátí její ID a False.
+    """
+    definition = get_task(kind)
+    if dedup_key is None and definition.dedup is not None:
+        dedup_key = definition.dedup(user_id, payload or {})
+    now = time.time()
+
+    with transaction(db):
+        if dedup_key is not None:
+            row = db.execute(
+                "SELECT id FROM jobs WHERE dedup_key = ? AND status IN ('queued', 'running')",
+                (dedup_key,)
+            ).fetchone()
+            if row is not None:
+                return row[0], False
+        cursor = db.execute(
+            '''INSERT INTO jobs (kind, payload, user_id, dedup_key, max_attempts, run_after, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (kind, json.dumps(payload or {}), user_id, dedup_key,
+             max_attempts or definition.max_attempts, now + delay, now)
+        )
+    return cursor.lastrowid, True
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    return datetime.datetime.fromtimestamp(value, datetime.timezone.utc).isoformat()
+
+
+def job_to_dict(row):
+    """Stav úlohy pro API (bez interních sloupců)."""
+    return {
+        'id': row['id'],
+        'kind': row['kind'],
+        'status': row['status'],
+        'attempts': row['attempts'],
+        'max_attempts': row['max_attempts'],
+        'created_at': _timestamp(row['created_at']),
+        'started_at': _timestamp(row['started_at']),
+        'finished_at': _timestamp(row['finished_at']),
+        'error': row['error'],
+    }
+
+
+def get_job(db, job_id):
+    return db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+
+def claim(db, worker):
+    """Zamkne nejstarší čekající úlohu pro daného workera. Vrací řádek úlohy nebo None."""
+    now = time.time()
+    with transaction(db):
+        row = db.execute(
+            '''SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ?
+            ORDER BY run_after, id LIMIT 1''',
+            (now,)
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute(
+            '''UPDATE jobs SET status = 'running', attempts = attempts + 1,
+            started_at = ?, heartbeat_at = ?, worker = ?, error = NULL WHERE id = ?''',
+            (now, now, worker, row[0])
+        )
+    return get_job(db, row[0])
+
+
+# Výsledek zapíše jen worker, který úlohu v tomto pokusu zamkl - po vrácení
+# do fronty (requeue_stale) ji mezitím mohl převzít jiný
+_OWNED = "id = ? AND worker = ? AND attempts = ? AND status = 'running'"
+
+
+def _owner(job):
+    return (job['id'], job['worker'], job['attempts'])
+
+
+def complete(db, job, result):
+    """Uloží výsledek úlohy. Vrací False, pokud úlohu mezitím převzal jiný worker."""
+    with transaction(db):
+        cursor = db.execute(
+            f"UPDATE jobs SET status = 'done', finished_at = ?, result = ? WHERE {_OWNED}",
+            (time.time(), json.dumps(result), *_owner(job))
+        )
+    return cursor.rowcount > 0
+
+
+def fail(db, job, error):
+    """
+    Zaznamená chybu úlohy - naplánuje další pokus, nebo ji označí jako
+    neúspěšnou. Vrací False, pokud úlohu mezitím převzal jiný worker.
+    """
+    now = time.time()
+    with transaction(db):
+        if job['attempts'] < job['max_attempts']:
+            delay = min(RETRY_BASE_DELAY * 2 ** (job['attempts'] - 1), RETRY_MAX_DELAY)
+            cursor = db.execute(
+                f"UPDATE jobs SET status = 'queued', run_after = ?, error = ? WHERE {_OWNED}",
+                (now + delay, error, *_owner(job))
+            )
+        else:
+            cursor = db.execute(
+                f"UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE {_OWNED}",
+                (now, error, *_owner(job))
+            )
+    return cursor.rowcount > 0
+
+
+class Heartbeat:
+    """
+    Vlákno, které během běhu úlohy pravidelně obnovuje heartbeat_at (vlastním
+    připojením), aby dlouhá úloha nebyla považována za úlohu spadlého workera.
+    """
+
+    def __init__(self, options, job):
+        self.options = options
+        self.job = job
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f'balift-heartbeat-{job["id"]}', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
+
+    def _run(self):
+        interval = heartbeat_interval(self.options['stale_timeout'])
+        db = connection_manager.connect(self.options['database'], self.options['pragmas'])
+        try:
+            while not self.stop_event.wait(interval):
+                try:
+                    with transaction(db):
+                        db.execute(
+                            f'UPDATE jobs SET heartbeat_at = ? WHERE {_OWNED}',
+                            (time.time(), *_owner(self.job))
+                        )
+                except sqlite3.Error:
+                    logger.exception('Heartbeat úlohy %s selhal', self.job['id'])
+        finally:
+            db.close()
+
+
+def requeue_stale(db, timeout):
+    """
+    Úlohy, jejichž worker déle než timeout neobnovil heartbeat (spadlý
+    worker), vrátí do fronty, po vyčerpání pokusů je označí jako neúspěšné.
+    Vrací počet vrácených úloh.
+    """
+    now = time.time()
+    with transaction(db):
+        db.execute(
+            """UPDATE jobs SET status = 'failed', finished_at = ?, error = 'Worker přestal odpovídat'
+            WHERE status = 'running' AND coalesce(heartbeat_at, started_at) < ? AND attempts >= max_attempts""",
+            (now, now - timeout)
+        )
+        cursor = db.execute(
+            """UPDATE jobs SET status = 'queued', run_after = ?
+            WHERE status = 'running' AND coalesce(heartbeat_at, started_at) < ?""",
+            (now, now - timeout)
+        )
+    return cursor.rowcount
+
+
+def prune(db, days, files_dir):
+    """Smaže dokončené a neúspěšné úlohy starší než days dní i s jejich soubory."""
+    cutoff = time.time() - days * 24 * 3600
+    with transaction(db):
+        rows = db.execute(
+            "SELECT id, result FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (cutoff,)
+        ).fetchall()
+        db.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,)
+        )
+    for row in rows:
+        file = json.loads(row['result'] or 'null')
+        if isinstance(file, dict) and file.get('file'):
+            path = os.path.join(files_dir, file['file'])
+            if os.path.exists(path):
+                os.remove(path)
+    return len(rows)
+
+
+def run_job(db, job, files_dir):
+    """Provede jednu zamčenou úlohu a uloží výsledek nebo chybu."""
+    try:
+        definition = get_task(job['kind'])
+        context = JobContext(db, job['id'], job['user_id'], files_dir)
+        result = definition.function(context, json.loads(job['payload']))
+    except Exception as e:
+        if db.in_transaction:
+            db.rollback()
+        logger.warning('Úloha %s (%s) selhala: %s', job['id'], job['kind'], e)
+        if not fail(db, job, ''.join(traceback.format_exception_only(type(e), e)).strip()):
+            logger.warning('Úlohu %s mezitím převzal jiný worker, chyba se neuložila', job['id'])
+        return False
+    if not complete(db, job, result):
+        logger.warning('Úlohu %s mezitím převzal jiný worker, výsledek se neuložil', job['id'])
+        return False
+    return True
+
+
+def work(options, stop=None, burst=False):
+    """
+    Smyčka pracovního procesu: zamyká a zpracovává úlohy, dokud není
+    nastavena událost stop. V režimu burst skončí, jakmile je fronta prázdná.
+    Vrací počet zpracovaných úloh.
+    """
+    db = connection_manager.connect(options['database'], options['pragmas'], options['attach'])
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    processed = 0
+    next_maintenance = 0
+    try:
+        while stop is None or not stop.is_set():
+            if time.time() >= next_maintenance:
+                requeue_stale(db, options['stale_timeout'])
+                prune(db, options['retention_days'], options['files_dir'])
+                next_maintenance = time.time() + PRUNE_INTERVAL
+
+            job = claim(db, worker)
+            if job is None:
+                if burst:
+                    break
+                if stop is not None:
+                    stop.wait(options['poll_interval'])
+                else:
+                    time.sleep(options['poll_interval'])
+                continue
+            with Heartbeat(options, job):
+                run_job(db, job, options['files_dir'])
+            processed += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+    return processed
+
+
+def run_workers(options, processes=1, burst=False):
+    """
+    Spustí pool pracovních procesů a čeká na jejich ukončení (Ctrl+C).
+    S jedním procesem pracuje přímo v aktuálním procesu.
+    """
+    if processes <= 1:
+        return work(options, burst=burst)
+
+    stop = multiprocessing.Event()
+    pool = [
+        multiprocessing.Process(target=work, args=(options, stop, burst), name=f'balift-worker-{i}')
+        for i in range(processes)
+    ]
+    for process in pool:
+        process.start()
+    try:
+        for process in pool:
+            process.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for process in pool:
+            process.join()
+    return None
+
+
+def options_from_config(config):
+    """Parametry pracovních procesů z konfigurace aplikace."""
+    return {
+        'database': config['DATABASE'],
+        'pragmas': config['SQLITE_PRAGMAS'],
+        'attach': archive.attachments(config),
+        'files_dir': config['JOB_FILES_DIR'],
+        'poll_interval': config['JOB_POLL_INTERVAL'],
+        'stale_timeout': config['JOB_STALE_TIMEOUT'],
+        'retention_days': config['JOB_RETENTION_DAYS'],
+    }
+
+
+def init_app(app):
+    app.config.setdefault('JOB_FILES_DIR', os.path.join(app.instance_path, 'jobs'))
+    app.config.setdefault('JOB_WORKERS', 2)
+    app.config.setdefault('JOB_POLL_INTERVAL', 1.0)
+    app.config.setdefault('JOB_STALE_TIMEOUT', 600)
+    app.config.setdefault('JOB_RETENTION_DAYS', 7)
+
+
+# Úlohy
+
+# Klíč obsahuje žadatele i exportovaného uživatele - export admina nesmí převzít jiný uživatel
+@task('export_workouts', dedup=lambda user_id, payload: (
+    f"export:{user_id}:{payload.get('user_id', user_id)}:{payload.get('format', 'ndjson')}"
+))
+def export_workouts_task(context, payload):
+    """Export tréninků uživatele do souboru, výsledek se stáhne přes /api/jobs/<id>/result."""
+    fmt = payload.get('format', 'ndjson')
+    user_id = payload.get('user_id', context.user_id)
+    path = context.file_path(f'.{fmt}')
+    partial = path + '.part'
+    with open(partial, 'w', encoding='utf-8', newline='') as f:
+        for chunk in workout_io.export_workouts(context.db, user_id, fmt):
+            f.write(chunk)
+    os.replace(partial, path)
+    return {'file': os.path.basename(path), 'format': fmt, 'size': os.path.getsize(path)}
+
+
+@task('copy_workout', max_attempts=1)
+def copy_workout_task(context, payload):
+    """Zkopíruje trénink na více dat (každá kopie je vlastní transakce, proto bez opakování)."""
+    ids = []
+    for date in payload['dates']:
+        new_id = workout_store.copy_workout(context.db, payload['workout_id'], date)
+        if new_id is None:
+            raise ValueError('Zdrojový trénink nenalezen')
+        ids.append(new_id)
+    return {'ids': ids}
+
+
+@task('rebuild_stats', admin_only=True, dedup=lambda user_id, payload: 'rebuild_stats')
+def rebuild_stats_task(context, payload):
+    with transaction(context.db) as db:
+        stats.rebuild(db)
+    return {}
+
+
+@task('rebuild_search', admin_only=True, dedup=lambda user_id, payload: 'rebuild_search')
+def rebuild_search_task(context, payload):
+    with transaction(context.db) as db:
+        search.rebuild(db)
+    return {}
+
+
+@task('backfill_sets', admin_only=True, dedup=lambda user_id, payload: 'backfill_sets')
+def backfill_sets_task(context, payload):
+    """Backfill sérií po dávkách a přepočet statistik - po pádu pokračuje tam, kde skončil (backfill_progress)."""
+    return {'processed': sum(workout_store.backfill_sets(context.db))}
@@ -0,0 +1,255 @@
+"""
+Verzované migrace databáze aplikace Balift
+
+Verze schématu se ukládá do PRAGMA user_version. Každá migrace se spouští
+ve vlastní transakci, takže při chybě zůstane databáze v poslední platné verzi.
+"""
+
+import catalog
+import search
+import stats
+import sync
+import jobs
+
+
+def _columns(db, table):
+    """Vrátí množinu názvů sloupců tabulky."""
+    return {row[1] for row in db.execute(f'PRAGMA table_info({table})')}
+
+
+def _migration_users(db):
+    """Tabulka uživatelů (dříve vytvářená mimo schema.sql)."""
+    db.execute(
+        '''CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL,
+            is_admin INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )'''
+    )
+    # Starší ručně vytvořené tabulky nemusí mít sloupec created_at
+    if 'created_at' not in _columns(db, 'users'):
+        db.execute('ALTER TABLE users ADD COLUMN created_at TIMESTAMP')
+
+
+def _migration_workouts_user_id(db):
+    """Vlastník tréninku ve sloupci workouts.user_id."""
+    if 'user_id' not in _columns(db, 'workouts'):
+        db.execute('ALTER TABLE workouts ADD COLUMN user_id INTEGER REFERENCES users(id)')
+
+
+def _migration_indexes(db):
+    """Indexy pro nejčastější dotazy."""
+    # Cviky tréninku (get_workout, copy_workout, update_workout, ON DELETE CASCADE)
+    db.execute(
+        '''CREATE INDEX IF NOT EXISTS idx_workout_exercises_workout
+        ON workout_exercises (workout_id, exercise_id, sets, reps, weight)'''
+    )
+    # Seznam tréninků uživatele seřazený podle data (keyset stránkování)
+    db.execute(
+        '''CREATE INDEX IF NOT EXISTS idx_workouts_user_date
+        ON workouts (user_id, date, id, training_type_id)'''
+    )
+    # Seznam tréninků uživatele filtrovaný podle typu
+    db.execute(
+        '''CREATE INDEX IF NOT EXISTS idx_workouts_user_type_date
+        ON workouts (user_id, training_type_id, date, id)'''
+    )
+    # Seznam všech tréninků pro admina
+    db.execute(
+        '''CREATE INDEX IF NOT EXISTS idx_workouts_date
+        ON workouts (date, id, training_type_id, user_id)'''
+    )
+    # Cviky podle partie
+    db.execute(
+        '''CREATE INDEX IF NOT EXISTS idx_exercises_category
+        ON exercises (category_id, name)'''
+    )
+    db.execute('ANALYZE')
+
+
+def _migration_workout_sets(db):
+    """Jednotlivé série odvozené z textových polí reps a weight."""
+    db.execute(
+        '''CREATE TABLE IF NOT EXISTS workout_sets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            workout_exercise_id INTEGER NOT NULL,
+            set_number INTEGER NOT NULL,
+            reps INTEGER,
+            duration_s INTEGER,
+            weight_kg REAL,
+            FOREIGN KEY(workout_exercise_id) REFERENCES workout_exercises(id) ON DELETE CASCADE
+        )'''
+    )
+    db.execute(
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_workout_sets_exercise
+        ON workout_sets (workout_exercise_id, set_number)'''
+    )
+    # Průběh dávkových úloh (např. backfill-sets), aby šly přerušit a znovu spustit
+    db.execute(
+        '''CREATE TABLE IF NOT EXISTS backfill_progress (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL
+        )'''
+    )
+
+
+def _migration_stats(db):
+    """Souhrnné tabulky pro statistiky (stats.py), naplní se z existujících dat."""
+    db.execute(
+        '''CREATE TABLE IF NOT EXISTS exercise_daily_stats (
+            user_id INTEGER NOT NULL,
+            exercise_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            top_weight_kg REAL,
+            volume_kg REAL NOT NULL DEFAULT 0,
+            best_e1rm_kg REAL,
+            total_reps INTEGER NOT NULL DEFAULT 0,
+            set_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, exercise_id, date)
+        ) WITHOUT ROWID'''
+    )
+    db.execute(
+        '''CREATE TABLE IF NOT EXISTS category_weekly_stats (
+            user_id INTEGER NOT NULL,
+            category_id INTEGER NOT NULL,
+            week TEXT NOT NULL,
+            volume_kg REAL NOT NULL DEFAULT 0,
+            set_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, week, category_id)
+        ) WITHOUT ROWID'''
+    )
+    db.execute(
+        '''CREATE TABLE IF NOT EXISTS weekly_workout_stats (
+            user_id INTEGER NOT NULL,
+            week TEXT NOT NULL,
+            workout_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, week)
+        ) WITHOUT ROWID'''
+    )
+    db.execute(
+        '''CREATE INDEX IF NOT EXISTS idx_exercise_daily_stats_user_date
+        ON exercise_daily_stats (user_id, date)'''
+    )
+    stats.rebuild(db)
+
+
+def _migration_catalog_version(db):
+    """Verze číselníků pro cache a ETagy (catalog.py), zvyšují ji triggery."""
+    db.execute(
+        '''CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )'''
+    )
+    db.execute(
+        "INSERT OR IGNORE INTO catalog_version (id, version, updated_at) VALUES (1, 1, strftime('%s', 'now'))"
+    )
+    for table in catalog.CATALOG_TABLES:
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            db.execute(
+                f'''CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+                END'''
+            )
+
+
+def _migration_search(db):
+    """Fulltextové indexy tréninků a cviků (search.py)."""
+    search.create_index(db)
+
+
+def _migration_workout_client_id(db):
+    """Identifikátor tréninku z klienta pro idempotentní odeslání offline fronty."""
+    if 'client_id' not in _columns(db, 'workouts'):
+        db.execute('ALTER TABLE workouts ADD COLUMN client_id TEXT')
+    db.execute(
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_workouts_user_client
+        ON workouts (user_id, client_id) WHERE client_id IS NOT NULL'''
+    )
+
+
+def _migration_sync(db):
+    """Sledování změn a tombstones pro inkrementální synchronizaci (sync.py)."""
+    sync.create_tracking(db)
+
+
+def _migration_workout_version(db):
+    """Verze tréninku pro optimistické zamykání při částečných úpravách (PATCH)."""
+    if 'version' not in _columns(db, 'workouts'):
+        db.execute('ALTER TABLE workouts ADD COLUMN version INTEGER NOT NULL DEFAULT 1')
+    # Zvýšení verze (i při změně jen cviků) se propíše do synchronizace
+    db.execute('DROP TRIGGER IF EXISTS trg_workouts_sync_update')
+    for statement in sync.SCHEMA:
+        db.execute(statement)
+
+
+def _migration_jobs(db):
+    """Fronta úloh na pozadí (jobs.py)."""
+    jobs.create_tables(db)
+
+
+def _migration_job_heartbeat(db):
+    """Heartbeat běžících úloh - dlouhé úlohy se nevracejí do fronty jako úlohy spadlého workera."""
+    if 'heartbeat_at' not in _columns(db, 'jobs'):
+        db.execute('ALTER TABLE jobs ADD COLUMN heartbeat_at REAL')
+
+
+# Seznam migrací v pořadí (verze, popis, funkce). Nové migrace se přidávají na konec.
+MIGRATIONS = [
+    (1, 'Tabulka users', _migration_users),
+    (2, 'Sloupec workouts.user_id', _migration_workouts_user_id),
+    (3, 'Indexy pro časté dotazy', _migration_indexes),
+    (4, 'Tabulka workout_sets', _migration_workout_sets),
+    (5, 'Souhrnné tabulky statistik', _migration_stats),
+    (6, 'Verze číselníků', _migration_catalog_version),
+    (7, 'Fulltextové vyhledávání', _migration_search),
+    (8, 'Sloupec workouts.client_id', _migration_workout_client_id),
+    (9, 'Sledování změn pro synchronizaci', _migration_sync),
+    (10, 'Sloupec workouts.version', _migration_workout_version),
+    (11, 'Fronta úloh', _migration_jobs),
+    (12, 'Sloupec jobs.heartbeat_at', _migration_job_heartbeat),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(db):
+    """Vrátí aktuální verzi schématu databáze."""
+    return db.execute('PRAGMA user_version').fetchone()[0]
+
+
+def set_version(db, version):
+    """Nastaví verzi schématu (PRAGMA nepodporuje parametry)."""
+    db.execute(f'PRAGMA user_version = {int(version)}')
+
+
+def migrate(db, target=None):
+    """
+    Aplikuje všechny chybějící migrace až do verze target (výchozí je poslední).
+    Vrací seznam aplikovaných migrací jako dvojice (verze, popis).
+    """
+    target = LATEST_VERSION if target is None else target
+    current = get_version(db)
+    applied = []
+
+    for version, description, function in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+
+        db.commit()
+        db.execute('BEGIN')
+        try:
+            function(db)
+            set_version(db, version)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        applied.append((version, description))
+
+    return applied
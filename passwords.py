@@ -0,0 +1,178 @@
+"""
+Hashování hesel a omezení pokusů o přihlášení v aplikaci Balift
+
+Výpočet hashe (scrypt/pbkdf2) je záměrně drahý. Aby nával přihlášení
+nezaměstnal všechny workery, běží hashování v omezeném poolu vláken
+s omezenou frontou - při jejím zaplnění se požadavek hned odmítne
+(HashingBusy) místo čekání. Hashovací funkce hashlib uvolňují GIL,
+takže pool skutečně omezuje souběžnou zátěž CPU.
+
+Pokusy o přihlášení omezuje token bucket pro uživatelské jméno a IP adresu.
+Kontrola proběhne před jakýmkoli hashováním, takže útok hrubou silou
+nestojí server žádný výpočet hashe.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Výchozí metoda Werkzeugu (scrypt), lze změnit v PASSWORD_HASH_METHOD
+DEFAULT_HASH_METHOD = 'scrypt'
+# Čekání na výsledek hashe - kratší než časový limit požadavku u běžných
+# serverů (30 s), aby klient dostal 503 místo přerušeného spojení
+HASH_TIMEOUT_S = 10
+
+logger = logging.getLogger('balift.passwords')
+
+
+class HashingBusy(Exception):
+    """Fronta hashování je plná, požadavek je potřeba zopakovat později."""
+
+
+class LoginThrottled(Exception):
+    """Příliš mnoho pokusů o přihlášení pro uživatele nebo IP adresu."""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Příliš mnoho pokusů, zkuste to znovu za {retry_after} s.')
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Omezený pool pro výpočet a ověření hashů hesel."""
+
+    def __init__(self, method=DEFAULT_HASH_METHOD, workers=2, queue_size=16):
+        self._executor = None
+        self.configure(method, workers, queue_size)
+
+    def configure(self, method, workers, queue_size):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.method = method
+        self._prefix = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        # Čekající i běžící úlohy dohromady
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy('Server je přetížen, zkuste to prosím znovu.')
+        try:
+            future = self._executor.submit(function, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=HASH_TIMEOUT_S)
+        except FutureTimeoutError:
+            # Běžící hash přerušit nelze - jeho místo v poolu se uvolní, až doběhne
+            logger.warning('Hash hesla nebyl hotový do %s s', HASH_TIMEOUT_S)
+            raise HashingBusy('Server je přetížen, zkuste to prosím znovu.') from None
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        True, pokud byl hash vytvořen s jinými parametry, než jsou nastavené.
+        Hash Werkzeugu má tvar 'metoda:parametry$sůl$hash'.
+        """
+        if self._prefix is None:
+            # Parametry doplněné Werkzeugem zjistíme jednorázově z prázdného hesla
+            self._prefix = self.hash('').split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix
+
+
+class TokenBucketThrottle:
+    """
+    Token bucket pro každý klíč (druh, hodnota). Limit se řídí druhem klíče:
+    limits[druh] = počet pokusů za minutu, zároveň kapacita bucketu.
+    Počet sledovaných klíčů je omezený, nejdéle nepoužité se zahazují.
+    """
+
+    def __init__(self, limits, max_keys=10000):
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+        self.configure(limits, max_keys)
+
+    def configure(self, limits, max_keys=10000):
+        with self._lock:
+            self.limits = dict(limits)
+            self.max_keys = max_keys
+            self._buckets.clear()
+
+    def _tokens(self, key, now):
+        capacity = self.limits[key[0]]
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        return min(capacity, tokens + (now - updated) * capacity / 60)
+
+    def acquire(self, *keys):
+        """
+        Odebere jeden token ze všech klíčů, nebo z žádného. Při nedostatku
+        vyhodí LoginThrottled s počtem sekund do dalšího povoleného pokusu.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens = {key: self._tokens(key, now) for key in keys}
+            waits = [
+                (1 - value) * 60 / self.limits[key[0]]
+                for key, value in tokens.items() if value < 1
+            ]
+            if waits:
+                raise LoginThrottled(max(1, math.ceil(max(waits))))
+
+            for key, value in tokens.items():
+                self._buckets[key] = (value - 1, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+    def reset(self, key):
+        """Zapomene klíč (např. po úspěšném přihlášení uživatele)."""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+hasher = PasswordHasher()
+login_throttle = TokenBucketThrottle({'user': 5, 'ip': 30})
+
+
+def _user_key(username):
+    return ('user', (username or '').strip().lower())
+
+
+def check_login_attempt(username, remote_addr):
+    """Započítá pokus o přihlášení, při překročení limitu vyhodí LoginThrottled."""
+    login_throttle.acquire(_user_key(username), ('ip', remote_addr or ''))
+
+
+def login_succeeded(username):
+    """Úspěšné přihlášení vynuluje limit uživatele (limit IP adresy zůstává)."""
+    login_throttle.reset(_user_key(username))
+
+
+def init_app(app):
+    """Nastaví hashování a limity přihlášení podle konfigurace aplikace."""
+    app.config.setdefault('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+    app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+    app.config.setdefault('PASSWORD_HASH_QUEUE', 16)
+    app.config.setdefault('LOGIN_ATTEMPTS_PER_USER', 5)
+    app.config.setdefault('LOGIN_ATTEMPTS_PER_IP', 30)
+
+    hasher.configure(
+        app.config['PASSWORD_HASH_METHOD'],
+        app.config['PASSWORD_HASH_WORKERS'],
+        app.config['PASSWORD_HASH_QUEUE'],
+    )
+    login_throttle.configure({
+        'user': app.config['LOGIN_ATTEMPTS_PER_USER'],
+        'ip': app.config['LOGIN_ATTEMPTS_PER_IP'],
+    })
@@ -1,9 +1,29 @@
+DROP TABLE IF EXISTS jobs;
+DROP TABLE IF EXISTS sync_tombstones;
+DROP TABLE IF EXISTS sync_clock;
+DROP TABLE IF EXISTS workouts_fts;
+DROP TABLE IF EXISTS exercises_fts;
+DROP TABLE IF EXISTS catalog_version;
+DROP TABLE IF EXISTS weekly_workout_stats;
+DROP TABLE IF EXISTS category_weekly_stats;
+DROP TABLE IF EXISTS exercise_daily_stats;
+DROP TABLE IF EXISTS backfill_progress;
+DROP TABLE IF EXISTS workout_sets;
 DROP TABLE IF EXISTS workout_exercises;
 DROP TABLE IF EXISTS workouts;
 DROP TABLE IF EXISTS exercises;
 DROP TABLE IF EXISTS exercise_categories;
 DROP TABLE IF EXISTS training_types;
 
+-- Tabulka uživatelů (při opakované inicializaci se zachovává)
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    is_admin INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Tabulka pro typy tréninků
 CREATE TABLE training_types (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -32,7 +52,13 @@ CREATE TABLE workouts (
     date TEXT NOT NULL,
     training_type_id INTEGER,
     notes TEXT,
-    FOREIGN KEY(training_type_id) REFERENCES training_types(id)
+    user_id INTEGER,
+    client_id TEXT,
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at TEXT,
+    change_seq INTEGER,
+    FOREIGN KEY(training_type_id) REFERENCES training_types(id),
+    FOREIGN KEY(user_id) REFERENCES users(id)
 );
 
 -- Tabulka pro jednotlivé cviky v tréninku
@@ -43,10 +69,68 @@ CREATE TABLE workout_exercises (
     sets INTEGER NOT NULL,
     reps TEXT NOT NULL,
     weight TEXT NOT NULL,
+    updated_at TEXT,
+    change_seq INTEGER,
     FOREIGN KEY(workout_id) REFERENCES workouts(id) ON DELETE CASCADE,
     FOREIGN KEY(exercise_id) REFERENCES exercises(id)
 );
 
+-- Jednotlivé série odvozené z textových polí reps a weight (set_parser.py)
+CREATE TABLE workout_sets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    workout_exercise_id INTEGER NOT NULL,
+    set_number INTEGER NOT NULL,
+    reps INTEGER,
+    duration_s INTEGER,
+    weight_kg REAL,
+    FOREIGN KEY(workout_exercise_id) REFERENCES workout_exercises(id) ON DELETE CASCADE
+);
+
+-- Průběh přerušitelných dávkových úloh
+CREATE TABLE backfill_progress (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+
+-- Souhrnné statistiky udržované při zápisu tréninků (stats.py)
+CREATE TABLE exercise_daily_stats (
+    user_id INTEGER NOT NULL,
+    exercise_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    top_weight_kg REAL,
+    volume_kg REAL NOT NULL DEFAULT 0,
+    best_e1rm_kg REAL,
+    total_reps INTEGER NOT NULL DEFAULT 0,
+    set_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, exercise_id, date)
+) WITHOUT ROWID;
+
+CREATE TABLE category_weekly_stats (
+    user_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    week TEXT NOT NULL,
+    volume_kg REAL NOT NULL DEFAULT 0,
+    set_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, week, category_id)
+) WITHOUT ROWID;
+
+CREATE TABLE weekly_workout_stats (
+    user_id INTEGER NOT NULL,
+    week TEXT NOT NULL,
+    workout_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, week)
+) WITHOUT ROWID;
+
+-- Indexy pro nejčastější dotazy (stejné jako v migracích v migrations.py)
+CREATE INDEX idx_workout_exercises_workout ON workout_exercises (workout_id, exercise_id, sets, reps, weight);
+CREATE INDEX idx_workouts_user_date ON workouts (user_id, date, id, training_type_id);
+CREATE INDEX idx_workouts_user_type_date ON workouts (user_id, training_type_id, date, id);
+CREATE INDEX idx_workouts_date ON workouts (date, id, training_type_id, user_id);
+CREATE INDEX idx_exercises_category ON exercises (category_id, name);
+CREATE UNIQUE INDEX idx_workout_sets_exercise ON workout_sets (workout_exercise_id, set_number);
+CREATE INDEX idx_exercise_daily_stats_user_date ON exercise_daily_stats (user_id, date);
+CREATE UNIQUE INDEX idx_workouts_user_client ON workouts (user_id, client_id) WHERE client_id IS NOT NULL;
+
 -- Vložení základních typů tréninků
 INSERT INTO training_types (name, description) VALUES 
 ('ZPR', 'Záda, Prsa, Ramena'),
@@ -181,4 +265,226 @@ INSERT INTO exercises (name, category_id) VALUES
 
 -- Funkční
 ('Muscle-up', 10),
-('Angličák', 10);
\ No newline at end of file
+('Angličák', 10);
+
+-- Verze číselníků pro cache a ETagy (catalog.py), zvyšují ji triggery
+CREATE TABLE catalog_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+
+INSERT INTO catalog_version (id, version, updated_at) VALUES (1, 1, strftime('%s', 'now'));
+
+CREATE TRIGGER trg_training_types_insert_version AFTER INSERT ON training_types
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+END;
+
+CREATE TRIGGER trg_training_types_update_version AFTER UPDATE ON training_types
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+END;
+
+CREATE TRIGGER trg_training_types_delete_version AFTER DELETE ON training_types
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+END;
+
+CREATE TRIGGER trg_exercise_categories_insert_version AFTER INSERT ON exercise_categories
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+END;
+
+CREATE TRIGGER trg_exercise_categories_update_version AFTER UPDATE ON exercise_categories
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+END;
+
+CREATE TRIGGER trg_exercise_categories_delete_version AFTER DELETE ON exercise_categories
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+END;
+
+CREATE TRIGGER trg_exercises_insert_version AFTER INSERT ON exercises
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+END;
+
+CREATE TRIGGER trg_exercises_update_version AFTER UPDATE ON exercises
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+END;
+
+CREATE TRIGGER trg_exercises_delete_version AFTER DELETE ON exercises
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = strftime('%s', 'now') WHERE id = 1;
+END;
+
+-- Fulltextové vyhledávání (search.py), tokenizer ignoruje diakritiku
+CREATE VIRTUAL TABLE workouts_fts USING fts5(
+    notes, exercises, tokenize = "unicode61 remove_diacritics 2", prefix = '2 3'
+);
+
+CREATE VIRTUAL TABLE exercises_fts USING fts5(
+    name, content = 'exercises', content_rowid = 'id', tokenize = "unicode61 remove_diacritics 2", prefix = '2 3'
+);
+
+INSERT INTO exercises_fts (exercises_fts) VALUES ('rebuild');
+
+CREATE TRIGGER trg_workouts_search_insert AFTER INSERT ON workouts
+BEGIN
+    INSERT INTO workouts_fts (rowid, notes, exercises) VALUES (new.id, coalesce(new.notes, ''), '');
+END;
+
+CREATE TRIGGER trg_workouts_search_update AFTER UPDATE OF notes ON workouts
+BEGIN
+    UPDATE workouts_fts SET notes = coalesce(new.notes, '') WHERE rowid = new.id;
+END;
+
+CREATE TRIGGER trg_workouts_search_delete AFTER DELETE ON workouts
+BEGIN
+    DELETE FROM workouts_fts WHERE rowid = old.id;
+END;
+
+CREATE TRIGGER trg_workout_exercises_search_insert AFTER INSERT ON workout_exercises
+BEGIN
+    UPDATE workouts_fts SET exercises = (
+        SELECT coalesce(group_concat(e.name, ' | '), '')
+        FROM workout_exercises we JOIN exercises e ON e.id = we.exercise_id
+        WHERE we.workout_id = new.workout_id
+    )
+    WHERE rowid = new.workout_id;
+END;
+
+CREATE TRIGGER trg_workout_exercises_search_update AFTER UPDATE OF exercise_id, workout_id ON workout_exercises
+BEGIN
+    UPDATE workouts_fts SET exercises = (
+        SELECT coalesce(group_concat(e.name, ' | '), '')
+        FROM workout_exercises we JOIN exercises e ON e.id = we.exercise_id
+        WHERE we.workout_id = workouts_fts.rowid
+    )
+    WHERE rowid IN (old.workout_id, new.workout_id);
+END;
+
+CREATE TRIGGER trg_workout_exercises_search_delete AFTER DELETE ON workout_exercises
+BEGIN
+    UPDATE workouts_fts SET exercises = (
+        SELECT coalesce(group_concat(e.name, ' | '), '')
+        FROM workout_exercises we JOIN exercises e ON e.id = we.exercise_id
+        WHERE we.workout_id = old.workout_id
+    )
+    WHERE rowid = old.workout_id;
+END;
+
+CREATE TRIGGER trg_exercises_search_insert AFTER INSERT ON exercises
+BEGIN
+    INSERT INTO exercises_fts (rowid, name) VALUES (new.id, new.name);
+END;
+
+CREATE TRIGGER trg_exercises_search_update AFTER UPDATE OF name ON exercises
+BEGIN
+    INSERT INTO exercises_fts (exercises_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    INSERT INTO exercises_fts (rowid, name) VALUES (new.id, new.name);
+    UPDATE workouts_fts SET exercises = (
+        SELECT coalesce(group_concat(e.name, ' | '), '')
+        FROM workout_exercises we JOIN exercises e ON e.id = we.exercise_id
+        WHERE we.workout_id = workouts_fts.rowid
+    )
+    WHERE rowid IN (SELECT workout_id FROM workout_exercises WHERE exercise_id = new.id);
+END;
+
+CREATE TRIGGER trg_exercises_search_delete AFTER DELETE ON exercises
+BEGIN
+    INSERT INTO exercises_fts (exercises_fts, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+
+-- Sledování změn pro inkrementální synchronizaci (sync.py)
+CREATE TABLE sync_clock (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    seq INTEGER NOT NULL,
+    pruned_seq INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO sync_clock (id, seq, pruned_seq) VALUES (1, 0, 0);
+
+CREATE TABLE sync_tombstones (
+    change_seq INTEGER PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    workout_id INTEGER NOT NULL,
+    user_id INTEGER,
+    deleted_at TEXT NOT NULL
+);
+
+CREATE INDEX idx_sync_tombstones_user ON sync_tombstones (user_id, change_seq);
+
+CREATE INDEX idx_workouts_user_change ON workouts (user_id, change_seq);
+
+CREATE INDEX idx_workout_exercises_change ON workout_exercises (change_seq);
+
+CREATE TRIGGER trg_workouts_sync_insert AFTER INSERT ON workouts
+BEGIN
+    UPDATE sync_clock SET seq = seq + 1 WHERE id = 1;
+    UPDATE workouts SET change_seq = (SELECT seq FROM sync_clock WHERE id = 1), updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = new.id;
+END;
+
+CREATE TRIGGER trg_workouts_sync_update AFTER UPDATE OF date, training_type_id, notes, user_id, version ON workouts
+BEGIN
+    UPDATE sync_clock SET seq = seq + 1 WHERE id = 1;
+    UPDATE workouts SET change_seq = (SELECT seq FROM sync_clock WHERE id = 1), updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = new.id;
+END;
+
+CREATE TRIGGER trg_workouts_sync_delete AFTER DELETE ON workouts
+BEGIN
+    UPDATE sync_clock SET seq = seq + 1 WHERE id = 1;
+    INSERT INTO sync_tombstones (change_seq, table_name, row_id, workout_id, user_id, deleted_at)
+    VALUES ((SELECT seq FROM sync_clock WHERE id = 1), 'workouts', old.id, old.id, old.user_id, strftime('%Y-%m-%dT%H:%M:%fZ', 'now'));
+    UPDATE sync_tombstones SET user_id = old.user_id WHERE user_id IS NULL AND workout_id = old.id;
+END;
+
+CREATE TRIGGER trg_workout_exercises_sync_insert AFTER INSERT ON workout_exercises
+BEGIN
+    UPDATE sync_clock SET seq = seq + 1 WHERE id = 1;
+    UPDATE workout_exercises SET change_seq = (SELECT seq FROM sync_clock WHERE id = 1), updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = new.id;
+END;
+
+CREATE TRIGGER trg_workout_exercises_sync_update AFTER UPDATE OF workout_id, exercise_id, sets, reps, weight ON workout_exercises
+BEGIN
+    UPDATE sync_clock SET seq = seq + 1 WHERE id = 1;
+    UPDATE workout_exercises SET change_seq = (SELECT seq FROM sync_clock WHERE id = 1), updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') WHERE id = new.id;
+END;
+
+CREATE TRIGGER trg_workout_exercises_sync_delete AFTER DELETE ON workout_exercises
+BEGIN
+    UPDATE sync_clock SET seq = seq + 1 WHERE id = 1;
+    INSERT INTO sync_tombstones (change_seq, table_name, row_id, workout_id, user_id, deleted_at)
+    VALUES ((SELECT seq FROM sync_clock WHERE id = 1), 'workout_exercises', old.id, old.workout_id,
+            (SELECT user_id FROM workouts WHERE id = old.workout_id), strftime('%Y-%m-%dT%H:%M:%fZ', 'now'));
+END;
+
+-- Fronta úloh na pozadí (jobs.py)
+CREATE TABLE jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    user_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued',
+    dedup_key TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after REAL NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    FOREIGN KEY(user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_jobs_queue ON jobs (status, run_after, id);
+CREATE UNIQUE INDEX idx_jobs_dedup ON jobs (dedup_key)
+WHERE dedup_key IS NOT NULL AND status IN ('queued', 'running');
+CREATE INDEX idx_jobs_user ON jobs (user_id, id);
@@ -0,0 +1,138 @@
+"""
+Fulltextové vyhledávání v trénincích a cvicích aplikace Balift (SQLite FTS5)
+
+Index workouts_fts má jeden dokument na trénink (rowid = id tréninku)
+se sloupci notes a exercises (názvy cviků tréninku). Index exercises_fts
+je externí obsah nad tabulkou exercises. Oba udržují aktuální triggery,
+tokenizer odstraňuje diakritiku, takže 'pritahy' najde 'Přítahy'.
+"""
+
+import re
+
+TOKENIZE = "unicode61 remove_diacritics 2"
+MAX_TERMS = 10
+
+# Názvy cviků tréninku oddělené svislítkem (tokenizer ho ignoruje)
+_WORKOUT_EXERCISES = '''(
+    SELECT coalesce(group_concat(e.name, ' | '), '')
+    FROM workout_exercises we JOIN exercises e ON e.id = we.exercise_id
+    WHERE we.workout_id = {workout_id}
+)'''
+
+# DDL indexů a triggerů, stejné příkazy jsou i ve schema.sql
+SCHEMA = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS workouts_fts USING fts5(
+        notes, exercises, tokenize = "{TOKENIZE}", prefix = '2 3'
+    )''',
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS exercises_fts USING fts5(
+        name, content = 'exercises', content_rowid = 'id', tokenize = "{TOKENIZE}", prefix = '2 3'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_workouts_search_insert AFTER INSERT ON workouts
+    BEGIN
+        INSERT INTO workouts_fts (rowid, notes, exercises) VALUES (new.id, coalesce(new.notes, ''), '');
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_workouts_search_update AFTER UPDATE OF notes ON workouts
+    BEGIN
+        UPDATE workouts_fts SET notes = coalesce(new.notes, '') WHERE rowid = new.id;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_workouts_search_delete AFTER DELETE ON workouts
+    BEGIN
+        DELETE FROM workouts_fts WHERE rowid = old.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_workout_exercises_search_insert AFTER INSERT ON workout_exercises
+    BEGIN
+        UPDATE workouts_fts SET exercises = {_WORKOUT_EXERCISES.format(workout_id='new.workout_id')}
+        WHERE rowid = new.workout_id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_workout_exercises_search_update AFTER UPDATE OF exercise_id, workout_id ON workout_exercises
+    BEGIN
+        UPDATE workouts_fts SET exercises = {_WORKOUT_EXERCISES.format(workout_id='workouts_fts.rowid')}
+        WHERE rowid IN (old.workout_id, new.workout_id);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_workout_exercises_search_delete AFTER DELETE ON workout_exercises
+    BEGIN
+        UPDATE workouts_fts SET exercises = {_WORKOUT_EXERCISES.format(workout_id='old.workout_id')}
+        WHERE rowid = old.workout_id;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_exercises_search_insert AFTER INSERT ON exercises
+    BEGIN
+        INSERT INTO exercises_fts (rowid, name) VALUES (new.id, new.name);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_exercises_search_update AFTER UPDATE OF name ON exercises
+    BEGIN
+        INSERT INTO exercises_fts (exercises_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO exercises_fts (rowid, name) VALUES (new.id, new.name);
+        UPDATE workouts_fts SET exercises = {_WORKOUT_EXERCISES.format(workout_id='workouts_fts.rowid')}
+        WHERE rowid IN (SELECT workout_id FROM workout_exercises WHERE exercise_id = new.id);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS trg_exercises_search_delete AFTER DELETE ON exercises
+    BEGIN
+        INSERT INTO exercises_fts (exercises_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END''',
+]
+
+
+def create_index(db):
+    """Vytvoří indexy a triggery a naplní je z existujících dat."""
+    for statement in SCHEMA:
+        db.execute(statement)
+    rebuild(db)
+
+
+def rebuild(db):
+    """Znovu sestaví oba indexy z tabulek workouts, workout_exercises a exercises."""
+    db.execute('DELETE FROM workouts_fts')
+    db.execute(
+        f'''INSERT INTO workouts_fts (rowid, notes, exercises)
+        SELECT w.id, coalesce(w.notes, ''), {_WORKOUT_EXERCISES.format(workout_id='w.id')}
+        FROM workouts w'''
+    )
+    db.execute("INSERT INTO exercises_fts (exercises_fts) VALUES ('rebuild')")
+
+
+def build_query(text):
+    """
+    Převede text od uživatele na bezpečný FTS5 dotaz - každé slovo
+    jako prefix v uvozovkách, všechna slova musí být nalezena.
+    Vrací None, pokud text neobsahuje žádné slovo.
+    """
+    terms = re.findall(r'\w+', text or '')[:MAX_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_workouts(db, user_id, query, limit, offset=0):
+    """
+    Tréninky uživatele odpovídající dotazu seřazené podle relevance (bm25,
+    shoda v názvu cviku má dvojnásobnou váhu). Vrací limit + 1 řádků,
+    aby volající poznal, zda existuje další stránka.
+    """
+    rows = db.execute(
+        '''SELECT w.id, w.date, w.training_type_id, t.name AS training_type_name, w.notes,
+            workouts_fts.exercises AS exercise_names,
+            bm25(workouts_fts, 1.0, 2.0) AS score
+        FROM workouts_fts
+        JOIN workouts w ON w.id = workouts_fts.rowid
+        LEFT JOIN training_types t ON t.id = w.training_type_id
+        WHERE workouts_fts MATCH ? AND w.user_id = ?
+        ORDER BY score, w.date DESC, w.id DESC
+        LIMIT ? OFFSET ?''',
+        (query, user_id, limit + 1, offset)
+    )
+    return [dict(row) for row in rows]
+
+
+def search_exercises(db, query, category_id=None, limit=50):
+    """Cviky odpovídající dotazu, volitelně jen z jedné partie."""
+    sql = '''SELECT e.id, e.name, e.category_id, e.description, bm25(exercises_fts) AS score
+        FROM exercises_fts
+        JOIN exercises e ON e.id = exercises_fts.rowid
+        WHERE exercises_fts MATCH ?'''
+    params = [query]
+    if category_id:
+        sql += ' AND e.category_id = ?'
+        params.append(category_id)
+    sql += ' ORDER BY score, e.name LIMIT ?'
+    params.append(limit)
+    return [dict(row) for row in db.execute(sql, params)]
@@ -0,0 +1,125 @@
+"""
+Parser textových zápisů opakování a vah v aplikaci Balift
+
+Textová pole workout_exercises.reps a .weight zůstávají beze změny, parser
+z nich jen odvozuje jednotlivé série pro tabulku workout_sets.
+
+Podporované zápisy:
+- opakování: '10-8-6', '10/8/6', '10, 8, 6', '3x10', '12' (platí pro všechny série)
+- čas: '60s-45s-30s', '1:30', '2min', '90 s'
+- váha: '60-70-80', '22,5-25', '22.5kg', '+10', '0'; 'BW', 'max' apod. = bez hodnoty
+"""
+
+import re
+from collections import namedtuple
+
+ParsedSet = namedtuple('ParsedSet', ['set_number', 'reps', 'duration_s', 'weight_kg'])
+
+# Maximální počet sérií, který má smysl rozepisovat (ochrana proti nesmyslům typu '1000x1')
+MAX_SETS = 50
+
+_SETS_TIMES_REPS = re.compile(r'^\s*(\d+)\s*[x×*]\s*(\d+\s*(?:s|sec|min|m)?)\s*$', re.IGNORECASE)
+_SEPARATORS = re.compile(r'\s*[-/;|–]\s*|\s+')
+# Ve vahách odděluje hodnoty i čárka následovaná mezerou ('60, 70, 80'), '22,5' je desetinné číslo
+_WEIGHT_SEPARATORS = re.compile(r'\s*(?:[-/;|–]|,(?=\s))\s*|\s+')
+_DURATION_SECONDS = re.compile(r'^(\d+(?:[.,]\d+)?)\s*(s|sec|sek)$', re.IGNORECASE)
+_DURATION_MINUTES = re.compile(r'^(\d+(?:[.,]\d+)?)\s*(m|min)$', re.IGNORECASE)
+_DURATION_CLOCK = re.compile(r'^(\d+):([0-5]\d)$')
+_UNIT_SPACE = re.compile(r'(\d)\s+(s|sec|sek|min|m|kg)\b', re.IGNORECASE)
+_DECIMAL_COMMA = re.compile(r'^\+?\d+,(\d|25|75)(kg)?$', re.IGNORECASE)
+_INTEGER = re.compile(r'^\d+$')
+_NUMBER = re.compile(r'^\+?(\d+(?:[.,]\d+)?)\s*(kg)?$', re.IGNORECASE)
+
+
+def _split(text, decimal_comma):
+    """
+    Rozdělí zápis na jednotlivé hodnoty. Čárka je oddělovač, pokud se nejedná
+    o desetinnou čárku ve váze ('22,5-25' nebo samotné '22,5'); ve vahách
+    je oddělovačem vždy čárka s mezerou za ní ('22,5, 25').
+    """
+    text = _UNIT_SPACE.sub(r'\1\2', (text or '').strip())
+    if not text:
+        return []
+
+    if decimal_comma and (_SEPARATORS.search(text) or _DECIMAL_COMMA.match(text)):
+        tokens = [token.rstrip(',') for token in _WEIGHT_SEPARATORS.split(text)]
+    else:
+        tokens = re.split(r'\s*[,;/|–-]\s*|\s+', text)
+    return [token for token in tokens if token]
+
+
+def parse_reps_token(token):
+    """Vrátí dvojici (opakování, sekundy) pro jednu hodnotu, neznámé hodnoty jsou None."""
+    token = token.strip()
+    if _INTEGER.match(token):
+        return int(token), None
+
+    match = _DURATION_SECONDS.match(token)
+    if match:
+        return None, int(round(float(match.group(1).replace(',', '.'))))
+
+    match = _DURATION_MINUTES.match(token)
+    if match:
+        return None, int(round(float(match.group(1).replace(',', '.')) * 60))
+
+    match = _DURATION_CLOCK.match(token)
+    if match:
+        return None, int(match.group(1)) * 60 + int(match.group(2))
+
+    return None, None
+
+
+def parse_weight_token(token):
+    """Vrátí váhu v kg pro jednu hodnotu, nebo None (vlastní váha, 'max', ...)."""
+    match = _NUMBER.match(token.strip())
+    if match:
+        return float(match.group(1).replace(',', '.'))
+    return None
+
+
+def parse_reps(text):
+    """Rozloží zápis opakování na seznam dvojic (opakování, sekundy)."""
+    match = _SETS_TIMES_REPS.match(text or '')
+    if match:
+        count = min(int(match.group(1)), MAX_SETS)
+        return [parse_reps_token(match.group(2).replace(' ', ''))] * count
+    return [parse_reps_token(token) for token in _split(text, decimal_comma=False)]
+
+
+def parse_weights(text):
+    """Rozloží zápis vah na seznam hodnot v kg."""
+    return [parse_weight_token(token) for token in _split(text, decimal_comma=True)]
+
+
+def _expand(values, count, empty):
+    """Jediná hodnota platí pro všechny série, chybějící hodnoty doplní prázdnou."""
+    if len(values) == 1:
+        return values * count
+    return values[:count] + [empty] * (count - len(values))
+
+
+def parse_sets(sets, reps, weight):
+    """
+    Odvodí jednotlivé série z počtu sérií a textových zápisů opakování a váhy.
+    Vrací seznam ParsedSet číslovaný od 1.
+    """
+    reps_values = parse_reps(reps)
+    weight_values = parse_weights(weight)
+
+    try:
+        declared = int(sets or 0)
+    except (TypeError, ValueError):
+        declared = 0
+
+    count = min(max(declared, len(reps_values), len(weight_values)), MAX_SETS)
+    if count == 0:
+        return []
+
+    reps_values = _expand(reps_values, count, (None, None))
+    weight_values = _expand(weight_values, count, None)
+
+    return [
+        ParsedSet(number, reps_value, duration, weight_value)
+        for number, ((reps_value, duration), weight_value)
+        in enumerate(zip(reps_values, weight_values), start=1)
+    ]
@@ -0,0 +1,139 @@
+/**
+ * Sdílené úložiště číselníků (typy tréninků, partie, cviky) pro Balift aplikaci
+ *
+ * Katalog se stahuje jedním požadavkem na /api/catalog, drží se v paměti
+ * stránky a v localStorage. Se serverem se ověřuje jednou za relaci
+ * prohlížeče podmíněným požadavkem (If-None-Match), při shodě server
+ * vrátí 304 a použije se uložená kopie.
+ */
+
+const CatalogStore = (function() {
+    const STORAGE_KEY = 'balift.catalog';
+    const SESSION_KEY = 'balift.catalog.validated';
+
+    // Příslib načtení katalogu pro aktuální stránku
+    let pending = null;
+
+    function readStored() {
+        try {
+            return JSON.parse(localStorage.getItem(STORAGE_KEY));
+        } catch (e) {
+            return null;
+        }
+    }
+
+    function writeStored(etag, data) {
+        try {
+            localStorage.setItem(STORAGE_KEY, JSON.stringify({ etag: etag, data: data }));
+            sessionStorage.setItem(SESSION_KEY, etag || '');
+        } catch (e) {
+            // Plné nebo zakázané úložiště - katalog zůstane jen v paměti
+        }
+    }
+
+    function fetchCatalog(stored) {
+        const deferred = $.Deferred();
+        const headers = {};
+        if (stored && stored.etag) {
+            headers['If-None-Match'] = stored.etag;
+        }
+
+        $.ajax({
+            url: '/api/catalog',
+            method: 'GET',
+            headers: headers,
+            success: function(data, textStatus, xhr) {
+                if (xhr.status === 304 && stored) {
+                    writeStored(stored.etag, stored.data);
+                    deferred.resolve(stored.data);
+                    return;
+                }
+                writeStored(xhr.getResponseHeader('ETag'), data);
+                deferred.resolve(data);
+            },
+            error: function(xhr) {
+                // Bez spojení použijeme poslední uloženou verzi, pokud existuje
+                if (stored) {
+                    deferred.resolve(stored.data);
+                } else {
+                    deferred.reject(xhr);
+                }
+            }
+        });
+
+        return deferred.promise();
+    }
+
+    // Vrátí příslib s celým katalogem ({version, training_types, exercise_categories, exercises})
+    function load() {
+        if (pending) {
+            return pending;
+        }
+
+        const stored = readStored();
+        let validated = null;
+        try {
+            validated = sessionStorage.getItem(SESSION_KEY);
+        } catch (e) {
+            validated = null;
+        }
+
+        if (stored && validated !== null && validated === (stored.etag || '')) {
+            pending = $.Deferred().resolve(stored.data).promise();
+        } else {
+            pending = fetchCatalog(stored);
+        }
+
+        // Při chybě dovolíme další pokus
+        pending.fail(function() {
+            pending = null;
+        });
+        return pending;
+    }
+
+    // Zahodí uložený katalog (např. po přidání cviku), další load() ho stáhne znovu
+    function invalidate() {
+        pending = null;
+        try {
+            sessionStorage.removeItem(SESSION_KEY);
+        } catch (e) {
+            // Ignorujeme
+        }
+    }
+
+    function trainingTypes() {
+        return load().then(catalog => catalog.training_types);
+    }
+
+    function exerciseCategories() {
+        return load().then(catalog => catalog.exercise_categories);
+    }
+
+    function exercises(categoryId = null) {
+        return load().then(function(catalog) {
+            if (!categoryId) {
+                return catalog.exercises;
+            }
+            return catalog.exercises.filter(exercise => exercise.category_id == categoryId);
+        });
+    }
+
+    function categoryMap() {
+        return exerciseCategories().then(function(categories) {
+            const map = {};
+            categories.forEach(category => {
+                map[category.id] = category.name;
+            });
+            return map;
+        });
+    }
+
+    return {
+        load: load,
+        invalidate: invalidate,
+        trainingTypes: trainingTypes,
+        exerciseCategories: exerciseCategories,
+        exercises: exercises,
+        categoryMap: categoryMap
+    };
+})();
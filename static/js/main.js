@@ -21,6 +21,22 @@ $.fn.datepicker.dates['cs'] = {
     format: "yyyy-mm-dd"
 };
 
+// Vypršelé přihlášení - API vrací 401, přesměrujeme na přihlašovací stránku
+$(document).ajaxError(function(event, xhr) {
+    if (xhr.status === 401) {
+        window.location.href = '/login';
+    }
+});
+
+// Service worker pro offline režim (cache stránek, statických souborů a číselníků)
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', function() {
+        navigator.serviceWorker.register('/sw.js').catch(function() {
+            // Aplikace funguje i bez service workeru, jen bez offline režimu
+        });
+    });
+}
+
 // Inicializace všech tooltipů a popoverů
 $(function () {
     $('[data-bs-toggle="tooltip"]').tooltip();
@@ -152,90 +168,56 @@ function initDatepickers() {
     });
 }
 
-// Funkce pro načtení typů tréninků
-function loadTrainingTypes(selectElement, selectedValue = null) {
-    $.ajax({
-        url: '/api/training_types',
-        method: 'GET',
-        success: function(data) {
-            const select = $(selectElement);
-            select.empty();
-            select.append('<option value="">-- Vyberte typ tréninku --</option>');
-
-            data.forEach(function(type) {
-                const option = $('<option></option>')
-                    .attr('value', type.id)
-                    .text(type.name);
-
-                if (selectedValue && selectedValue == type.id) {
-                    option.attr('selected', 'selected');
-                }
-
-                select.append(option);
-            });
-        },
-        error: function() {
-            showError('Nepodařilo se načíst typy tréninků');
+// Funkce pro naplnění selectu položkami číselníku
+function fillSelect(selectElement, items, placeholder, selectedValue = null) {
+    const select = $(selectElement);
+    select.empty();
+    select.append(`<option value="">${placeholder}</option>`);
+
+    items.forEach(function(item) {
+        const option = $('<option></option>')
+            .attr('value', item.id)
+            .text(item.name);
+
+        if (selectedValue && selectedValue == item.id) {
+            option.attr('selected', 'selected');
         }
+
+        select.append(option);
     });
 }
 
+// Funkce pro načtení typů tréninků (z katalogu, viz catalog.js)
+function loadTrainingTypes(selectElement, selectedValue = null) {
+    CatalogStore.trainingTypes()
+        .done(function(types) {
+            fillSelect(selectElement, types, '-- Vyberte typ tréninku --', selectedValue);
+        })
+        .fail(function() {
+            showError('Nepodařilo se načíst typy tréninků');
+        });
+}
+
 // Funkce pro načtení kategorií cviků
 function loadExerciseCategories(selectElement, selectedValue = null) {
-    $.ajax({
-        url: '/api/exercise_categories',
-        method: 'GET',
-        success: function(data) {
-            const select = $(selectElement);
-            select.empty();
-            select.append('<option value="">-- Vyberte kategorii --</option>');
-
-            data.forEach(function(category) {
-                const option = $('<option></option>')
-                    .attr('value', category.id)
-                    .text(category.name);
-
-                if (selectedValue && selectedValue == category.id) {
-                    option.attr('selected', 'selected');
-                }
-
-                select.append(option);
-            });
-        },
-        error: function() {
+    CatalogStore.exerciseCategories()
+        .done(function(categories) {
+            fillSelect(selectElement, categories, '-- Vyberte kategorii --', selectedValue);
+        })
+        .fail(function() {
             showError('Nepodařilo se načíst kategorie cviků');
-        }
-    });
+        });
 }
 
 // Funkce pro načtení cviků podle kategorie
 function loadExercisesByCategory(categoryId, selectElement, selectedValue = null) {
-    const url = categoryId ? `/api/exercises?category_id=${categoryId}` : '/api/exercises';
-
-    $.ajax({
-        url: url,
-        method: 'GET',
-        success: function(data) {
-            const select = $(selectElement);
-            select.empty();
-            select.append('<option value="">-- Vyberte cvik --</option>');
-
-            data.forEach(function(exercise) {
-                const option = $('<option></option>')
-                    .attr('value', exercise.id)
-                    .text(exercise.name);
-
-                if (selectedValue && selectedValue == exercise.id) {
-                    option.attr('selected', 'selected');
-                }
-
-                select.append(option);
-            });
-        },
-        error: function() {
+    CatalogStore.exercises(categoryId)
+        .done(function(exercises) {
+            fillSelect(selectElement, exercises, '-- Vyberte cvik --', selectedValue);
+        })
+        .fail(function() {
             showError('Nepodařilo se načíst cviky');
-        }
-    });
+        });
 }
 
 // Po načtení dokumentu
@@ -0,0 +1,187 @@
+/**
+ * Service worker pro Balift aplikaci
+ *
+ * Statické soubory (CSS, JS, ikony, knihovny z CDN) se předem uloží do cache
+ * a servírují z ní. Stránky a číselníky (/api/catalog a spol.) se načítají
+ * ze sítě a při výpadku spojení se použije poslední uložená verze.
+ * Sestavené soubory (static/dist, viz assets.py) mají v názvu otisk obsahu,
+ * takže se z cache servírují bez dalšího ověřování.
+ * Ukládání tréninků bez spojení řeší fronta v sync.js.
+ */
+
+const CACHE_VERSION = 'v2';
+const STATIC_CACHE = `balift-static-${CACHE_VERSION}`;
+const PAGES_CACHE = `balift-pages-${CACHE_VERSION}`;
+const API_CACHE = `balift-api-${CACHE_VERSION}`;
+
+const STATIC_ASSETS = [
+    '/static/css/style.css',
+    '/static/js/app.js',
+    '/static/js/workout.js',
+    '/static/favicon.ico',
+    '/static/icon-192.png',
+    '/static/manifest.webmanifest'
+];
+
+// Knihovny z base.html (odpovědi z cizí domény se ukládají jako neprůhledné)
+const CDN_ASSETS = [
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.5.1/css/all.min.css',
+    'https://cdnjs.cloudflare.com/ajax/libs/bootstrap-datepicker/1.9.0/css/bootstrap-datepicker.min.css',
+    'https://code.jquery.com/jquery-3.7.1.min.js',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'https://cdnjs.cloudflare.com/ajax/libs/bootstrap-datepicker/1.9.0/js/bootstrap-datepicker.min.js',
+    'https://cdnjs.cloudflare.com/ajax/libs/bootstrap-datepicker/1.9.0/locales/bootstrap-datepicker.cs.min.js'
+];
+
+// Manifest sestavení (flask build-assets) - mapování balíčků na soubory s otiskem
+const DIST_MANIFEST = '/static/dist/manifest.json';
+
+// Stránky, které mají fungovat i bez spojení
+const PAGES = ['/', '/workouts', '/workouts/add', '/exercises'];
+
+const CATALOG_API = ['/api/catalog', '/api/training_types', '/api/exercise_categories', '/api/exercises'];
+
+// Do cache ukládáme jen úspěšné odpovědi bez přesměrování (např. na přihlášení)
+function cacheable(response) {
+    return response && (response.type === 'opaque' || (response.ok && !response.redirected));
+}
+
+async function precache() {
+    const staticCache = await caches.open(STATIC_CACHE);
+    await staticCache.addAll(STATIC_ASSETS);
+
+    // Sestavené soubory, pokud aplikace běží se sestavenými assety
+    try {
+        const response = await fetch(DIST_MANIFEST, { cache: 'no-store' });
+        if (response.ok) {
+            const files = Object.values(await response.json());
+            await staticCache.addAll(files.map(file => `/static/${file}`));
+        }
+    } catch (e) {
+        // Bez sestavení se používají zdrojové soubory
+    }
+
+    // Knihovny a stránky jen podle možností - nedostupná položka instalaci nezastaví
+    await Promise.all(CDN_ASSETS.map(async url => {
+        try {
+            const request = new Request(url, { mode: 'no-cors' });
+            await staticCache.put(request, await fetch(request));
+        } catch (e) {
+            // Uloží se při prvním použití
+        }
+    }));
+
+    const pagesCache = await caches.open(PAGES_CACHE);
+    await Promise.all(PAGES.map(async url => {
+        try {
+            const response = await fetch(url, { credentials: 'same-origin' });
+            if (cacheable(response)) {
+                await pagesCache.put(url, response);
+            }
+        } catch (e) {
+            // Nepřihlášený uživatel nebo bez spojení
+        }
+    }));
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil(precache().then(() => self.skipWaiting()));
+});
+
+self.addEventListener('activate', event => {
+    const current = [STATIC_CACHE, PAGES_CACHE, API_CACHE];
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys.filter(key => !current.includes(key)).map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+// Síť, při chybě poslední uložená odpověď
+async function networkFirst(request, cacheName, fallbackUrl = null) {
+    const cache = await caches.open(cacheName);
+    try {
+        const response = await fetch(request);
+        if (cacheable(response) && response.status === 200) {
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (e) {
+        const cached = await cache.match(request, { ignoreVary: true })
+            || (fallbackUrl && await cache.match(fallbackUrl));
+        if (cached) {
+            return cached;
+        }
+        return new Response('Aplikace je offline a tato stránka není uložená.', {
+            status: 503,
+            headers: { 'Content-Type': 'text/plain; charset=utf-8' }
+        });
+    }
+}
+
+// Soubory s otiskem obsahu se nemění - stačí cache, síť jen při prvním použití
+async function cacheFirst(request) {
+    const cache = await caches.open(STATIC_CACHE);
+    const cached = await cache.match(request);
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (cacheable(response)) {
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+// Cache, na pozadí aktualizace z sítě
+async function staleWhileRevalidate(request) {
+    const cache = await caches.open(STATIC_CACHE);
+    const cached = await cache.match(request);
+    const update = fetch(request)
+        .then(response => {
+            if (cacheable(response)) {
+                cache.put(request, response.clone());
+            }
+            return response;
+        })
+        .catch(() => cached);
+    return cached || update;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+
+    const url = new URL(request.url);
+    const sameOrigin = url.origin === self.location.origin;
+
+    // Po odhlášení zahodíme uložené stránky a data předchozího uživatele
+    if (sameOrigin && url.pathname === '/logout') {
+        event.respondWith(
+            Promise.all([caches.delete(PAGES_CACHE), caches.delete(API_CACHE)]).then(() => fetch(request))
+        );
+        return;
+    }
+
+    if (sameOrigin && CATALOG_API.includes(url.pathname)) {
+        event.respondWith(networkFirst(request, API_CACHE));
+        return;
+    }
+
+    if (request.mode === 'navigate' && sameOrigin) {
+        event.respondWith(networkFirst(request, PAGES_CACHE, '/'));
+        return;
+    }
+
+    if (sameOrigin && url.pathname.startsWith('/static/dist/') && url.pathname !== DIST_MANIFEST) {
+        event.respondWith(cacheFirst(request));
+        return;
+    }
+
+    if ((sameOrigin && url.pathname.startsWith('/static/')) || CDN_ASSETS.includes(request.url)) {
+        event.respondWith(staleWhileRevalidate(request));
+    }
+});
@@ -0,0 +1,199 @@
+/**
+ * Fronta neodeslaných změn tréninků pro Balift aplikaci
+ *
+ * Když se uložení tréninku nepovede kvůli chybějícímu spojení, požadavek
+ * se uloží do IndexedDB a odešle se znovu po obnovení spojení (událost
+ * online, načtení stránky, pravidelný pokus). Nové tréninky nesou client_id
+ * vygenerované v prohlížeči, takže opakované odeslání nevytvoří duplikát.
+ * Úpravy stejného tréninku se ve frontě slučují - odešle se jen poslední.
+ */
+
+const SyncQueue = (function() {
+    const DB_NAME = 'balift';
+    const STORE = 'outbox';
+    const RETRY_INTERVAL_MS = 60000;
+
+    let dbPromise = null;
+    let flushing = null;
+
+    function openDb() {
+        if (!dbPromise) {
+            dbPromise = new Promise(function(resolve, reject) {
+                if (!window.indexedDB) {
+                    reject(new Error('IndexedDB není k dispozici'));
+                    return;
+                }
+                const request = indexedDB.open(DB_NAME, 1);
+                request.onupgradeneeded = function() {
+                    request.result.createObjectStore(STORE, { keyPath: 'key' });
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+            dbPromise.catch(() => { dbPromise = null; });
+        }
+        return dbPromise;
+    }
+
+    // Jedna operace nad úložištěm fronty
+    function withStore(mode, operation) {
+        return openDb().then(db => new Promise(function(resolve, reject) {
+            const tx = db.transaction(STORE, mode);
+            const request = operation(tx.objectStore(STORE));
+            tx.oncomplete = () => resolve(request ? request.result : undefined);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        }));
+    }
+
+    // ID přihlášeného uživatele z <body data-user-id>, fronta jiných uživatelů se neodesílá
+    function currentUserId() {
+        return document.body.dataset.userId || '';
+    }
+
+    function newClientId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return 'c' + Date.now().toString(36) + Math.random().toString(36).slice(2, 12);
+    }
+
+    // Chyby, po kterých má smysl požadavek zopakovat později
+    function isRetryable(xhr) {
+        return xhr.status === 0 || xhr.status === 429 || xhr.status >= 500;
+    }
+
+    function pendingEntries() {
+        const userId = currentUserId();
+        return withStore('readonly', store => store.getAll())
+            .then(entries => entries
+                .filter(entry => entry.user_id === userId && !entry.failed)
+                .sort((a, b) => a.queued_at - b.queued_at));
+    }
+
+    /**
+     * Uloží požadavek do fronty. Nový trénink (POST) je klíčovaný svým
+     * client_id, úprava (PUT) adresou tréninku.
+     */
+    function enqueue(method, url, body) {
+        const key = method === 'POST' && body.client_id ? `create:${body.client_id}` : `${method} ${url}`;
+        const entry = {
+            key: key,
+            user_id: currentUserId(),
+            method: method,
+            url: url,
+            body: body,
+            queued_at: Date.now(),
+            attempts: 0,
+            failed: false,
+            error: null
+        };
+        return withStore('readwrite', store => store.put(entry)).then(function() {
+            updateStatus();
+            registerRetry();
+            return entry;
+        });
+    }
+
+    function send(entry) {
+        return new Promise(function(resolve, reject) {
+            $.ajax({
+                url: entry.url,
+                method: entry.method,
+                contentType: 'application/json',
+                data: JSON.stringify(entry.body),
+                global: false
+            }).done(resolve).fail(reject);
+        });
+    }
+
+    // Postupné odeslání fronty, při chybě spojení se zbytek nechá na příště
+    async function flushEntries() {
+        const entries = await pendingEntries();
+        let sent = 0;
+
+        for (const entry of entries) {
+            try {
+                await send(entry);
+                await withStore('readwrite', store => store.delete(entry.key));
+                sent++;
+            } catch (xhr) {
+                if (isRetryable(xhr) || xhr.status === 401) {
+                    entry.attempts++;
+                    await withStore('readwrite', store => store.put(entry));
+                    break;
+                }
+                // Server požadavek odmítl - necháme ho ve frontě označený jako chybný a dáme vědět
+                entry.failed = true;
+                entry.error = xhr.responseJSON?.error || `HTTP ${xhr.status}`;
+                await withStore('readwrite', store => store.put(entry));
+                showError(xhr.status === 409 && xhr.responseJSON?.version !== undefined
+                    ? 'Offline úpravu tréninku nelze uložit, trénink mezitím upravil někdo jiný. Otevřete ho a změny zopakujte.'
+                    : `Offline změnu tréninku server odmítl: ${entry.error}`);
+            }
+        }
+        return sent;
+    }
+
+    function flush() {
+        if (!currentUserId()) {
+            return Promise.resolve(0);
+        }
+        if (!flushing) {
+            flushing = flushEntries()
+                .then(function(sent) {
+                    if (sent > 0) {
+                        showSuccess(`Odeslané offline tréninky: ${sent}`);
+                    }
+                    return sent;
+                })
+                .catch(() => 0)
+                .finally(function() {
+                    flushing = null;
+                    updateStatus();
+                });
+        }
+        return flushing;
+    }
+
+    // Počet čekajících tréninků v navigaci
+    function updateStatus() {
+        const badge = $('#sync-status');
+        if (!badge.length || !currentUserId()) {
+            return;
+        }
+        pendingEntries()
+            .then(function(entries) {
+                badge.text(`Neodesláno: ${entries.length}`).toggleClass('d-none', entries.length === 0);
+            })
+            .catch(() => badge.addClass('d-none'));
+    }
+
+    let retryTimer = null;
+    function registerRetry() {
+        if (!retryTimer) {
+            retryTimer = setInterval(function() {
+                if (navigator.onLine) {
+                    flush();
+                }
+            }, RETRY_INTERVAL_MS);
+        }
+    }
+
+    $(function() {
+        updateStatus();
+        if (navigator.onLine) {
+            flush();
+        }
+        registerRetry();
+    });
+    window.addEventListener('online', flush);
+
+    return {
+        newClientId: newClientId,
+        isRetryable: isRetryable,
+        enqueue: enqueue,
+        flush: flush,
+        pending: pendingEntries
+    };
+})();
@@ -5,6 +5,12 @@
 // Globální počítadlo pro nové cviky v tréninku
 let exerciseCounter = 0;
 
+// Identifikátor nového tréninku z prohlížeče - opakované uložení nevytvoří duplikát
+let workoutClientId = null;
+
+// Stav upravovaného tréninku při načtení - při uložení se posílají jen změny (PATCH)
+let originalWorkout = null;
+
 // Funkce pro inicializaci stránky přidání/editace tréninku
 function initWorkoutForm() {
     // Inicializace datepickeru pro datum tréninku
@@ -71,6 +77,7 @@ function addExerciseToWorkout() {
                     <input type="text" class="form-control" id="weight-${uniqueId}" name="weight" placeholder="např. 60-70-80">
                 </div>
             </div>
+            <div class="form-text last-time d-none" id="last-${uniqueId}"></div>
         </div>
     `;
     
@@ -85,6 +92,11 @@ function addExerciseToWorkout() {
         loadExercisesByCategory(categoryId, `#exercise-select-${uniqueId}`);
     });
     
+    // Po výběru cviku předvyplníme hodnoty z posledního tréninku
+    $(`#exercise-select-${uniqueId}`).on('change', function() {
+        prefillLastExercise(uniqueId, $(this).val());
+    });
+    
     // Event handler pro odstranění cviku
     $(`#exercise-${uniqueId} .remove-exercise`).on('click', function() {
         const exerciseId = $(this).data('exercise-id');
@@ -92,13 +104,58 @@ function addExerciseToWorkout() {
     });
 }
 
+// Předvyplnění série, opakování a váhy podle posledního záznamu cviku (jen prázdná pole)
+function prefillLastExercise(uniqueId, exerciseId) {
+    const hint = $(`#last-${uniqueId}`);
+    hint.addClass('d-none').empty();
+    
+    // Hodnoty předvyplněné pro dříve vybraný cvik (a uživatelem nezměněné) smažeme
+    ['sets', 'reps', 'weight'].forEach(function(field) {
+        const input = $(`#${field}-${uniqueId}`);
+        if (input.data('prefilled') !== undefined && input.val() === input.data('prefilled')) {
+            input.val('');
+        }
+        input.removeData('prefilled');
+    });
+    
+    if (!exerciseId) {
+        return;
+    }
+    
+    $.ajax({
+        url: `/api/exercises/${exerciseId}/last`,
+        method: 'GET',
+        global: false,
+        success: function(response) {
+            const last = response.entries[0];
+            // Mezitím mohl uživatel vybrat jiný cvik
+            if (!last || $(`#exercise-select-${uniqueId}`).val() !== String(exerciseId)) {
+                return;
+            }
+            ['sets', 'reps', 'weight'].forEach(function(field) {
+                const input = $(`#${field}-${uniqueId}`);
+                if (input.val() === '' && last[field] !== null) {
+                    input.val(last[field]).data('prefilled', String(last[field]));
+                }
+            });
+            // Nápověda jen z vyplněných údajů (starší záznamy nemusí mít všechny)
+            const present = value => value !== null && value !== undefined && value !== '';
+            const volume = [present(last.sets) ? `${last.sets}×` : '', present(last.reps) ? last.reps : '']
+                .filter(Boolean).join(' ');
+            const details = [volume, present(last.weight) ? `${last.weight} kg` : ''].filter(Boolean).join(', ');
+            hint.text(`Minule (${formatDate(last.date)})${details ? ': ' + details : ''}`)
+                .removeClass('d-none');
+        }
+    });
+}
+
 // Funkce pro přidání existujícího cviku do formuláře (pro editaci, s neměnným názvem a partií)
 function addExistingExerciseToWorkout(exercise) {
     const uniqueId = exerciseCounter++;
     
     // HTML s neměnnými poli pro název cviku a partii (použijeme skrytá pole pro hodnoty)
     const exerciseHtml = `
-        <div class="exercise-entry" id="exercise-${uniqueId}">
+        <div class="exercise-entry" id="exercise-${uniqueId}" data-row-id="${exercise.id}">
             <span class="remove-exercise" data-exercise-id="${uniqueId}">
                 <i class="fas fa-times"></i>
             </span>
@@ -140,32 +197,15 @@ function addExistingExerciseToWorkout(exercise) {
     });
 }
 
-// Funkce pro načtení kategorií cviků
+// Funkce pro načtení kategorií cviků (katalog se stahuje jen jednou, viz catalog.js)
 function loadExerciseCategories(selectElement, selectedValue = null) {
-    $.ajax({
-        url: '/api/exercise_categories',
-        method: 'GET',
-        success: function(data) {
-            const select = $(selectElement);
-            select.empty();
-            select.append('<option value="">-- Vyberte partii --</option>');
-            
-            data.forEach(function(category) {
-                const option = $('<option></option>')
-                    .attr('value', category.id)
-                    .text(category.name);
-                
-                if (selectedValue && selectedValue == category.id) {
-                    option.attr('selected', 'selected');
-                }
-                
-                select.append(option);
-            });
-        },
-        error: function() {
+    CatalogStore.exerciseCategories()
+        .done(function(categories) {
+            fillSelect(selectElement, categories, '-- Vyberte partii --', selectedValue);
+        })
+        .fail(function() {
             showError('Nepodařilo se načíst kategorie cviků');
-        }
-    });
+        });
 }
 
 // Funkce pro načtení cviků podle kategorie
@@ -177,32 +217,13 @@ function loadExercisesByCategory(categoryId, selectElement, selectedValue = null
         return;
     }
     
-    const url = `/api/exercises?category_id=${categoryId}`;
-    
-    $.ajax({
-        url: url,
-        method: 'GET',
-        success: function(data) {
-            const select = $(selectElement);
-            select.empty();
-            select.append('<option value="">-- Vyberte cvik --</option>');
-            
-            data.forEach(function(exercise) {
-                const option = $('<option></option>')
-                    .attr('value', exercise.id)
-                    .text(exercise.name);
-                
-                if (selectedValue && selectedValue == exercise.id) {
-                    option.attr('selected', 'selected');
-                }
-                
-                select.append(option);
-            });
-        },
-        error: function() {
+    CatalogStore.exercises(categoryId)
+        .done(function(exercises) {
+            fillSelect(selectElement, exercises, '-- Vyberte cvik --', selectedValue);
+        })
+        .fail(function() {
             showError('Nepodařilo se načíst cviky');
-        }
-    });
+        });
 }
 
 // Vylepšená funkce pro sběr dat z formuláře
@@ -226,18 +247,76 @@ function collectWorkoutData() {
             const reps = $(this).find('input[name="reps"]').val() || "0";
             const weight = $(this).find('input[name="weight"]').val() || "0";
             
-            workoutData.exercises.push({
+            const exercise = {
                 exercise_id: exerciseId,
                 sets: sets,
                 reps: reps,
                 weight: weight
-            });
+            };
+            
+            // Cvik uložený už dříve nese své ID (workout_exercises.id)
+            const rowId = $(this).data('row-id');
+            if (rowId) {
+                exercise.id = rowId;
+            }
+            
+            workoutData.exercises.push(exercise);
         }
     });
     
     return workoutData;
 }
 
+// Rozdíl mezi načteným a upraveným tréninkem pro PATCH, null pokud se nic nezměnilo
+function buildWorkoutPatch(original, workoutData) {
+    const patch = { version: original.version };
+    let changed = false;
+    
+    ['date', 'training_type_id', 'notes'].forEach(function(field) {
+        if (String(workoutData[field] ?? '') !== String(original[field] ?? '')) {
+            patch[field] = workoutData[field];
+            changed = true;
+        }
+    });
+    
+    const exercises = { added: [], updated: [], removed: [] };
+    const kept = new Set();
+    
+    workoutData.exercises.forEach(function(exercise) {
+        const before = exercise.id ? original.exercises[exercise.id] : null;
+        if (!before) {
+            const { id, ...added } = exercise;
+            exercises.added.push(added);
+            return;
+        }
+        kept.add(exercise.id);
+        
+        // Prázdné hodnoty formulář ukládá jako "0", stejně je porovnáváme
+        const update = { id: exercise.id };
+        ['sets', 'reps', 'weight'].forEach(function(field) {
+            if (exercise[field] !== String(before[field] || '0')) {
+                update[field] = exercise[field];
+            }
+        });
+        if (Object.keys(update).length > 1) {
+            exercises.updated.push(update);
+        }
+    });
+    
+    Object.keys(original.exercises).forEach(function(id) {
+        if (!kept.has(Number(id))) {
+            exercises.removed.push(Number(id));
+        }
+    });
+    
+    if (exercises.added.length || exercises.updated.length || exercises.removed.length) {
+        patch.exercises = exercises;
+        changed = true;
+    }
+    
+    return changed ? patch : null;
+}
+
 // Vylepšená funkce pro uložení tréninku
 function saveWorkout() {
     const workoutData = collectWorkoutData();
@@ -281,13 +360,27 @@ function saveWorkout() {
     
     // URL a metoda závisí na tom, zda jde o nový trénink nebo editaci
     const url = workoutId ? `/api/workouts/${workoutId}` : '/api/workouts';
-    const method = workoutId ? 'PUT' : 'POST';
+    let method = workoutId ? 'PUT' : 'POST';
+    let body = workoutData;
+    
+    if (!workoutId) {
+        workoutClientId = workoutClientId || SyncQueue.newClientId();
+        workoutData.client_id = workoutClientId;
+    } else if (originalWorkout) {
+        // U editace se posílají jen změny, bez změn není co ukládat
+        body = buildWorkoutPatch(originalWorkout, workoutData);
+        if (!body) {
+            window.location.href = `/workouts/${workoutId}`;
+            return;
+        }
+        method = 'PATCH';
+    }
     
     $.ajax({
         url: url,
         method: method,
         contentType: 'application/json',
-        data: JSON.stringify(workoutData),
+        data: JSON.stringify(body),
         success: function(response) {
             if (response.success) {
                 // Přesměrování na detail tréninku nebo seznam
@@ -299,6 +392,32 @@ function saveWorkout() {
             }
         },
         error: function(xhr) {
+            if (xhr.status === 409) {
+                // Konflikt verzí vrací aktuální verzi, archivovaný trénink jen chybovou zprávu
+                const response = xhr.responseJSON || {};
+                showError(response.version === undefined && response.error
+                    ? response.error
+                    : 'Trénink mezitím upravil někdo jiný. Načtěte stránku znovu a změny zopakujte.');
+                $('#save-workout-btn').prop('disabled', false).html('<i class="fas fa-save"></i> Uložit trénink');
+                return;
+            }
+            // Bez spojení (nebo při výpadku serveru) trénink uložíme do fronty k pozdějšímu odeslání.
+            // Úprava jde do fronty celá (PUT), aby se sloučené úpravy stejného tréninku neztratily,
+            // s načtenou verzí - změny někoho jiného mezitím se tak nepřepíšou, ale skončí konfliktem.
+            if (SyncQueue.isRetryable(xhr)) {
+                const queuedBody = method === 'PATCH'
+                    ? Object.assign({}, workoutData, { version: originalWorkout.version })
+                    : workoutData;
+                SyncQueue.enqueue(method === 'PATCH' ? 'PUT' : method, url, queuedBody)
+                    .then(function() {
+                        window.location.href = '/workouts';
+                    })
+                    .catch(function() {
+                        showError('Trénink se nepodařilo uložit ani odeslat, zkontrolujte připojení');
+                        $('#save-workout-btn').prop('disabled', false).html('<i class="fas fa-save"></i> Uložit trénink');
+                    });
+                return;
+            }
             showError('Chyba při ukládání tréninku: ' + (xhr.responseJSON?.error || 'Neznámá chyba'));
             $('#save-workout-btn').prop('disabled', false).html('<i class="fas fa-save"></i> Uložit trénink');
         }
@@ -322,6 +441,18 @@ function loadWorkoutForEdit(workoutId) {
             // Nastavení poznámek
             $('#workout-notes').val(workout.notes);
             
+            // Zapamatování načteného stavu pro výpočet změn při uložení
+            originalWorkout = {
+                version: workout.version,
+                date: formattedDate,
+                training_type_id: workout.training_type_id,
+                notes: workout.notes,
+                exercises: {}
+            };
+            workout.exercises.forEach(function(exercise) {
+                originalWorkout.exercises[exercise.id] = exercise;
+            });
+            
             // Nejprve vymažeme existující cviky
             $('#exercises-container').empty();
             
@@ -411,17 +542,33 @@ function showExerciseHistory(exerciseId, exerciseName) {
     alert(`Historie cviku ${exerciseName} (ID: ${exerciseId}) - tato funkce není zatím implementována`);
 }
 
-// Funkce pro načtení seznamu tréninků
-function loadWorkoutsList() {
+// Počet tréninků načtených na jednu stránku seznamu
+const WORKOUTS_PAGE_SIZE = 50;
+
+// Funkce pro načtení seznamu tréninků (po stránkách pomocí kurzoru)
+function loadWorkoutsList(cursor = null) {
+    // Cviky se načtou se stránkou, souhrn tak nepotřebuje požadavek na každý trénink
+    const params = { limit: WORKOUTS_PAGE_SIZE, include: 'exercises' };
+    if (cursor) {
+        params.cursor = cursor;
+    }
+
     $.ajax({
         url: '/api/workouts',
         method: 'GET',
-        success: function(workouts) {
+        data: params,
+        success: function(page) {
             const tbody = $('#workouts-table tbody');
-            tbody.empty();
-            
-            if (workouts.length === 0) {
-                tbody.append('<tr><td colspan="4" class="text-center">Žádné tréninky</td></tr>');
+            const workouts = page.workouts;
+
+            // První stránka nahrazuje obsah tabulky, další se připojují
+            if (!cursor) {
+                tbody.empty();
+            }
+
+            if (!cursor && workouts.length === 0) {
+                tbody.append('<tr><td colspan="5" class="text-center">Žádné tréninky</td></tr>');
+                $('#load-more-workouts').hide();
                 return;
             }
             
@@ -432,7 +579,8 @@ function loadWorkoutsList() {
 				let row = `
 					<tr>
 						<td>${formattedDate}</td>
-						<td>${workout.type_name}</td>`;
+						<td>${workout.type_name}</td>
+						<td>${workoutExercisesSummary(workout.exercises)}</td>`;
 				
 				// Přidáme sloupec s uživatelem pouze pro adminy
 				if (workout.username) {
@@ -456,20 +604,42 @@ function loadWorkoutsList() {
 				
 				tbody.append(row);
 			});
+
+            // Tlačítko pro načtení další stránky
+            const loadMore = $('#load-more-workouts');
+            if (page.next_cursor) {
+                loadMore.off('click').on('click', function() {
+                    loadWorkoutsList(page.next_cursor);
+                }).show();
+            } else {
+                loadMore.hide();
+            }
             
             // Event handler pro smazání tréninku
-            $('.delete-workout').on('click', function() {
+            $('.delete-workout').off('click').on('click', function() {
                 const workoutId = $(this).data('workout-id');
                 deleteWorkout(workoutId);
             });
         },
         error: function() {
             const tbody = $('#workouts-table tbody');
-            tbody.html('<tr><td colspan="4" class="text-center text-danger">Chyba při načítání tréninků</td></tr>');
+            tbody.html('<tr><td colspan="5" class="text-center text-danger">Chyba při načítání tréninků</td></tr>');
         }
     });
 }
 
+// Krátký souhrn cviků tréninku pro seznam (počet a první názvy)
+const SUMMARY_EXERCISE_NAMES = 3;
+
+function workoutExercisesSummary(exercises) {
+    if (!exercises || exercises.length === 0) {
+        return '<span class="text-muted">Bez cviků</span>';
+    }
+    const names = exercises.slice(0, SUMMARY_EXERCISE_NAMES).map(exercise => exercise.exercise_name).join(', ');
+    const more = exercises.length > SUMMARY_EXERCISE_NAMES ? ', …' : '';
+    return `<span class="badge bg-secondary me-1">${exercises.length}</span><small>${names}${more}</small>`;
+}
+
 // Funkce pro smazání tréninku
 function deleteWorkout(workoutId) {
     if (confirm('Opravdu chcete smazat tento trénink? Tato akce je nevratná.')) {
@@ -0,0 +1,165 @@
+"""
+Souhrnné statistiky tréninků v aplikaci Balift
+
+Tabulky exercise_daily_stats, category_weekly_stats a weekly_workout_stats
+se udržují průběžně při každém zápisu tréninku (workout_store). Po změně se
+přepočítá jen dotčený týden daného uživatele, takže dotazy pro grafy čtou
+jen tolik řádků, kolik bodů vracejí. Přepočet čte i archivované tréninky.
+"""
+
+import archive
+
+# Začátek týdne (pondělí) pro datum ve formátu YYYY-MM-DD
+WEEK_START = "date({0}, 'weekday 0', '-6 days')"
+
+# Série a tréninky jedné vrstvy (hlavní databáze nebo archiv, viz archive.py)
+_SET_ROWS = '''SELECT w.user_id, w.date, we.exercise_id, ws.id AS set_id, ws.reps, ws.weight_kg
+    FROM {tier}workouts w
+    JOIN {tier}workout_exercises we ON we.workout_id = w.id
+    LEFT JOIN {tier}workout_sets ws ON ws.workout_exercise_id = we.id
+    WHERE w.user_id IS NOT NULL {where}'''
+
+_WORKOUT_ROWS = '''SELECT w.user_id, w.date
+    FROM {tier}workouts w
+    WHERE w.user_id IS NOT NULL {where}'''
+
+_DAILY_INSERT = '''INSERT INTO exercise_daily_stats
+    (user_id, exercise_id, date, top_weight_kg, volume_kg, best_e1rm_kg, total_reps, set_count)
+    SELECT user_id, exercise_id, date,
+        MAX(weight_kg),
+        COALESCE(SUM(reps * weight_kg), 0),
+        MAX(CASE
+            WHEN reps = 1 THEN weight_kg
+            WHEN reps > 1 AND weight_kg > 0 THEN weight_kg * (1 + reps / 30.0)
+        END),
+        COALESCE(SUM(reps), 0),
+        COUNT(set_id)
+    FROM ({rows})
+    GROUP BY user_id, exercise_id, date'''
+
+_CATEGORY_INSERT = '''INSERT INTO category_weekly_stats (user_id, category_id, week, volume_kg, set_count)
+    SELECT r.user_id, e.category_id, ''' + WEEK_START.format('r.date') + ''',
+        COALESCE(SUM(r.reps * r.weight_kg), 0),
+        COUNT(r.set_id)
+    FROM ({rows}) r
+    JOIN exercises e ON r.exercise_id = e.id
+    WHERE e.category_id IS NOT NULL
+    GROUP BY 1, 2, 3'''
+
+_FREQUENCY_INSERT = '''INSERT INTO weekly_workout_stats (user_id, week, workout_count)
+    SELECT user_id, ''' + WEEK_START.format('date') + ''', COUNT(*)
+    FROM ({rows})
+    GROUP BY 1, 2'''
+
+_WEEK_WHERE = "AND w.user_id = ? AND w.date BETWEEN ? AND date(?, '+6 days')"
+
+
+def _insert(db, template, rows, where='', params=()):
+    """Vloží souhrn spočítaný z řádků všech připojených vrstev."""
+    tiers = archive.tiers(db)
+    source = ' UNION ALL '.join(rows.format(tier=tier, where=where) for tier in tiers)
+    db.execute(template.format(rows=source), params * len(tiers))
+
+
+def affected_weeks(db, workout_ids):
+    """Vrátí množinu dvojic (user_id, týden) pro zadané tréninky."""
+    weeks = set()
+    for start in range(0, len(workout_ids), 500):
+        chunk = workout_ids[start:start + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        rows = db.execute(
+            f'''SELECT DISTINCT user_id, {WEEK_START.format('date')}
+            FROM workouts WHERE id IN ({placeholders}) AND user_id IS NOT NULL''',
+            chunk
+        ).fetchall()
+        weeks.update((row[0], row[1]) for row in rows)
+    return weeks
+
+
+def refresh_weeks(db, weeks):
+    """Přepočítá souhrny pro zadané dvojice (user_id, týden). Volá se uvnitř transakce."""
+    for user_id, week in weeks:
+        params = (user_id, week, week)
+        db.execute(
+            "DELETE FROM exercise_daily_stats WHERE user_id = ? AND date BETWEEN ? AND date(?, '+6 days')",
+            params
+        )
+        db.execute('DELETE FROM category_weekly_stats WHERE user_id = ? AND week = ?', (user_id, week))
+        db.execute('DELETE FROM weekly_workout_stats WHERE user_id = ? AND week = ?', (user_id, week))
+        _insert(db, _DAILY_INSERT, _SET_ROWS, _WEEK_WHERE, params)
+        _insert(db, _CATEGORY_INSERT, _SET_ROWS, _WEEK_WHERE, params)
+        _insert(db, _FREQUENCY_INSERT, _WORKOUT_ROWS, _WEEK_WHERE, params)
+
+
+def rebuild(db):
+    """Přepočítá všechny souhrny od začátku. Volá se uvnitř transakce."""
+    db.execute('DELETE FROM exercise_daily_stats')
+    db.execute('DELETE FROM category_weekly_stats')
+    db.execute('DELETE FROM weekly_workout_stats')
+    _insert(db, _DAILY_INSERT, _SET_ROWS)
+    _insert(db, _CATEGORY_INSERT, _SET_ROWS)
+    _insert(db, _FREQUENCY_INSERT, _WORKOUT_ROWS)
+
+
+def _range(date_from, date_to):
+    return date_from or '0000-01-01', date_to or '9999-12-31'
+
+
+def exercise_series(db, user_id, exercise_id, date_from=None, date_to=None):
+    """Časová řada cviku po dnech: nejtěžší série, objem a odhad 1RM."""
+    rows = db.execute(
+        '''SELECT date, top_weight_kg, volume_kg, best_e1rm_kg, total_reps, set_count
+        FROM exercise_daily_stats
+        WHERE user_id = ? AND exercise_id = ? AND date BETWEEN ? AND ?
+        ORDER BY date''',
+        (user_id, exercise_id, *_range(date_from, date_to))
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def weekly_volume(db, user_id, date_from=None, date_to=None):
+    """Týdenní objem podle partií."""
+    rows = db.execute(
+        '''SELECT s.week, s.category_id, ec.name AS category_name, s.volume_kg, s.set_count
+        FROM category_weekly_stats s
+        JOIN exercise_categories ec ON s.category_id = ec.id
+        WHERE s.user_id = ? AND s.week BETWEEN ''' + WEEK_START.format('?') + ''' AND ?
+        ORDER BY s.week, s.category_id''',
+        (user_id, *_range(date_from, date_to))
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def workout_frequency(db, user_id, date_from=None, date_to=None):
+    """Počet tréninků po týdnech."""
+    rows = db.execute(
+        '''SELECT week, workout_count FROM weekly_workout_stats
+        WHERE user_id = ? AND week BETWEEN ''' + WEEK_START.format('?') + ''' AND ?
+        ORDER BY week''',
+        (user_id, *_range(date_from, date_to))
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def last_entries(db, user_id, exercise_id, limit=1):
+    """
+    Posledních limit záznamů cviku uživatele (sets, reps, weight) od
+    nejnovějšího. Dny s cvikem se čtou z primárního klíče
+    exercise_daily_stats (user_id, exercise_id, date), tréninky a cviky
+    z nich pak přes indexy idx_workouts_user_date a idx_workout_exercises_workout
+    (v hlavní databázi i v archivu).
+    """
+    query, params = archive.union_query(
+        '''SELECT we.id AS id, we.workout_id, w.date AS date, we.exercise_id, we.sets, we.reps, we.weight
+        FROM (
+            SELECT date FROM exercise_daily_stats
+            WHERE user_id = ? AND exercise_id = ?
+            ORDER BY date DESC LIMIT ?
+        ) d
+        JOIN {tier}workouts w ON w.user_id = ? AND w.date = d.date
+        JOIN {tier}workout_exercises we ON we.workout_id = w.id AND we.exercise_id = ?''',
+        (user_id, exercise_id, limit, user_id, exercise_id),
+        'date DESC, workout_id DESC, id DESC',
+        tiers=archive.tiers(db), limit=limit
+    )
+    return [dict(row) for row in db.execute(query, params).fetchall()]
@@ -0,0 +1,202 @@
+"""
+Inkrementální synchronizace tréninků pro klienty s lokální kopií dat
+
+Každý zápis do workouts a workout_exercises dostane pomocí triggerů nové
+pořadové číslo změny (change_seq z globálního čítače sync_clock) a čas
+updated_at. Smazané řádky se zaznamenají do sync_tombstones. Klient si
+pamatuje kurzor (poslední change_seq) a /api/sync mu vrátí jen řádky
+změněné nebo smazané od té doby.
+"""
+
+from database import read_snapshot
+
+# Čas změny ve formátu ISO 8601 (UTC)
+_NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+_NEXT_SEQ = 'UPDATE sync_clock SET seq = seq + 1 WHERE id = 1;'
+_SEQ = '(SELECT seq FROM sync_clock WHERE id = 1)'
+
+# Sledované sloupce - změna jen change_seq/updated_at trigger znovu nespustí
+_WORKOUT_COLUMNS = 'date, training_type_id, notes, user_id, version'
+_EXERCISE_COLUMNS = 'workout_id, exercise_id, sets, reps, weight'
+
+# DDL tabulek a triggerů, stejné příkazy jsou i ve schema.sql
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS sync_clock (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL,
+        pruned_seq INTEGER NOT NULL DEFAULT 0
+    )''',
+    'INSERT OR IGNORE INTO sync_clock (id, seq, pruned_seq) VALUES (1, 0, 0)',
+    '''CREATE TABLE IF NOT EXISTS sync_tombstones (
+        change_seq INTEGER PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        workout_id INTEGER NOT NULL,
+        user_id INTEGER,
+        deleted_at TEXT NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user ON sync_tombstones (user_id, change_seq)',
+    'CREATE INDEX IF NOT EXISTS idx_workouts_user_change ON workouts (user_id, change_seq)',
+    'CREATE INDEX IF NOT EXISTS idx_workout_exercises_change ON workout_exercises (change_seq)',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_workouts_sync_insert AFTER INSERT ON workouts
+    BEGIN
+        {_NEXT_SEQ}
+        UPDATE workouts SET change_seq = {_SEQ}, updated_at = {_NOW} WHERE id = new.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_workouts_sync_update AFTER UPDATE OF {_WORKOUT_COLUMNS} ON workouts
+    BEGIN
+        {_NEXT_SEQ}
+        UPDATE workouts SET change_seq = {_SEQ}, updated_at = {_NOW} WHERE id = new.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_workouts_sync_delete AFTER DELETE ON workouts
+    BEGIN
+        {_NEXT_SEQ}
+        INSERT INTO sync_tombstones (change_seq, table_name, row_id, workout_id, user_id, deleted_at)
+        VALUES ({_SEQ}, 'workouts', old.id, old.id, old.user_id, {_NOW});
+        UPDATE sync_tombstones SET user_id = old.user_id WHERE user_id IS NULL AND workout_id = old.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_workout_exercises_sync_insert AFTER INSERT ON workout_exercises
+    BEGIN
+        {_NEXT_SEQ}
+        UPDATE workout_exercises SET change_seq = {_SEQ}, updated_at = {_NOW} WHERE id = new.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS trg_workout_exercises_sync_update AFTER UPDATE OF {_EXERCISE_COLUMNS} ON workout_exercises
+    BEGIN
+        {_NEXT_SEQ}
+        UPDATE workout_exercises SET change_seq = {_SEQ}, updated_at = {_NOW} WHERE id = new.id;
+    END''',
+    # Při kaskádovém mazání už trénink neexistuje, vlastníka doplní trigger mazání tréninku
+    f'''CREATE TRIGGER IF NOT EXISTS trg_workout_exercises_sync_delete AFTER DELETE ON workout_exercises
+    BEGIN
+        {_NEXT_SEQ}
+        INSERT INTO sync_tombstones (change_seq, table_name, row_id, workout_id, user_id, deleted_at)
+        VALUES ({_SEQ}, 'workout_exercises', old.id, old.workout_id,
+                (SELECT user_id FROM workouts WHERE id = old.workout_id), {_NOW});
+    END''',
+]
+
+
+def create_tracking(db):
+    """
+    Přidá sloupce change_seq/updated_at, tabulky a triggery. Existující
+    řádky dostanou pořadová čísla podle ID, aby šla stáhnout po stránkách.
+    """
+    for table in ('workouts', 'workout_exercises'):
+        columns = {row[1] for row in db.execute(f'PRAGMA table_info({table})')}
+        if 'updated_at' not in columns:
+            db.execute(f'ALTER TABLE {table} ADD COLUMN updated_at TEXT')
+        if 'change_seq' not in columns:
+            db.execute(f'ALTER TABLE {table} ADD COLUMN change_seq INTEGER')
+
+    for statement in SCHEMA:
+        db.execute(statement)
+
+    offset = db.execute('SELECT coalesce(max(id), 0) FROM workouts').fetchone()[0]
+    db.execute(f'UPDATE workouts SET change_seq = id, updated_at = {_NOW} WHERE change_seq IS NULL')
+    db.execute(
+        f'UPDATE workout_exercises SET change_seq = id + ?, updated_at = {_NOW} WHERE change_seq IS NULL',
+        (offset,)
+    )
+    db.execute(
+        '''UPDATE sync_clock SET seq = max(seq,
+            (SELECT coalesce(max(change_seq), 0) FROM workouts),
+            (SELECT coalesce(max(change_seq), 0) FROM workout_exercises))
+        WHERE id = 1'''
+    )
+
+
+def encode_cursor(seq):
+    return str(seq)
+
+
+def decode_cursor(cursor):
+    """Kurzor je číslo poslední viděné změny, chybný kurzor vyhodí ValueError."""
+    seq = int(cursor)
+    if seq < 0:
+        raise ValueError('Neplatný kurzor')
+    return seq
+
+
+def changes(db, user_id, since, limit):
+    """
+    Změny tréninků uživatele s change_seq větším než since, nejvýše limit
+    změn. Vrací slovník s řádky, smazanými ID, novým kurzorem a příznakem
+    has_more. Pokud since předchází promazaným tombstones (nebo chybí),
+    vrátí se úplný stav a reset=True - klient má lokální kopii zahodit.
+    """
+    with read_snapshot(db):
+        return _changes(db, user_id, since, limit)
+
+
+def _changes(db, user_id, since, limit):
+    clock = db.execute('SELECT seq, pruned_seq FROM sync_clock WHERE id = 1').fetchone()
+    reset = since is None or since < clock['pruned_seq']
+    if reset:
+        since = 0
+
+    # Horní mez stránky - limit nejbližších změn ze všech tří zdrojů
+    seqs = db.execute(
+        '''SELECT change_seq FROM (
+            SELECT change_seq FROM workouts WHERE user_id = ? AND change_seq > ?
+            UNION ALL
+            SELECT we.change_seq FROM workout_exercises we JOIN workouts w ON w.id = we.workout_id
+            WHERE w.user_id = ? AND we.change_seq > ?
+            UNION ALL
+            SELECT change_seq FROM sync_tombstones WHERE user_id = ? AND change_seq > ?
+        ) ORDER BY change_seq LIMIT ?''',
+        (user_id, since, user_id, since, user_id, since, limit + 1)
+    ).fetchall()
+
+    has_more = len(seqs) > limit
+    upto = seqs[limit - 1][0] if has_more else clock['seq']
+
+    workouts = db.execute(
+        '''SELECT id, date, training_type_id, notes, client_id, version, updated_at, change_seq
+        FROM workouts WHERE user_id = ? AND change_seq > ? AND change_seq <= ?
+        ORDER BY change_seq''',
+        (user_id, since, upto)
+    ).fetchall()
+    exercises = db.execute(
+        '''SELECT we.id, we.workout_id, we.exercise_id, we.sets, we.reps, we.weight,
+            we.updated_at, we.change_seq
+        FROM workout_exercises we JOIN workouts w ON w.id = we.workout_id
+        WHERE w.user_id = ? AND we.change_seq > ? AND we.change_seq <= ?
+        ORDER BY we.change_seq''',
+        (user_id, since, upto)
+    ).fetchall()
+
+    deleted = {'workouts': [], 'workout_exercises': []}
+    if not reset:
+        for row in db.execute(
+            '''SELECT table_name, row_id FROM sync_tombstones
+            WHERE user_id = ? AND change_seq > ? AND change_seq <= ?
+            ORDER BY change_seq''',
+            (user_id, since, upto)
+        ):
+            deleted[row['table_name']].append(row['row_id'])
+
+    return {
+        'workouts': [dict(row) for row in workouts],
+        'workout_exercises': [dict(row) for row in exercises],
+        'deleted': deleted,
+        'cursor': encode_cursor(upto),
+        'has_more': has_more,
+        'reset': reset,
+    }
+
+
+def prune_tombstones(db, days):
+    """
+    Smaže tombstones starší než days dní. Klienti se starším kurzorem
+    potom dostanou úplný stav (reset). Vrací počet smazaných záznamů.
+    """
+    cutoff = f'-{int(days)} days'
+    row = db.execute(
+        "SELECT max(change_seq) FROM sync_tombstones WHERE deleted_at < strftime('%Y-%m-%dT%H:%M:%fZ', 'now', ?)",
+        (cutoff,)
+    ).fetchone()
+    if row[0] is None:
+        return 0
+    cursor = db.execute('DELETE FROM sync_tombstones WHERE change_seq <= ?', (row[0],))
+    db.execute('UPDATE sync_clock SET pruned_seq = max(pruned_seq, ?) WHERE id = 1', (row[0],))
+    return cursor.rowcount
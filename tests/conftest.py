@@ -0,0 +1,96 @@
+import os
+import sys
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+# Moduly aplikace leží v kořeni repozitáře (bez instalace balíčku)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Rychlý hash, aby testy nepočítaly scrypt
+HASH_METHOD = 'pbkdf2:sha256:1000'
+
+USERS = [
+    ('admin', 'admin123', 1),
+    ('bob', 'bob123', 0),
+    ('carol', 'carol123', 0),
+]
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Aplikace nad novou dočasnou databází s uživateli z USERS."""
+    import auth
+    import passwords
+    from app import app as flask_app, get_db, init_db
+
+    original = dict(flask_app.config)
+    flask_app.config.update(
+        TESTING=True,
+        DATABASE=str(tmp_path / 'balift.sqlite'),
+        DB_REUSE_CONNECTIONS=False,
+        PASSWORD_HASH_METHOD=HASH_METHOD,
+        JOB_FILES_DIR=str(tmp_path / 'jobs'),
+        ARCHIVE_DATABASE=None,
+    )
+    passwords.init_app(flask_app)
+    auth.init_app(flask_app)
+
+    with flask_app.app_context():
+        init_db()
+        db = get_db()
+        db.executemany(
+            'INSERT INTO users (username, password_hash, is_admin) VALUES (?, ?, ?)',
+            [(username, generate_password_hash(password, HASH_METHOD), is_admin)
+             for username, password, is_admin in USERS]
+        )
+        db.commit()
+
+    yield flask_app
+
+    flask_app.config.clear()
+    flask_app.config.update(original)
+    passwords.init_app(flask_app)
+    auth.init_app(flask_app)
+
+
+@pytest.fixture
+def db(app):
+    """
+    Samostatné připojení k databázi testu. Kontext aplikace se nedrží otevřený,
+    požadavky test clientu by v něm sdílely g (přihlášeného uživatele).
+    """
+    from database import connection_manager
+
+    connection = connection_manager.connect(app.config['DATABASE'], app.config['SQLITE_PRAGMAS'])
+    yield connection
+    connection.close()
+
+
+def login(client, username):
+    password = next(password for name, password, _ in USERS if name == username)
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def client(app):
+    """Test client přihlášený jako bob."""
+    return login(app.test_client(), 'bob')
+
+
+@pytest.fixture
+def admin_client(app):
+    return login(app.test_client(), 'admin')
+
+
+def workout_body(**overrides):
+    body = {
+        'date': '2026-01-05',
+        'training_type_id': 1,
+        'notes': '',
+        'exercises': [{'exercise_id': 1, 'sets': 3, 'reps': '10-8-6', 'weight': '60-70-80'}],
+    }
+    body.update(overrides)
+    return body
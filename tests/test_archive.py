@@ -0,0 +1,102 @@
+import pytest
+
+import archive
+from database import connection_manager
+from conftest import workout_body
+
+
+def connect_with_archive(app):
+    return connection_manager.connect(
+        app.config['DATABASE'], app.config['SQLITE_PRAGMAS'], attach=archive.attachments(app.config)
+    )
+
+
+def archive_before(app, before):
+    db = connect_with_archive(app)
+    try:
+        return sum(archive.archive_workouts(db, before))
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def archived(app, client, tmp_path):
+    """Dva tréninky uživatele bob, starší z nich je přesunutý do archivu. Vrací (archivovaný, aktuální)."""
+    app.config['ARCHIVE_DATABASE'] = str(tmp_path / 'archive.sqlite')
+    old = client.post('/api/workouts', json=workout_body(date='2020-03-01', notes='starý')).get_json()['id']
+    new = client.post('/api/workouts', json=workout_body(date='2026-03-01', notes='nový')).get_json()['id']
+
+    assert archive_before(app, '2021-01-01') == 1
+    return old, new
+
+
+def test_archived_workout_is_still_listed_and_readable(client, archived):
+    old, new = archived
+    assert [w['id'] for w in client.get('/api/workouts').get_json()] == [new, old]
+    workout = client.get(f'/api/workouts/{old}').get_json()
+    assert workout['notes'] == 'starý'
+    assert len(workout['exercises']) == 1
+
+
+@pytest.mark.parametrize('method, body', [
+    ('put', workout_body(notes='změna')),
+    ('patch', {'version': 1, 'notes': 'změna'}),
+    ('delete', None),
+])
+def test_archived_workout_is_read_only(client, archived, method, body):
+    old, _ = archived
+    response = getattr(client, method)(f'/api/workouts/{old}', json=body)
+    assert response.status_code == 409
+    assert client.get(f'/api/workouts/{old}').get_json()['notes'] == 'starý'
+
+
+def test_archived_workout_can_be_copied(client, archived, db):
+    old, _ = archived
+    response = client.post(f'/api/workouts/{old}/copy')
+    assert response.status_code == 201
+    copy_id = response.get_json()['id']
+    assert db.execute('SELECT notes FROM main.workouts WHERE id = ?', (copy_id,)).fetchone()[0] == 'starý'
+
+
+def test_exercise_used_only_in_archive_cannot_be_deleted(app, archived, admin_client, client, db):
+    # Aktuální trénink cvik přestane používat, zůstane jen v archivu
+    _, new = archived
+    client.put(f'/api/workouts/{new}', json=workout_body(
+        date='2026-03-01', exercises=[{'exercise_id': 2, 'sets': 1, 'reps': '5', 'weight': '20'}]
+    ))
+    assert db.execute('SELECT count(*) FROM workout_exercises WHERE exercise_id = 1').fetchone()[0] == 0
+
+    assert admin_client.delete('/api/exercises/1').status_code == 400
+    assert db.execute('SELECT count(*) FROM exercises WHERE id = 1').fetchone()[0] == 1
+
+
+def test_export_includes_archived_workouts(client, archived):
+    response = client.get('/api/workouts/export?format=csv')
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert '2020-03-01' in body and '2026-03-01' in body
+
+
+def test_archiving_does_not_send_tombstones(app, client, tmp_path):
+    app.config['ARCHIVE_DATABASE'] = str(tmp_path / 'archive.sqlite')
+    client.post('/api/workouts', json=workout_body(date='2020-03-01'))
+    cursor = client.get('/api/sync').get_json()['cursor']
+
+    assert archive_before(app, '2021-01-01') == 1
+
+    page = client.get('/api/sync', query_string={'since': cursor}).get_json()
+    assert page['reset'] is False
+    assert page['deleted'] == {'workouts': [], 'workout_exercises': []}
+
+
+def test_init_db_keeps_archive_tables_but_clears_them(app, archived):
+    from app import init_db
+
+    with app.app_context():
+        init_db()
+    db = connect_with_archive(app)
+    try:
+        assert db.execute('SELECT count(*) FROM archive.workouts').fetchone()[0] == 0
+        assert db.execute('SELECT count(*) FROM main.workouts').fetchone()[0] == 0
+    finally:
+        db.close()
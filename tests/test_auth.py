@@ -0,0 +1,91 @@
+import auth
+from conftest import login
+
+
+def create_token(app, username='bob', password='bob123'):
+    response = app.test_client().post('/api/tokens', json={'username': username, 'password': password})
+    assert response.status_code == 201
+    return response.get_json()['token']
+
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+def test_token_authenticates_api_requests(app):
+    token = create_token(app)
+    response = app.test_client().get('/api/workouts', headers=bearer(token))
+    assert response.status_code == 200
+
+
+def test_token_requires_valid_credentials(app):
+    response = app.test_client().post('/api/tokens', json={'username': 'bob', 'password': 'wrong'})
+    assert response.status_code == 401
+
+
+def test_api_without_credentials_gets_401(app):
+    assert app.test_client().get('/api/workouts').status_code == 401
+
+
+def test_tampered_token_is_rejected(app):
+    token = create_token(app)
+    tampered = token[:-2] + ('AA' if not token.endswith('AA') else 'BB')
+    assert app.test_client().get('/api/workouts', headers=bearer(tampered)).status_code == 401
+
+
+def test_token_signed_with_other_key_is_rejected(app):
+    token = create_token(app)
+    app.config['SECRET_KEY'] = 'other'
+    assert app.test_client().get('/api/workouts', headers=bearer(token)).status_code == 401
+
+
+def test_expired_token_is_rejected(app):
+    token = create_token(app)
+    app.config['API_TOKEN_MAX_AGE'] = -1
+    assert app.test_client().get('/api/workouts', headers=bearer(token)).status_code == 401
+
+
+def test_password_change_revokes_tokens(app):
+    token = create_token(app)
+    client = login(app.test_client(), 'bob')
+    response = client.post('/change-password', data={
+        'current_password': 'bob123', 'new_password': 'bob456', 'confirm_password': 'bob456',
+    })
+    assert response.status_code == 200
+    assert app.test_client().get('/api/workouts', headers=bearer(token)).status_code == 401
+    assert app.test_client().get('/api/workouts', headers=bearer(create_token(app, password='bob456'))).status_code == 200
+
+
+def test_token_fingerprint_follows_password_hash():
+    assert auth._token_key('hash-a') == auth._token_key('hash-a')
+    assert auth._token_key('hash-a') != auth._token_key('hash-b')
+    assert len(auth._token_key('hash-a')) == 16
+
+
+def test_principal_cache_expires_and_invalidates(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(auth.time, 'monotonic', lambda: now[0])
+    cache = auth.PrincipalCache(ttl=10, max_size=2)
+    loads = []
+
+    def loader(user_id):
+        loads.append(user_id)
+        return f'user-{user_id}'
+
+    assert cache.get(1, loader) == 'user-1'
+    assert cache.get(1, loader) == 'user-1'
+    assert loads == [1]
+
+    now[0] += 11
+    cache.get(1, loader)
+    assert loads == [1, 1]
+
+    cache.invalidate(1)
+    cache.get(1, loader)
+    assert loads == [1, 1, 1]
+
+    # Nejdéle nepoužitý záznam se zahodí
+    cache.get(2, loader)
+    cache.get(3, loader)
+    cache.get(1, loader)
+    assert loads == [1, 1, 1, 2, 3, 1]
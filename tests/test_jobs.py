@@ -0,0 +1,187 @@
+import time
+
+import pytest
+
+import jobs
+from conftest import login, workout_body
+
+
+@pytest.fixture
+def task(monkeypatch):
+    """Registruje testovací úlohu, která selže tolikrát, kolikrát je v payloadu 'failures'."""
+    calls = []
+
+    def run(context, payload):
+        calls.append(context.job_id)
+        if len(calls) <= payload.get('failures', 0):
+            raise RuntimeError('selhání')
+        return {'calls': len(calls)}
+
+    monkeypatch.setitem(jobs.TASKS, 'test_task', jobs.Task(
+        'test_task', run, dedup=lambda user_id, payload: payload.get('key')
+    ))
+    return calls
+
+
+def make_due(db, job_id):
+    db.execute('UPDATE jobs SET run_after = 0 WHERE id = ?', (job_id,))
+    db.commit()
+
+
+def make_stale(db, job_id, age=3600):
+    past = time.time() - age
+    db.execute('UPDATE jobs SET started_at = ?, heartbeat_at = ? WHERE id = ?', (past, past, job_id))
+    db.commit()
+
+
+def test_enqueue_returns_queued_job_with_same_dedup_key(db, task):
+    first, created = jobs.enqueue(db, 'test_task', {'key': 'a'})
+    assert created
+    assert jobs.enqueue(db, 'test_task', {'key': 'a'}) == (first, False)
+    second, created = jobs.enqueue(db, 'test_task', {'key': 'b'})
+    assert created and second != first
+
+
+def test_finished_job_does_not_block_new_one(db, task):
+    job_id, _ = jobs.enqueue(db, 'test_task', {'key': 'a'})
+    assert jobs.run_job(db, jobs.claim(db, 'w1'), '')
+    new_id, created = jobs.enqueue(db, 'test_task', {'key': 'a'})
+    assert created and new_id != job_id
+
+
+def test_unknown_task_is_rejected(db):
+    with pytest.raises(jobs.UnknownTask):
+        jobs.enqueue(db, 'no_such_task')
+
+
+def test_claim_takes_oldest_due_job_once(db, task):
+    first, _ = jobs.enqueue(db, 'test_task')
+    jobs.enqueue(db, 'test_task', delay=3600)
+    job = jobs.claim(db, 'w1')
+    assert job['id'] == first
+    assert job['status'] == jobs.RUNNING
+    assert job['attempts'] == 1
+    # Druhá úloha ještě není na řadě, první už je zamčená
+    assert jobs.claim(db, 'w2') is None
+
+
+def test_failed_job_is_retried_with_backoff(db, task):
+    job_id, _ = jobs.enqueue(db, 'test_task', {'failures': 2})
+    delays = []
+    for _ in range(2):
+        job = jobs.claim(db, 'w1')
+        before = time.time()
+        assert not jobs.run_job(db, job, '')
+        row = jobs.get_job(db, job_id)
+        assert row['status'] == jobs.QUEUED
+        assert 'selhání' in row['error']
+        delays.append(round(row['run_after'] - before))
+        make_due(db, job_id)
+    assert delays == [jobs.RETRY_BASE_DELAY, jobs.RETRY_BASE_DELAY * 2]
+
+    assert jobs.run_job(db, jobs.claim(db, 'w1'), '')
+    row = jobs.get_job(db, job_id)
+    assert row['status'] == jobs.DONE
+    assert row['attempts'] == 3
+    assert row['error'] is None
+
+
+def test_job_fails_after_max_attempts(db, task):
+    job_id, _ = jobs.enqueue(db, 'test_task', {'failures': 5}, max_attempts=2)
+    jobs.run_job(db, jobs.claim(db, 'w1'), '')
+    make_due(db, job_id)
+    jobs.run_job(db, jobs.claim(db, 'w1'), '')
+    row = jobs.get_job(db, job_id)
+    assert row['status'] == jobs.FAILED
+    assert row['finished_at'] is not None
+    assert jobs.claim(db, 'w1') is None
+
+
+def test_stale_job_is_requeued_and_old_worker_loses_it(db, task):
+    job_id, _ = jobs.enqueue(db, 'test_task')
+    lost = jobs.claim(db, 'w1')
+    make_stale(db, job_id)
+
+    assert jobs.requeue_stale(db, timeout=60) == 1
+    taken = jobs.claim(db, 'w2')
+    assert taken['id'] == job_id and taken['attempts'] == 2
+
+    # Původní worker už výsledek ani chybu nezapíše
+    assert not jobs.complete(db, lost, {'from': 'w1'})
+    assert not jobs.fail(db, lost, 'chyba w1')
+    assert jobs.complete(db, taken, {'from': 'w2'})
+    row = jobs.get_job(db, job_id)
+    assert row['status'] == jobs.DONE
+    assert row['result'] == '{"from": "w2"}'
+
+
+def test_job_with_fresh_heartbeat_is_not_requeued(db, task):
+    job_id, _ = jobs.enqueue(db, 'test_task')
+    jobs.claim(db, 'w1')
+    db.execute('UPDATE jobs SET started_at = ? WHERE id = ?', (time.time() - 3600, job_id))
+    db.commit()
+    assert jobs.requeue_stale(db, timeout=60) == 0
+    assert jobs.get_job(db, job_id)['status'] == jobs.RUNNING
+
+
+def test_stale_job_without_attempts_left_fails(db, task):
+    job_id, _ = jobs.enqueue(db, 'test_task', max_attempts=1)
+    jobs.claim(db, 'w1')
+    make_stale(db, job_id)
+    jobs.requeue_stale(db, timeout=60)
+    assert jobs.get_job(db, job_id)['status'] == jobs.FAILED
+
+
+def test_heartbeat_refreshes_running_job(app, db, task, monkeypatch):
+    monkeypatch.setattr(jobs, 'heartbeat_interval', lambda stale_timeout: 0.01)
+    job_id, _ = jobs.enqueue(db, 'test_task')
+    job = jobs.claim(db, 'w1')
+    make_stale(db, job_id)
+
+    with jobs.Heartbeat(jobs.options_from_config(app.config), job):
+        deadline = time.time() + 5
+        while jobs.get_job(db, job_id)['heartbeat_at'] < time.time() - 60 and time.time() < deadline:
+            time.sleep(0.01)
+    assert jobs.requeue_stale(db, timeout=60) == 0
+
+
+def test_export_jobs_are_deduplicated_per_requester(app, admin_client, client):
+    bob_job = client.post('/api/workouts/export?format=csv')
+    admin_job = admin_client.post('/api/workouts/export?format=csv&user_id=2')
+    assert bob_job.status_code == admin_job.status_code == 202
+    assert bob_job.get_json()['id'] != admin_job.get_json()['id']
+
+    again = client.post('/api/workouts/export?format=csv')
+    assert again.get_json() == {**bob_job.get_json(), 'created': False}
+
+
+def test_job_result_is_visible_only_to_its_owner(app, client, admin_client):
+    client.post('/api/workouts', json=workout_body())
+    job_id = client.post('/api/workouts/export?format=csv').get_json()['id']
+    assert jobs.work(jobs.options_from_config(app.config), burst=True) == 1
+
+    response = client.get(f'/api/jobs/{job_id}/result')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert b'2026-01-05' in response.data
+
+    carol = login(app.test_client(), 'carol')
+    assert carol.get(f'/api/jobs/{job_id}').status_code == 404
+    assert admin_client.get(f'/api/jobs/{job_id}').status_code == 200
+
+
+def test_backfill_job_rebuilds_stats(app, client, admin_client, db):
+    client.post('/api/workouts', json=workout_body(exercises=[
+        {'exercise_id': 1, 'sets': 3, 'reps': '10', 'weight': '60, 70, 80'},
+    ]))
+    db.execute('DELETE FROM workout_sets')
+    db.execute('DELETE FROM exercise_daily_stats')
+    db.commit()
+
+    assert admin_client.post('/api/jobs', json={'kind': 'backfill_sets'}).status_code == 202
+    assert client.post('/api/jobs', json={'kind': 'backfill_sets'}).status_code == 403
+    jobs.work(jobs.options_from_config(app.config), burst=True)
+
+    weights = [row[0] for row in db.execute('SELECT weight_kg FROM workout_sets ORDER BY set_number')]
+    assert weights == [60.0, 70.0, 80.0]
+    assert db.execute('SELECT top_weight_kg FROM exercise_daily_stats').fetchone()[0] == 80.0
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+import passwords
+from passwords import HashingBusy, LoginThrottled, PasswordHasher, TokenBucketThrottle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(passwords.time, 'monotonic', clock)
+    return clock
+
+
+def test_throttle_allows_capacity_then_refuses(clock):
+    throttle = TokenBucketThrottle({'user': 3})
+    for _ in range(3):
+        throttle.acquire(('user', 'bob'))
+    with pytest.raises(LoginThrottled) as excinfo:
+        throttle.acquire(('user', 'bob'))
+    # Jeden token za 60 / 3 = 20 s
+    assert excinfo.value.retry_after == 20
+
+
+def test_throttle_refills_over_time(clock):
+    throttle = TokenBucketThrottle({'user': 3})
+    for _ in range(3):
+        throttle.acquire(('user', 'bob'))
+    clock.now += 20
+    throttle.acquire(('user', 'bob'))
+    with pytest.raises(LoginThrottled):
+        throttle.acquire(('user', 'bob'))
+
+
+def test_throttle_takes_all_keys_or_none(clock):
+    throttle = TokenBucketThrottle({'user': 5, 'ip': 1})
+    throttle.acquire(('user', 'bob'), ('ip', '10.0.0.1'))
+    with pytest.raises(LoginThrottled):
+        throttle.acquire(('user', 'bob'), ('ip', '10.0.0.1'))
+    # Odmítnutý pokus nespotřeboval token uživatele
+    for host in range(2, 6):
+        throttle.acquire(('user', 'bob'), ('ip', f'10.0.0.{host}'))
+    with pytest.raises(LoginThrottled):
+        throttle.acquire(('user', 'bob'))
+
+
+def test_throttle_keys_are_independent(clock):
+    throttle = TokenBucketThrottle({'user': 1})
+    throttle.acquire(('user', 'bob'))
+    throttle.acquire(('user', 'carol'))
+
+
+def test_throttle_reset_forgets_key(clock):
+    throttle = TokenBucketThrottle({'user': 1})
+    throttle.acquire(('user', 'bob'))
+    throttle.reset(('user', 'bob'))
+    throttle.acquire(('user', 'bob'))
+
+
+def test_throttle_evicts_least_recently_used_keys(clock):
+    throttle = TokenBucketThrottle({'user': 1}, max_keys=2)
+    throttle.acquire(('user', 'a'))
+    throttle.acquire(('user', 'b'))
+    throttle.acquire(('user', 'c'))
+    # 'a' byl zapomenut, má znovu plný bucket
+    throttle.acquire(('user', 'a'))
+    with pytest.raises(LoginThrottled):
+        throttle.acquire(('user', 'c'))
+
+
+def test_hasher_verifies_and_detects_old_parameters():
+    hasher = PasswordHasher('pbkdf2:sha256:1000', workers=1, queue_size=1)
+    password_hash = hasher.hash('secret')
+    assert hasher.verify(password_hash, 'secret')
+    assert not hasher.verify(password_hash, 'wrong')
+    assert not hasher.needs_rehash(password_hash)
+    assert PasswordHasher('pbkdf2:sha256:2000', workers=1, queue_size=1).needs_rehash(password_hash)
+
+
+def test_hasher_refuses_when_queue_is_full():
+    hasher = PasswordHasher(workers=1, queue_size=0)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=hasher._run, args=(blocking,))
+    thread.start()
+    try:
+        started.wait(5)
+        with pytest.raises(HashingBusy):
+            hasher._run(lambda: None)
+    finally:
+        release.set()
+        thread.join()
+    assert hasher._run(lambda: 'done') == 'done'
+
+
+def test_hasher_timeout_raises_hashing_busy(monkeypatch):
+    monkeypatch.setattr(passwords, 'HASH_TIMEOUT_S', 0.05)
+    hasher = PasswordHasher(workers=1, queue_size=0)
+    release = threading.Event()
+    try:
+        with pytest.raises(HashingBusy):
+            hasher._run(release.wait, 5)
+    finally:
+        release.set()
+
+
+def test_login_is_throttled_per_user(app):
+    client = app.test_client()
+    for _ in range(app.config['LOGIN_ATTEMPTS_PER_USER']):
+        response = client.post('/login', data={'username': 'bob', 'password': 'wrong'})
+        assert response.status_code == 200
+    response = client.post('/login', data={'username': 'bob', 'password': 'bob123'})
+    assert response.status_code == 429
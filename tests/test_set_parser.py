@@ -0,0 +1,62 @@
+import pytest
+
+import set_parser
+from set_parser import ParsedSet
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('60, 70, 80', [60.0, 70.0, 80.0]),
+    ('60,70,80', [60.0, 70.0, 80.0]),
+    ('22,5-25-27,5', [22.5, 25.0, 27.5]),
+    ('22.5, 25, 27.5', [22.5, 25.0, 27.5]),
+    ('22,5, 25, 27,5', [22.5, 25.0, 27.5]),
+    ('22,5', [22.5]),
+    ('60-70-80', [60.0, 70.0, 80.0]),
+    ('22.5kg', [22.5]),
+    ('22.5 kg', [22.5]),
+    ('+10', [10.0]),
+    ('BW', [None]),
+    ('', []),
+    (None, []),
+])
+def test_parse_weights(text, expected):
+    assert set_parser.parse_weights(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('10-8-6', [(10, None), (8, None), (6, None)]),
+    ('10/8/6', [(10, None), (8, None), (6, None)]),
+    ('10, 8, 6', [(10, None), (8, None), (6, None)]),
+    ('3x10', [(10, None)] * 3),
+    ('60s-45s-30s', [(None, 60), (None, 45), (None, 30)]),
+    ('1:30', [(None, 90)]),
+    ('2min', [(None, 120)]),
+    ('90 s', [(None, 90)]),
+    ('max', [(None, None)]),
+])
+def test_parse_reps(text, expected):
+    assert set_parser.parse_reps(text) == expected
+
+
+def test_parse_sets_expands_single_values():
+    assert set_parser.parse_sets(3, '10', '50') == [
+        ParsedSet(1, 10, None, 50.0),
+        ParsedSet(2, 10, None, 50.0),
+        ParsedSet(3, 10, None, 50.0),
+    ]
+
+
+def test_parse_sets_pads_missing_values():
+    assert set_parser.parse_sets(3, '10-8', '60, 70, 80') == [
+        ParsedSet(1, 10, None, 60.0),
+        ParsedSet(2, 8, None, 70.0),
+        ParsedSet(3, None, None, 80.0),
+    ]
+
+
+def test_parse_sets_caps_number_of_sets():
+    assert len(set_parser.parse_sets(1000, '1000x1', '')) == set_parser.MAX_SETS
+
+
+def test_parse_sets_without_sets():
+    assert set_parser.parse_sets(0, '', '') == []
@@ -0,0 +1,94 @@
+import sync
+from database import transaction
+from conftest import workout_body
+
+
+def create_workout(client, **overrides):
+    response = client.post('/api/workouts', json=workout_body(**overrides))
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def get_sync(client, cursor=None, limit=None):
+    params = {}
+    if cursor is not None:
+        params['since'] = cursor
+    if limit is not None:
+        params['limit'] = limit
+    response = client.get('/api/sync', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_first_sync_returns_full_state(client, admin_client):
+    first = create_workout(client)
+    second = create_workout(client, date='2026-01-06')
+    create_workout(admin_client)
+
+    page = get_sync(client)
+    assert page['reset'] is True
+    assert page['has_more'] is False
+    assert [w['id'] for w in page['workouts']] == [first, second]
+    assert {e['workout_id'] for e in page['workout_exercises']} == {first, second}
+
+
+def test_cursor_returns_only_newer_changes(client):
+    first = create_workout(client)
+    second = create_workout(client, date='2026-01-06')
+    cursor = get_sync(client)['cursor']
+
+    assert get_sync(client, cursor)['workouts'] == []
+
+    response = client.patch(f'/api/workouts/{second}', json={'version': 1, 'notes': 'upraveno'})
+    assert response.status_code == 200
+    page = get_sync(client, cursor)
+    assert page['reset'] is False
+    assert [(w['id'], w['notes'], w['version']) for w in page['workouts']] == [(second, 'upraveno', 2)]
+    assert first not in [w['id'] for w in page['workouts']]
+
+
+def test_deleted_workout_is_reported_as_tombstone(client):
+    workout_id = create_workout(client)
+    exercise_ids = [e['id'] for e in client.get(f'/api/workouts/{workout_id}').get_json()['exercises']]
+    cursor = get_sync(client)['cursor']
+
+    assert client.delete(f'/api/workouts/{workout_id}').status_code == 200
+    page = get_sync(client, cursor)
+    assert page['deleted']['workouts'] == [workout_id]
+    assert sorted(page['deleted']['workout_exercises']) == sorted(exercise_ids)
+    assert page['workouts'] == []
+
+
+def test_pages_follow_change_order(client):
+    ids = [create_workout(client, date=f'2026-01-{day:02d}') for day in range(1, 6)]
+    seen = []
+    cursor = None
+    while True:
+        page = get_sync(client, cursor, limit=2)
+        seen.extend(w['id'] for w in page['workouts'])
+        cursor = page['cursor']
+        if not page['has_more']:
+            break
+    assert seen == ids
+    assert get_sync(client, cursor)['workouts'] == []
+
+
+def test_cursor_before_pruned_tombstones_resets(app, client, db):
+    keep = create_workout(client)
+    removed = create_workout(client, date='2026-01-06')
+    cursor = get_sync(client)['cursor']
+    client.delete(f'/api/workouts/{removed}')
+
+    with transaction(db):
+        db.execute("UPDATE sync_tombstones SET deleted_at = '2000-01-01T00:00:00.000Z'")
+        assert sync.prune_tombstones(db, 90) > 0
+
+    page = get_sync(client, cursor)
+    assert page['reset'] is True
+    assert page['deleted'] == {'workouts': [], 'workout_exercises': []}
+    assert [w['id'] for w in page['workouts']] == [keep]
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get('/api/sync?since=abc').status_code == 400
+    assert client.get('/api/sync?since=-1').status_code == 400
@@ -0,0 +1,119 @@
+import threading
+
+from conftest import login, workout_body
+
+
+def create_workout(client, **overrides):
+    response = client.post('/api/workouts', json=workout_body(**overrides))
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def get_workout(client, workout_id):
+    response = client.get(f'/api/workouts/{workout_id}')
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_patch_bumps_version_and_keeps_untouched_exercises(client):
+    workout_id = create_workout(client, exercises=[
+        {'exercise_id': 1, 'sets': 3, 'reps': '10', 'weight': '50'},
+        {'exercise_id': 2, 'sets': 3, 'reps': '8', 'weight': '40'},
+    ])
+    before = {e['exercise_id']: e['id'] for e in get_workout(client, workout_id)['exercises']}
+
+    response = client.patch(f'/api/workouts/{workout_id}', json={
+        'version': 1,
+        'notes': 'nové poznámky',
+        'exercises': {'updated': [{'id': before[1], 'reps': '12-10-8'}]},
+    })
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 2
+
+    workout = get_workout(client, workout_id)
+    assert workout['version'] == 2
+    assert workout['notes'] == 'nové poznámky'
+    assert {e['exercise_id']: e['id'] for e in workout['exercises']} == before
+    assert {e['exercise_id']: e['reps'] for e in workout['exercises']} == {1: '12-10-8', 2: '8'}
+
+
+def test_patch_with_stale_version_conflicts(client):
+    workout_id = create_workout(client)
+    assert client.patch(f'/api/workouts/{workout_id}', json={'version': 1, 'notes': 'první'}).status_code == 200
+
+    response = client.patch(f'/api/workouts/{workout_id}', json={'version': 1, 'notes': 'druhá'})
+    assert response.status_code == 409
+    assert response.get_json()['version'] == 2
+    assert get_workout(client, workout_id)['notes'] == 'první'
+
+
+def test_concurrent_patches_with_same_version_let_one_win(app):
+    owner = login(app.test_client(), 'bob')
+    workout_id = create_workout(owner)
+    clients = [login(app.test_client(), 'bob') for _ in range(4)]
+    barrier = threading.Barrier(len(clients))
+    statuses = []
+
+    def patch(client, index):
+        barrier.wait()
+        response = client.patch(f'/api/workouts/{workout_id}', json={'version': 1, 'notes': f'klient {index}'})
+        statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=patch, args=(client, index)) for index, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [200, 409, 409, 409]
+    assert get_workout(owner, workout_id)['version'] == 2
+
+
+def test_failed_patch_rolls_back_version(client):
+    workout_id = create_workout(client)
+    response = client.patch(f'/api/workouts/{workout_id}', json={
+        'version': 1, 'notes': 'nic', 'exercises': {'removed': [999999]},
+    })
+    assert response.status_code == 400
+    workout = get_workout(client, workout_id)
+    assert workout['version'] == 1
+    assert workout['notes'] == ''
+
+
+def test_patch_requires_version(client):
+    workout_id = create_workout(client)
+    assert client.patch(f'/api/workouts/{workout_id}', json={'notes': 'x'}).status_code == 400
+
+
+def test_patch_of_foreign_workout_is_forbidden(app, client):
+    other = login(app.test_client(), 'carol')
+    workout_id = create_workout(other)
+    assert client.patch(f'/api/workouts/{workout_id}', json={'version': 1, 'notes': 'x'}).status_code == 403
+
+
+def test_patch_adds_exercises_with_parsed_sets(client, db):
+    workout_id = create_workout(client)
+    response = client.patch(f'/api/workouts/{workout_id}', json={
+        'version': 1,
+        'exercises': {'added': [{'exercise_id': 2, 'sets': 3, 'reps': '10, 8, 6', 'weight': '60, 70, 80'}]},
+    })
+    assert response.status_code == 200
+    [added_id] = response.get_json()['added_ids']
+    rows = db.execute(
+        'SELECT set_number, reps, weight_kg FROM workout_sets WHERE workout_exercise_id = ? ORDER BY set_number',
+        (added_id,)
+    ).fetchall()
+    assert [tuple(row) for row in rows] == [(1, 10, 60.0), (2, 8, 70.0), (3, 6, 80.0)]
+
+
+def test_put_checks_version_only_when_sent(client):
+    workout_id = create_workout(client)
+    assert client.put(f'/api/workouts/{workout_id}', json=workout_body(notes='bez verze')).status_code == 200
+
+    response = client.put(f'/api/workouts/{workout_id}', json=workout_body(notes='stará', version=1))
+    assert response.status_code == 409
+    assert response.get_json()['version'] == 2
+
+    response = client.put(f'/api/workouts/{workout_id}', json=workout_body(notes='aktuální', version=2))
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 3
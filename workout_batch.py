@@ -0,0 +1,64 @@
+"""
+Hromadné načtení tréninků včetně cviků v aplikaci Balift
+
+Místo jednoho požadavku /api/workouts/<id> na každý řádek seznamu se
+hlavičky i všechny jejich cviky načtou jedním dotazem. Seznam ID se
+předává jako jeden JSON parametr (json_each), takže počet dotazů ani
+parametrů nezávisí na počtu tréninků. Cviky seskupí SQLite
+(json_group_array) a výsledek je rovnou text JSON - v Pythonu se pro
+jednotlivé řádky nevytvářejí žádné slovníky. Archivované tréninky se
+načtou stejně, pokud je archiv připojený (archive.py).
+"""
+
+import json
+
+import archive
+
+# Cviky tréninků jedné vrstvy seskupené podle workout_id, v pořadí vložení
+_EXERCISES = '''SELECT workout_id, json_group_array(json_object(
+        'id', id, 'exercise_id', exercise_id, 'exercise_name', exercise_name,
+        'category_name', category_name, 'sets', sets, 'reps', reps, 'weight', weight
+    )) AS items
+    FROM (
+        SELECT we.workout_id, we.id, e.id AS exercise_id, e.name AS exercise_name,
+            ec.name AS category_name, we.sets, we.reps, we.weight
+        FROM {tier}workout_exercises we
+        JOIN exercises e ON we.exercise_id = e.id
+        JOIN exercise_categories ec ON e.category_id = ec.id
+        WHERE we.workout_id IN (SELECT value FROM json_each(:ids))
+        ORDER BY we.workout_id, we.id
+    )
+    GROUP BY workout_id'''
+
+
+def workouts_json(db, workout_ids, owner_id=None, with_username=False):
+    """
+    Vrátí tréninky se zadanými ID (od nejnovějšího) jako text pole JSON,
+    každý ve stejném tvaru jako /api/workouts/<id> včetně cviků.
+    S owner_id se vrátí jen tréninky daného uživatele, ostatní ID se
+    přeskočí. with_username přidá jméno vlastníka (pro adminy).
+    """
+    if not workout_ids:
+        return '[]'
+
+    username = ", 'username', u.username" if with_username else ''
+    owner = 'AND w.user_id = :owner_id' if owner_id is not None else ''
+    arms = []
+    for tier in archive.tiers(db):
+        arms.append(f'''SELECT w.date, w.id, json_object(
+            'id', w.id, 'date', w.date, 'training_type_id', w.training_type_id,
+            'type_name', tt.name, 'notes', w.notes, 'user_id', w.user_id,
+            'version', w.version{username},
+            'exercises', json(coalesce(ex.items, '[]'))
+        ) AS body
+        FROM {tier}workouts w
+        JOIN training_types tt ON w.training_type_id = tt.id
+        LEFT JOIN users u ON w.user_id = u.id
+        LEFT JOIN ({_EXERCISES.format(tier=tier)}) ex ON ex.workout_id = w.id
+        WHERE w.id IN (SELECT value FROM json_each(:ids)) {owner}''')
+    rows = db.execute(
+        f'''SELECT body FROM ({' UNION ALL '.join(arms)})
+        ORDER BY date DESC, id DESC''',
+        {'ids': json.dumps(list(workout_ids)), 'owner_id': owner_id}
+    ).fetchall()
+    return '[' + ','.join(row[0] for row in rows) + ']'
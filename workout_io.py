@@ -0,0 +1,263 @@
+"""
+Hromadný import a export tréninků v aplikaci Balift
+
+Podporované formáty:
+- NDJSON: jeden trénink na řádek, cviky vnořené v poli "exercises"
+- CSV: jeden cvik na řádek se sloupci workout, date, training_type, notes,
+  exercise, sets, reps, weight; po sobě jdoucí řádky se stejnou hodnotou
+  sloupce workout (nebo, pokud chybí, se stejným datem, typem a poznámkou)
+  tvoří jeden trénink
+
+Typ tréninku a cvik lze zadat názvem i ID. Import ukládá tréninky po
+dávkách v jedné transakci a chybné řádky jen přeskočí a nahlásí.
+"""
+
+import csv
+import datetime
+import io
+import json
+
+import archive
+import workout_store
+
+FORMATS = ('ndjson', 'csv')
+CSV_COLUMNS = ['workout', 'date', 'training_type', 'notes', 'exercise', 'sets', 'reps', 'weight']
+IMPORT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+
+class ImportRowError(ValueError):
+    """Chyba v jednom řádku importu."""
+
+
+class Catalog:
+    """Převod názvů a ID typů tréninků a cviků na ID z databáze."""
+
+    def __init__(self, db):
+        self.training_types = {}
+        for row in db.execute('SELECT id, name FROM training_types'):
+            self.training_types[str(row['id'])] = row['id']
+            self.training_types[row['name'].casefold()] = row['id']
+
+        self.exercises = {}
+        for row in db.execute('SELECT id, name FROM exercises ORDER BY id DESC'):
+            self.exercises[str(row['id'])] = row['id']
+            self.exercises[row['name'].casefold()] = row['id']
+
+    @staticmethod
+    def _resolve(mapping, value, label):
+        key = str(value).strip()
+        resolved = mapping.get(key, mapping.get(key.casefold()))
+        if resolved is None:
+            raise ImportRowError(f'Neznámý {label}: {value}')
+        return resolved
+
+    def training_type_id(self, value):
+        return self._resolve(self.training_types, value, 'typ tréninku')
+
+    def exercise_id(self, value):
+        return self._resolve(self.exercises, value, 'cvik')
+
+
+def _parse_date(value):
+    try:
+        return datetime.datetime.strptime(str(value).strip(), '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ImportRowError(f'Neplatný formát data: {value}')
+
+
+def _parse_exercise(catalog, data):
+    exercise = data.get('exercise_id', data.get('exercise'))
+    if exercise in (None, ''):
+        raise ImportRowError('Chybí cvik')
+    try:
+        sets = int(data.get('sets') or 0)
+    except (TypeError, ValueError):
+        raise ImportRowError(f'Neplatný počet sérií: {data.get("sets")}')
+    return {
+        'exercise_id': catalog.exercise_id(exercise),
+        'sets': sets,
+        'reps': str(data.get('reps') or '0'),
+        'weight': str(data.get('weight') or '0'),
+    }
+
+
+def _parse_ndjson(lines, catalog):
+    """Generuje dvojice (číslo řádku, trénink nebo ImportRowError)."""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ImportRowError('Řádek musí obsahovat JSON objekt')
+            training_type = data.get('training_type_id', data.get('training_type'))
+            if training_type in (None, ''):
+                raise ImportRowError('Chybí typ tréninku')
+            yield line_number, {
+                'date': _parse_date(data.get('date')),
+                'training_type_id': catalog.training_type_id(training_type),
+                'notes': data.get('notes') or '',
+                'exercises': [_parse_exercise(catalog, e) for e in data.get('exercises') or []],
+            }
+        except ValueError as e:
+            # json.JSONDecodeError i ImportRowError jsou podtřídy ValueError
+            yield line_number, ImportRowError(str(e))
+
+
+def _parse_csv(lines, catalog):
+    """Generuje dvojice (číslo řádku, trénink nebo ImportRowError) ze seskupených řádků."""
+    reader = csv.DictReader(lines)
+    current = None
+    current_key = None
+    current_line = None
+
+    for row in reader:
+        line_number = reader.line_num
+        try:
+            key = row.get('workout') or (row.get('date'), row.get('training_type'), row.get('notes') or '')
+            if key != current_key:
+                if current is not None:
+                    yield current_line, current
+                current, current_key, current_line = None, key, line_number
+                if not row.get('training_type'):
+                    raise ImportRowError('Chybí typ tréninku')
+                current = {
+                    'date': _parse_date(row.get('date')),
+                    'training_type_id': catalog.training_type_id(row['training_type']),
+                    'notes': row.get('notes') or '',
+                    'exercises': [],
+                }
+            if current is None:
+                raise ImportRowError('Řádek patří k neplatnému tréninku')
+            if row.get('exercise'):
+                current['exercises'].append(_parse_exercise(catalog, row))
+        except ImportRowError as e:
+            yield line_number, e
+
+    if current is not None:
+        yield current_line, current
+
+
+def import_workouts(db, user_id, lines, fmt='ndjson', batch_size=IMPORT_BATCH_SIZE):
+    """
+    Naimportuje tréninky pro uživatele z iterovatelného zdroje textových řádků.
+    Vrací slovník se souhrnem importu a seznamem chyb po řádcích.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Nepodporovaný formát: {fmt}')
+
+    catalog = Catalog(db)
+    parse = _parse_ndjson if fmt == 'ndjson' else _parse_csv
+
+    imported = 0
+    exercises = 0
+    errors = []
+    error_count = 0
+    batch = []
+
+    def flush():
+        nonlocal imported, exercises
+        workout_store.create_workouts(db, user_id, batch)
+        imported += len(batch)
+        exercises += sum(len(w['exercises']) for w in batch)
+        batch.clear()
+
+    for line_number, item in parse(lines, catalog):
+        if isinstance(item, ImportRowError):
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'line': line_number, 'error': str(item)})
+            continue
+        batch.append(item)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    return {
+        'imported': imported,
+        'exercises': exercises,
+        'error_count': error_count,
+        'errors': errors,
+    }
+
+
+def _export_rows(db, user_id):
+    """
+    Prochází cviky tréninků uživatele kurzorem bez načtení všeho do paměti,
+    včetně archivovaných tréninků.
+    """
+    query, params = archive.union_query(
+        '''SELECT w.id AS workout_id, w.date, tt.name AS training_type, w.notes,
+        e.name AS exercise, we.sets, we.reps, we.weight, we.id AS workout_exercise_id
+        FROM {tier}workouts w
+        JOIN training_types tt ON w.training_type_id = tt.id
+        LEFT JOIN {tier}workout_exercises we ON we.workout_id = w.id
+        LEFT JOIN exercises e ON we.exercise_id = e.id
+        WHERE w.user_id = ?''',
+        (user_id,),
+        'date, workout_id, workout_exercise_id',
+        tiers=archive.tiers(db)
+    )
+    return db.execute(query, params)
+
+
+def export_ndjson(db, user_id):
+    """Generuje tréninky uživatele jako NDJSON řádky."""
+    current = None
+    for row in _export_rows(db, user_id):
+        if current is None or current['id'] != row['workout_id']:
+            if current is not None:
+                del current['id']
+                yield json.dumps(current, ensure_ascii=False) + '\n'
+            current = {
+                'id': row['workout_id'],
+                'date': row['date'],
+                'training_type': row['training_type'],
+                'notes': row['notes'] or '',
+                'exercises': [],
+            }
+        if row['exercise'] is not None:
+            current['exercises'].append({
+                'exercise': row['exercise'],
+                'sets': row['sets'],
+                'reps': row['reps'],
+                'weight': row['weight'],
+            })
+    if current is not None:
+        del current['id']
+        yield json.dumps(current, ensure_ascii=False) + '\n'
+
+
+def export_csv(db, user_id):
+    """Generuje tréninky uživatele jako CSV (jeden cvik na řádek)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(CSV_COLUMNS)
+    for row in _export_rows(db, user_id):
+        writer.writerow([
+            row['workout_id'], row['date'], row['training_type'], row['notes'] or '',
+            row['exercise'] or '', row['sets'] if row['sets'] is not None else '',
+            row['reps'] or '', row['weight'] or '',
+        ])
+        # Odesíláme po větších blocích, ne po jednotlivých řádcích
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield flush()
+    yield flush()
+
+
+def export_workouts(db, user_id, fmt='ndjson'):
+    """Vrátí generátor exportu v požadovaném formátu."""
+    if fmt not in FORMATS:
+        raise ValueError(f'Nepodporovaný formát: {fmt}')
+    return export_ndjson(db, user_id) if fmt == 'ndjson' else export_csv(db, user_id)
@@ -0,0 +1,321 @@
+"""
+Zápisové operace nad tréninky v aplikaci Balift
+
+Každá operace proběhne jako jedna transakce - trénink se nikdy neuloží
+bez svých cviků. Cviky se vkládají hromadně přes executemany.
+"""
+
+import archive
+import stats
+from database import transaction
+from set_parser import parse_sets
+
+BACKFILL_SETS = 'workout_sets'
+
+# Sloupce, které smí měnit částečná úprava (PATCH)
+WORKOUT_FIELDS = ('date', 'training_type_id', 'notes')
+EXERCISE_FIELDS = ('exercise_id', 'sets', 'reps', 'weight')
+
+
+class VersionConflict(Exception):
+    """Trénink byl mezitím změněn - klient upravoval starší verzi."""
+
+    def __init__(self, current):
+        super().__init__('Trénink byl mezitím změněn, načtěte ho znovu')
+        self.current = current
+
+
+def _exercise_rows(workout_id, exercises):
+    """Převede seznam cviků z požadavku na n-tice pro executemany."""
+    return [
+        (
+            workout_id,
+            exercise['exercise_id'],
+            exercise['sets'],
+            exercise['reps'],
+            exercise['weight']
+        )
+        for exercise in exercises
+    ]
+
+
+def _insert_exercises(db, workout_id, exercises):
+    db.executemany(
+        '''INSERT INTO workout_exercises
+        (workout_id, exercise_id, sets, reps, weight)
+        VALUES (?, ?, ?, ?, ?)''',
+        _exercise_rows(workout_id, exercises)
+    )
+    _store_sets(db, [workout_id])
+
+
+def _set_rows(exercise_rows):
+    """Rozepíše řádky workout_exercises (id, sets, reps, weight) na série pro executemany."""
+    return [
+        (row[0], parsed.set_number, parsed.reps, parsed.duration_s, parsed.weight_kg)
+        for row in exercise_rows
+        for parsed in parse_sets(row[1], row[2], row[3])
+    ]
+
+
+def _insert_sets(db, exercise_rows):
+    db.executemany(
+        '''INSERT OR REPLACE INTO workout_sets
+        (workout_exercise_id, set_number, reps, duration_s, weight_kg)
+        VALUES (?, ?, ?, ?, ?)''',
+        _set_rows(exercise_rows)
+    )
+
+
+def _store_sets(db, workout_ids):
+    """Odvodí série pro všechny cviky zadaných tréninků (volá se uvnitř transakce)."""
+    for start in range(0, len(workout_ids), 500):
+        chunk = workout_ids[start:start + 500]
+        placeholders = ', '.join('?' * len(chunk))
+        rows = db.execute(
+            f'''SELECT id, sets, reps, weight FROM workout_exercises
+            WHERE workout_id IN ({placeholders})''',
+            chunk
+        ).fetchall()
+        _insert_sets(db, rows)
+
+
+def find_by_client_id(db, user_id, client_id):
+    """ID tréninku uživatele s daným client_id (identifikátor z offline fronty), nebo None."""
+    row = db.execute(
+        'SELECT id FROM workouts WHERE user_id = ? AND client_id = ?', (user_id, client_id)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def create_workout(db, user_id, date, training_type_id, notes, exercises, client_id=None):
+    """
+    Vytvoří trénink včetně cviků.
+    Vrací ID nového tréninku. Pokud uživatel už má trénink se stejným
+    client_id (opakované odeslání z offline fronty), vrátí jeho ID.
+    """
+    with transaction(db):
+        # Kontrola uvnitř transakce (BEGIN IMMEDIATE), souběžné opakování nevytvoří duplikát
+        if client_id:
+            existing = find_by_client_id(db, user_id, client_id)
+            if existing is not None:
+                return existing
+        cursor = db.execute(
+            'INSERT INTO workouts (date, training_type_id, notes, user_id, client_id) VALUES (?, ?, ?, ?, ?)',
+            (date, training_type_id, notes, user_id, client_id or None)
+        )
+        workout_id = cursor.lastrowid
+        _insert_exercises(db, workout_id, exercises)
+        stats.refresh_weeks(db, stats.affected_weeks(db, [workout_id]))
+    return workout_id
+
+
+def create_workouts(db, user_id, workouts):
+    """
+    Vytvoří dávku tréninků (slovníky date, training_type_id, notes, exercises)
+    v jedné transakci. Vrací seznam ID nových tréninků.
+    """
+    workout_ids = []
+    exercise_rows = []
+    with transaction(db):
+        for workout in workouts:
+            cursor = db.execute(
+                'INSERT INTO workouts (date, training_type_id, notes, user_id) VALUES (?, ?, ?, ?)',
+                (workout['date'], workout['training_type_id'], workout['notes'], user_id)
+            )
+            workout_ids.append(cursor.lastrowid)
+            exercise_rows.extend(_exercise_rows(cursor.lastrowid, workout['exercises']))
+
+        db.executemany(
+            '''INSERT INTO workout_exercises
+            (workout_id, exercise_id, sets, reps, weight)
+            VALUES (?, ?, ?, ?, ?)''',
+            exercise_rows
+        )
+        _store_sets(db, workout_ids)
+        stats.refresh_weeks(db, stats.affected_weeks(db, workout_ids))
+    return workout_ids
+
+
+def _bump_version(db, workout_id, version=None):
+    """
+    Zvýší verzi tréninku a vrátí novou. Pokud je zadaná očekávaná verze
+    a neshoduje se s uloženou, vyhodí VersionConflict.
+    """
+    if version is None:
+        cursor = db.execute('UPDATE workouts SET version = version + 1 WHERE id = ?', (workout_id,))
+    else:
+        cursor = db.execute(
+            'UPDATE workouts SET version = version + 1 WHERE id = ? AND version = ?',
+            (workout_id, version)
+        )
+    row = db.execute('SELECT version FROM workouts WHERE id = ?', (workout_id,)).fetchone()
+    if row is None:
+        raise LookupError('Trénink nebyl nalezen')
+    if cursor.rowcount == 0:
+        raise VersionConflict(row[0])
+    return row[0]
+
+
+def replace_workout(db, workout_id, date, training_type_id, notes, exercises, version=None):
+    """
+    Přepíše hlavičku tréninku a nahradí všechny jeho cviky.
+    Vrací novou verzi tréninku.
+    """
+    with transaction(db):
+        new_version = _bump_version(db, workout_id, version)
+        # Souhrny se přepočítají pro původní i nový týden tréninku
+        weeks = stats.affected_weeks(db, [workout_id])
+        db.execute(
+            'UPDATE workouts SET date = ?, training_type_id = ?, notes = ? WHERE id = ?',
+            (date, training_type_id, notes, workout_id)
+        )
+        db.execute('DELETE FROM workout_exercises WHERE workout_id = ?', (workout_id,))
+        _insert_exercises(db, workout_id, exercises)
+        stats.refresh_weeks(db, weeks | stats.affected_weeks(db, [workout_id]))
+    return new_version
+
+
+def patch_workout(db, workout_id, version, fields=None, added=(), updated=(), removed=()):
+    """
+    Částečná úprava tréninku: změněná pole hlavičky (fields), nové cviky
+    (added), změny existujících cviků podle workout_exercises.id (updated)
+    a ID odebraných cviků (removed). Nezměněné cviky zůstanou beze změny
+    včetně svých ID. Vyžaduje aktuální verzi tréninku, jinak vyhodí
+    VersionConflict. Vrací dvojici (nová verze, ID přidaných cviků).
+    """
+    fields = {name: value for name, value in (fields or {}).items() if name in WORKOUT_FIELDS}
+    with transaction(db):
+        new_version = _bump_version(db, workout_id, version)
+        weeks = stats.affected_weeks(db, [workout_id])
+
+        if fields:
+            assignments = ', '.join(f'{name} = ?' for name in fields)
+            db.execute(f'UPDATE workouts SET {assignments} WHERE id = ?', (*fields.values(), workout_id))
+
+        removed = set(removed)
+        if removed:
+            placeholders = ', '.join('?' * len(removed))
+            cursor = db.execute(
+                f'DELETE FROM workout_exercises WHERE workout_id = ? AND id IN ({placeholders})',
+                (workout_id, *removed)
+            )
+            if cursor.rowcount != len(removed):
+                raise ValueError('Některý z odebraných cviků nepatří k tréninku')
+
+        updated_ids = []
+        for exercise in updated:
+            changes = {name: exercise[name] for name in EXERCISE_FIELDS if name in exercise}
+            if not changes:
+                continue
+            assignments = ', '.join(f'{name} = ?' for name in changes)
+            cursor = db.execute(
+                f'UPDATE workout_exercises SET {assignments} WHERE id = ? AND workout_id = ?',
+                (*changes.values(), exercise['id'], workout_id)
+            )
+            if cursor.rowcount == 0:
+                raise ValueError(f"Cvik {exercise['id']} nepatří k tréninku")
+            updated_ids.append(exercise['id'])
+
+        added_ids = [
+            db.execute(
+                '''INSERT INTO workout_exercises
+                (workout_id, exercise_id, sets, reps, weight)
+                VALUES (?, ?, ?, ?, ?)''',
+                row
+            ).lastrowid
+            for row in _exercise_rows(workout_id, added)
+        ]
+
+        # Série se znovu odvodí jen pro změněné a nové cviky
+        changed_ids = updated_ids + added_ids
+        if changed_ids:
+            placeholders = ', '.join('?' * len(changed_ids))
+            db.execute(f'DELETE FROM workout_sets WHERE workout_exercise_id IN ({placeholders})', changed_ids)
+            rows = db.execute(
+                f'SELECT id, sets, reps, weight FROM workout_exercises WHERE id IN ({placeholders})',
+                changed_ids
+            ).fetchall()
+            _insert_sets(db, rows)
+
+        # Poznámky ani typ tréninku souhrny neovlivňují
+        if 'date' in fields or removed or changed_ids:
+            stats.refresh_weeks(db, weeks | stats.affected_weeks(db, [workout_id]))
+    return new_version, added_ids
+
+
+def delete_workout(db, workout_id):
+    """
+    Smaže trénink (cviky a série se smažou kaskádově).
+    """
+    with transaction(db):
+        weeks = stats.affected_weeks(db, [workout_id])
+        db.execute('DELETE FROM workouts WHERE id = ?', (workout_id,))
+        stats.refresh_weeks(db, weeks)
+
+
+def copy_workout(db, source_id, date):
+    """
+    Zkopíruje trénink včetně cviků s novým datem (vlastník zůstává stejný).
+    Zdrojem může být i archivovaný trénink, kopie se vždy uloží do hlavní
+    databáze. Vrací ID kopie, nebo None pokud zdrojový trénink neexistuje.
+    """
+    with transaction(db):
+        found = archive.find_workout_tier(db, source_id)
+        if found is None:
+            return None
+        tier = found[0]
+        cursor = db.execute(
+            f'''INSERT INTO workouts (date, training_type_id, notes, user_id)
+            SELECT ?, training_type_id, notes, user_id FROM {tier}workouts WHERE id = ?''',
+            (date, source_id)
+        )
+        new_workout_id = cursor.lastrowid
+
+        db.execute(
+            f'''INSERT INTO workout_exercises (workout_id, exercise_id, sets, reps, weight)
+            SELECT ?, exercise_id, sets, reps, weight FROM {tier}workout_exercises
+            WHERE workout_id = ?
+            ORDER BY id''',
+            (new_workout_id, source_id)
+        )
+        _store_sets(db, [new_workout_id])
+        stats.refresh_weeks(db, stats.affected_weeks(db, [new_workout_id]))
+    return new_workout_id
+
+
+def backfill_sets(db, batch_size=1000):
+    """
+    Doplní série pro existující cviky po dávkách, každá dávka je jedna transakce.
+    Průběh se ukládá do backfill_progress, takže přerušený běh pokračuje tam,
+    kde skončil. Generuje počet zpracovaných cviků po každé dávce. Nakonec
+    přepočítá souhrnné statistiky, které ze sérií vycházejí.
+    """
+    row = db.execute('SELECT last_id FROM backfill_progress WHERE name = ?', (BACKFILL_SETS,)).fetchone()
+    last_id = row['last_id'] if row else 0
+
+    while True:
+        with transaction(db):
+            rows = db.execute(
+                '''SELECT id, sets, reps, weight FROM workout_exercises
+                WHERE id > ? ORDER BY id LIMIT ?''',
+                (last_id, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            _insert_sets(db, rows)
+            last_id = rows[-1]['id']
+            db.execute(
+                'INSERT OR REPLACE INTO backfill_progress (name, last_id) VALUES (?, ?)',
+                (BACKFILL_SETS, last_id)
+            )
+        yield len(rows)
+
+    with transaction(db):
+        stats.rebuild(db)
+
+
+def reset_backfill(db, name):
+    """Smaže uložený průběh dávkové úlohy, další běh začne od začátku."""
+    with transaction(db):
+        db.execute('DELETE FROM backfill_progress WHERE name = ?', (name,))